@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "F2app.settings")
 
 application = get_asgi_application()
+
+# Only server processes load these; management commands skip them
+from fakeapp.apps import warm_up_worker  # noqa: E402
+
+warm_up_worker()
@@ -15,6 +15,7 @@ from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+import hashlib
 import os
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -80,6 +81,17 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Seconds a connection waits for the write lock before "database is locked"
+            "timeout": 20,
+            # Take the write lock when the transaction starts instead of failing to upgrade a read lock
+            "transaction_mode": "IMMEDIATE",
+            # WAL: readers don't block the writer and commits don't rewrite the main file.
+            # The first connection switches the checked-in db.sqlite3 (saved in rollback-journal mode)
+            # to WAL, which rewrites its header, so the file shows as modified after any run; the
+            # -wal/-shm files next to it are ignored.
+            "init_command": "PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;PRAGMA busy_timeout=20000",
+        },
     }
 }
 
@@ -129,6 +141,154 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Run resume and job-description extraction in parallel during onboarding
+ONBOARDING_CONCURRENT = True
+
+# Content-addressed LLM response cache (in-memory LRU + SQLite file shared by workers)
+LLM_CACHE = {
+    "ENABLED": True,
+    "PATH": os.path.join(BASE_DIR, "llm_cache.sqlite3"),
+    "MEMORY_ENTRIES": 256,
+    "MAX_ENTRIES": 20000,
+    "TTL_SECONDS": 7 * 24 * 3600,
+    "CACHE_QUESTIONS": False,
+}
+
+# Generate the next resume-round question in the background while the candidate answers
+RESUME_QUESTION_PREFETCH = False
+PREFETCH_WORKERS = 4
+
+# Score answers in background workers instead of inside upload_audio
+DEFERRED_SCORING = False
+SCORING_WORKERS = 4
+SCORING_WAIT_TIMEOUT = 60
+# Resume interviews: score all answers and write the assessment in one LLM call at result time
+# (takes precedence over DEFERRED_SCORING for that flow)
+BATCH_SCORING = False
+
+# Stream question audio sentence by sentence instead of synthesizing it inside upload_audio
+TTS_STREAMING = False
+
+# Question audio engine: "gtts" (remote), "espeak" (espeak-ng) or "piper" (local, CPU)
+TTS_BACKEND = "gtts"
+TTS_LANG = "en"
+# Voice per backend: gTTS accent tld, espeak-ng voice name (defaults to TTS_LANG),
+# path to a Piper .onnx voice model
+TTS_VOICES = {
+    "gtts": "com",
+    "espeak": None,
+    "piper": None,
+}
+
+# One MP3 per unique utterance under MEDIA_ROOT/DIR, evicted least-recently-used by size
+TTS_CACHE = {
+    "ENABLED": True,
+    "DIR": "tts_cache",
+    "MAX_BYTES": 200 * 1024 * 1024,
+}
+
+# Answer transcription: "groq" (whisper-large-v3 API), "google" (speech_recognition) or
+# "faster_whisper" (local CTranslate2 model on CPU); STT_FALLBACK is tried when it fails
+STT_BACKEND = "groq"
+STT_FALLBACK = "google"
+# faster-whisper model size/path and quantization; loaded once per worker at startup
+STT_LOCAL_MODEL = "base.en"
+STT_COMPUTE_TYPE = "int8"
+STT_CPU_THREADS = 0
+
+# Pooled HTTP client shared by every Groq LLM/STT call in a worker (see fakeapp/fapp_clients.py)
+HTTP_CLIENTS = {
+    "MAX_CONNECTIONS": 20,
+    "MAX_KEEPALIVE_CONNECTIONS": 10,
+    "KEEPALIVE_EXPIRY": 120,
+    "CONNECT_TIMEOUT": 5.0,
+    "LLM_TIMEOUT": 60.0,
+    "STT_TIMEOUT": 30.0,
+    "WARM_UP": True,
+}
+
+# Token bucket in front of every chat completion; next-question calls go first,
+# then answer evaluation, then background work (extraction, assessment), which is shed first
+LLM_RATE_LIMIT = {
+    "ENABLED": True,
+    "REQUESTS_PER_MINUTE": 30,
+    "BURST": 10,
+    # e.g. os.path.join(BASE_DIR, "llm_rate_limit.sqlite3") to share one bucket between workers
+    "SHARED_PATH": None,
+}
+
+# Skill-interview chat history (ChatMessage rows): the model sees the first message plus
+# the newest MAX_MESSAGES that fit in MAX_PROMPT_TOKENS; idle sessions are deleted after TTL_SECONDS
+CHAT_HISTORY = {
+    "MAX_MESSAGES": 12,
+    "MAX_PROMPT_TOKENS": 3000,
+    "TTL_SECONDS": 24 * 3600,
+}
+
+# Sessions are read from the "sessions" cache and only loaded from the session table on a miss;
+# saves write through to both. Payloads use msgpack when installed (compact JSON otherwise)
+# and are zlib-compressed when that makes them smaller, as Django's default encoder does.
+SESSION_ENGINE = "fakeapp.fapp_sessions"
+SESSION_SERIALIZER = "fakeapp.fapp_sessions.CompactSerializer"
+SESSION_CACHE_ALIAS = "sessions"
+SESSION_STORE = {
+    "COMPRESS": True,
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # A file cache on tmpfs is shared by every worker on the box. LocMemCache (an in-process LRU)
+    # is faster but serves stale sessions as soon as there is more than one worker process.
+    # The directory is per checkout, so two deployments on one host don't read each other's sessions.
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": (
+            os.path.join("/dev/shm", "fakeapp_sessions_" + hashlib.sha256(str(BASE_DIR).encode()).hexdigest()[:12])
+            if os.path.isdir("/dev/shm") else os.path.join(BASE_DIR, "session_cache")
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+# Queue the per-turn InterviewResponse writes and commit them in batches every FLUSH_INTERVAL
+# seconds (fakeapp/fapp_write_behind.py); reads of those rows flush first
+WRITE_BEHIND = {
+    "ENABLED": False,
+    "FLUSH_INTERVAL": 0.2,
+    "MAX_BATCH": 100,
+    "READ_WAIT": 2.0,
+}
+
+# Resume-interview state (InterviewSessionState/InterviewTurn rows); abandoned ones are deleted after TTL_SECONDS
+INTERVIEW_STATE = {
+    "TTL_SECONDS": 7 * 24 * 3600,
+}
+
+# Skill-based interview context (skills, prompt, last question) cached per worker between turns
+SKILL_CONTEXT = {
+    "MAX_SESSIONS": 1000,
+    "TTL_SECONDS": 3600,
+}
+
+# Token budget for the previous answers sent with each resume-round question prompt
+PROMPT_BUDGET = {
+    "HISTORY_TOKENS": 600,
+    "FIELD_CHARS": 400,
+}
+
+# Groq, gTTS and Google speech: "live", "record" (also save request/response pairs under
+# CASSETTE_DIR) or "replay" (serve the recordings offline, e.g. for load tests; see fakeapp/fapp_replay.py)
+EXTERNAL_SERVICES = {
+    "MODE": "live",
+    "CASSETTE_DIR": os.path.join(BASE_DIR, "replay_cassettes"),
+    # Replay only: seconds added per call as (min, max), and the share of calls that fail
+    "LATENCY": {"llm": (0.0, 0.0), "stt": (0.0, 0.0), "tts": (0.0, 0.0)},
+    "ERROR_RATE": {"llm": 0.0, "stt": 0.0, "tts": 0.0},
+    "STRICT": False,
+}
+
 import mimetypes
 mimetypes.add_type("audio/mpeg", ".mp3", True)
 
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "F2app.settings")
 
 application = get_wsgi_application()
+
+# Only server processes load these; management commands skip them
+from fakeapp.apps import warm_up_worker  # noqa: E402
+
+warm_up_worker()
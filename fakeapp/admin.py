@@ -1,11 +1,45 @@
 from django.contrib import admin
-from .models import InterviewResponse, IntervieweeDetails, IntervieweeSkill
+from .models import InterviewResponse, IntervieweeDetails, IntervieweeSkill, ResumeFingerprint, JobDescriptionAnalysis
+from . import fapp_document_cache
 
 class InterviewResponseAdmin(admin.ModelAdmin):
     list_display = ('session_id', 'question_number', 'question_text', 'answer_text', 'score')
     list_filter = ('session_id',)
     search_fields = ('session_id', 'question_text', 'answer_text')
+    ordering = ('session_id', 'question_number')
 
 admin.site.register(InterviewResponse, InterviewResponseAdmin)
-admin.site.register(IntervieweeDetails)
-admin.site.register(IntervieweeSkill)
\ No newline at end of file
+
+class IntervieweeDetailsAdmin(admin.ModelAdmin):
+    list_display = ('name', 'session_id', 'created_at')
+    search_fields = ('name', 'session_id')
+    ordering = ('-created_at',)
+
+admin.site.register(IntervieweeDetails, IntervieweeDetailsAdmin)
+admin.site.register(IntervieweeSkill)
+
+class ResumeFingerprintAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'hit_count', 'created_at', 'last_used_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'hit_count', 'created_at', 'last_used_at')
+
+admin.site.register(ResumeFingerprint, ResumeFingerprintAdmin)
+
+
+@admin.action(description="Pre-warm job analysis for selected postings")
+def prewarm_job_analysis(modeladmin, request, queryset):
+    warmed = failed = 0
+    for entry in queryset.filter(job_data__isnull=True):
+        if fapp_document_cache.analyze_job_description(entry):
+            warmed += 1
+        else:
+            failed += 1
+    modeladmin.message_user(request, f"Analyzed {warmed} job description(s), {failed} failed.")
+
+class JobDescriptionAnalysisAdmin(admin.ModelAdmin):
+    list_display = ('company_name', 'jd_hash', 'hit_count', 'analyzed_at', 'updated_at')
+    search_fields = ('company_name', 'job_description')
+    readonly_fields = ('jd_hash', 'hit_count', 'analyzed_at', 'created_at', 'updated_at')
+    actions = [prewarm_job_analysis]
+
+admin.site.register(JobDescriptionAnalysis, JobDescriptionAnalysisAdmin)
\ No newline at end of file
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class FakeappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "fakeapp"
+
+
+def warm_up_worker():
+    """Load the local speech-to-text model and open the API connection once per server worker.
+
+    Called from wsgi.py/asgi.py (and so by runserver) rather than AppConfig.ready(),
+    so management commands don't load the model or reach the network.
+    """
+    from . import fapp_clients, fapp_stt
+
+    fapp_stt.preload()
+    fapp_clients.warm_up()
@@ -0,0 +1,196 @@
+"""Database-backed chat history for the skill-based interview.
+
+Replaces the per-process `store` dict: every worker reads and appends the same
+ChatMessage rows, so a session survives restarts and needs no sticky routing.
+The model only sees the first message (the interview instructions) plus the
+most recent turns that fit in CHAT_HISTORY["MAX_PROMPT_TOKENS"].
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Sum, TextField
+from django.db.models.functions import Cast, Length
+from django.utils import timezone
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+from fakeapp.models import ChatMessage
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    # Messages kept after the pinned first message (an even number keeps question/answer pairs)
+    "MAX_MESSAGES": 12,
+    "MAX_PROMPT_TOKENS": 3000,
+    # Sessions untouched for this long are deleted
+    "TTL_SECONDS": 24 * 3600,
+}
+
+# How many writes between two sweeps for stale sessions
+EVICT_EVERY = 200
+
+_lock = threading.Lock()
+_writes = 0
+counters = {
+    "loads": 0,
+    "prompt_messages": 0,
+    "prompt_tokens": 0,
+    "max_prompt_tokens": 0,
+    "dropped_messages": 0,
+    "appended_messages": 0,
+    "evicted_sessions": 0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "CHAT_HISTORY", {})}
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text
+    return len(text) // 4 + 1
+
+
+def window_messages(messages, max_messages, max_tokens):
+    """Keep the first message and the newest ones that fit both limits."""
+    if len(messages) <= 1:
+        return list(messages)
+    pinned, rest = messages[0], messages[1:]
+    budget = max_tokens - estimate_tokens(pinned.content)
+    kept = []
+    for message in reversed(rest[-max_messages:] if max_messages else rest):
+        cost = estimate_tokens(message.content)
+        if cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    kept.reverse()
+    # Don't open the window on the model's reply to a question we dropped
+    if kept and kept[0].type == "ai":
+        kept = kept[1:]
+    return [pinned] + kept
+
+
+class DatabaseChatMessageHistory(BaseChatMessageHistory):
+    def __init__(self, session_id, max_messages=None, max_prompt_tokens=None):
+        config = get_config()
+        self.session_id = session_id
+        self.max_messages = config["MAX_MESSAGES"] if max_messages is None else max_messages
+        self.max_prompt_tokens = config["MAX_PROMPT_TOKENS"] if max_prompt_tokens is None else max_prompt_tokens
+        # RunnableWithMessageHistory gets a new instance per turn and reads .messages twice
+        self._loaded = None
+
+    def _rows(self):
+        return ChatMessage.objects.filter(session_id=self.session_id)
+
+    @property
+    def messages(self):
+        """The windowed history sent to the model (not the full transcript)."""
+        if self._loaded is not None:
+            return list(self._loaded)
+        rows = self._rows().values_list("position", "message")
+        first = list(rows.order_by("position")[:1])
+        if self.max_messages:
+            recent = list(rows.order_by("-position")[:self.max_messages])
+            recent.reverse()
+        else:
+            recent = list(rows.order_by("position"))
+        stored = first + [row for row in recent if not first or row[0] != first[0][0]]
+        all_messages = messages_from_dict([message for _, message in stored])
+        windowed = window_messages(all_messages, self.max_messages, self.max_prompt_tokens)
+        tokens = sum(estimate_tokens(message.content) for message in windowed)
+        with _lock:
+            counters["loads"] += 1
+            counters["prompt_messages"] += len(windowed)
+            counters["prompt_tokens"] += tokens
+            counters["max_prompt_tokens"] = max(counters["max_prompt_tokens"], tokens)
+            counters["dropped_messages"] += len(all_messages) - len(windowed)
+        self._loaded = windowed
+        return list(windowed)
+
+    @property
+    def full_messages(self):
+        return messages_from_dict(list(self._rows().order_by("position").values_list("message", flat=True)))
+
+    def add_messages(self, messages):
+        global _writes
+        self._loaded = None
+        for attempt in range(3):
+            try:
+                with transaction.atomic():
+                    position = (self._rows().aggregate(last=Max("position"))["last"] or -1) + 1
+                    ChatMessage.objects.bulk_create([
+                        ChatMessage(
+                            session_id=self.session_id,
+                            position=position + offset,
+                            role=message.type,
+                            message=message_to_dict(message)
+                        )
+                        for offset, message in enumerate(messages)
+                    ])
+                break
+            except IntegrityError:
+                # Another worker appended to the same session at the same time
+                if attempt == 2:
+                    raise
+        with _lock:
+            counters["appended_messages"] += len(messages)
+            _writes += 1
+            due = _writes % EVICT_EVERY == 0
+        if due:
+            evict_stale()
+
+    def clear(self):
+        self._loaded = None
+        self._rows().delete()
+
+
+def get_session_history(session_id):
+    return DatabaseChatMessageHistory(session_id)
+
+
+def forget(session_id):
+    """Delete a finished session's history."""
+    deleted, _ = ChatMessage.objects.filter(session_id=session_id).delete()
+    if deleted:
+        with _lock:
+            counters["evicted_sessions"] += 1
+
+
+def evict_stale(ttl_seconds=None):
+    """Delete sessions with no message newer than TTL_SECONDS."""
+    ttl_seconds = get_config()["TTL_SECONDS"] if ttl_seconds is None else ttl_seconds
+    cutoff = timezone.now() - timedelta(seconds=ttl_seconds)
+    start = time.perf_counter()
+    stale = list(
+        ChatMessage.objects.values("session_id")
+        .annotate(last=Max("created_at"))
+        .filter(last__lt=cutoff)
+        .values_list("session_id", flat=True)
+    )
+    if stale:
+        ChatMessage.objects.filter(session_id__in=stale).delete()
+        with _lock:
+            counters["evicted_sessions"] += len(stale)
+        logger.info(f"Evicted chat history of {len(stale)} stale session(s) in {time.perf_counter() - start:.2f}s")
+    return len(stale)
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+    stored = ChatMessage.objects.aggregate(
+        messages=Count("id"),
+        sessions=Count("session_id", distinct=True),
+    )
+    stats["stored_messages"] = stored["messages"]
+    stats["stored_sessions"] = stored["sessions"]
+    stats["stored_bytes"] = ChatMessage.objects.aggregate(
+        size=Sum(Length(Cast("message", TextField())))
+    )["size"] or 0
+    stats["avg_prompt_tokens"] = round(stats["prompt_tokens"] / stats["loads"], 1) if stats["loads"] else 0.0
+    return stats
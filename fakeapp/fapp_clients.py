@@ -0,0 +1,171 @@
+"""Shared outbound HTTP clients.
+
+Every ChatGroq model and the Groq audio client go through one pooled
+`httpx.Client` per worker, so TLS connections to the API are kept alive and
+reused instead of being set up per request, and the pool size caps how many
+calls a worker has in flight. `stats()` reports how often a request got a
+pooled connection. The transport is also where fapp_replay records or replays
+Groq traffic.
+"""
+import logging
+import threading
+import time
+
+import httpx
+from django.conf import settings
+
+from . import fapp_prompting, fapp_replay, fapp_scheduler
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    "MAX_CONNECTIONS": 20,
+    "MAX_KEEPALIVE_CONNECTIONS": 10,
+    "KEEPALIVE_EXPIRY": 120,
+    "CONNECT_TIMEOUT": 5.0,
+    # Read timeouts per kind of call, in seconds
+    "LLM_TIMEOUT": 60.0,
+    "STT_TIMEOUT": 30.0,
+    # Open a connection to the API when the worker starts
+    "WARM_UP": True,
+}
+
+GROQ_BASE_URL = "https://api.groq.com"
+LLM_MODEL = "llama3-70b-8192"
+
+_lock = threading.Lock()
+_http_client = None
+_groq_client = None
+counters = {
+    "requests": 0,
+    "new_connections": 0,
+    "reused_connections": 0,
+    "errors": 0,
+    "request_seconds": 0.0,
+    "connect_seconds": 0.0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "HTTP_CLIENTS", {})}
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """HTTP transport that rate-limits LLM calls (fapp_scheduler) and records connection reuse."""
+
+    def handle_request(self, request):
+        return fapp_scheduler.send(request, lambda request: fapp_replay.send_http(request, self._send))
+
+    def _send(self, request):
+        events = {}
+
+        def trace(name, info):
+            events[name] = time.perf_counter()
+
+        request.extensions = {**request.extensions, "trace": trace}
+        start = time.perf_counter()
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            with _lock:
+                counters["errors"] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        connected = "connection.connect_tcp.started" in events
+        with _lock:
+            counters["requests"] += 1
+            counters["request_seconds"] += elapsed
+            if connected:
+                counters["new_connections"] += 1
+                counters["connect_seconds"] += (
+                    events.get("connection.start_tls.complete", events.get("connection.connect_tcp.complete", start))
+                    - events["connection.connect_tcp.started"]
+                )
+            else:
+                counters["reused_connections"] += 1
+        return response
+
+
+def get_http_client():
+    """The worker's pooled httpx client (created on first use)."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            config = get_config()
+            limits = httpx.Limits(
+                max_connections=config["MAX_CONNECTIONS"],
+                max_keepalive_connections=config["MAX_KEEPALIVE_CONNECTIONS"],
+                keepalive_expiry=config["KEEPALIVE_EXPIRY"],
+            )
+            _http_client = httpx.Client(
+                transport=PooledTransport(limits=limits),
+                timeout=httpx.Timeout(config["LLM_TIMEOUT"], connect=config["CONNECT_TIMEOUT"]),
+            )
+        return _http_client
+
+
+def get_chat_model(timeout=None, **kwargs):
+    """ChatGroq on the shared pool. `timeout` overrides LLM_TIMEOUT for this model's calls."""
+    from langchain_groq import ChatGroq
+
+    config = get_config()
+    kwargs.setdefault("model_name", LLM_MODEL)
+    # Per-call prompt token and latency accounting
+    kwargs.setdefault("callbacks", [fapp_prompting.token_counter])
+    if fapp_scheduler.get_config()["ENABLED"]:
+        # The scheduler retries 429s itself, and a shed call must fail at once rather
+        # than be retried by the SDK as a connection error
+        kwargs.setdefault("max_retries", 0)
+    return ChatGroq(
+        http_client=get_http_client(),
+        request_timeout=httpx.Timeout(timeout or config["LLM_TIMEOUT"], connect=config["CONNECT_TIMEOUT"]),
+        **kwargs
+    )
+
+
+def get_groq_client():
+    """Groq SDK client (audio endpoints) on the shared pool."""
+    global _groq_client
+    http_client = get_http_client()
+    with _lock:
+        if _groq_client is None:
+            from groq import Groq
+
+            config = get_config()
+            _groq_client = Groq(
+                http_client=http_client,
+                timeout=httpx.Timeout(config["STT_TIMEOUT"], connect=config["CONNECT_TIMEOUT"]),
+            )
+        return _groq_client
+
+
+def _warm_up():
+    start = time.perf_counter()
+    try:
+        get_http_client().head(GROQ_BASE_URL, timeout=get_config()["CONNECT_TIMEOUT"])
+    except httpx.HTTPError as e:
+        logger.error(f"HTTP client warm-up failed: {e}")
+        return
+    logger.info(f"HTTP client warmed up in {time.perf_counter() - start:.2f}s")
+
+
+def warm_up(background=True):
+    """Open the first pooled connection to the API so the first question doesn't pay for TLS."""
+    if not get_config()["WARM_UP"] or fapp_replay.mode() == fapp_replay.REPLAY:
+        return
+    if background:
+        threading.Thread(target=_warm_up, name="http-warm-up", daemon=True).start()
+    else:
+        _warm_up()
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+    stats["connection_reuse_rate"] = (
+        round(stats["reused_connections"] / stats["requests"], 4) if stats["requests"] else 0.0
+    )
+    stats["avg_connect_seconds"] = (
+        round(stats["connect_seconds"] / stats["new_connections"], 4) if stats["new_connections"] else 0.0
+    )
+    return stats
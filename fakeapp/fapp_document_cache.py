@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import threading
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from fakeapp.models import ResumeFingerprint, JobDescriptionAnalysis
+
+logger = logging.getLogger('simple_logger')
+
+_lock = threading.Lock()
+counters = {
+    "resume_hits": 0,
+    "resume_misses": 0,
+    "job_hits": 0,
+    "job_misses": 0,
+}
+
+
+def _count(name):
+    with _lock:
+        counters[name] += 1
+
+
+def save_upload(uploaded_file, path):
+    """Stream an uploaded file to disk and return the SHA-256 of its contents."""
+    digest = hashlib.sha256()
+    with open(path, "wb") as f:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+def get_cached_resume(fingerprint):
+    """Return the stored ResumeFingerprint for this file hash, or None."""
+    entry = ResumeFingerprint.objects.filter(sha256=fingerprint).first()
+    if entry is None:
+        _count("resume_misses")
+        return None
+    _count("resume_hits")
+    ResumeFingerprint.objects.filter(pk=entry.pk).update(hit_count=F("hit_count") + 1, last_used_at=timezone.now())
+    print(f"Resume cache hit for {fingerprint[:12]}")
+    return entry
+
+
+def has_resume_data(resume_data):
+    """False for the empty default extract_resume_data falls back to on errors."""
+    return bool(resume_data) and any(resume_data.get(key) for key in ("skills", "projects", "experience"))
+
+
+def store_resume(fingerprint, resume_text, resume_data):
+    """Remember the extracted text, and the parsed data when extraction succeeded."""
+    try:
+        ResumeFingerprint.objects.update_or_create(
+            sha256=fingerprint,
+            defaults={
+                "resume_text": resume_text,
+                "resume_data": resume_data if has_resume_data(resume_data) else None,
+            },
+        )
+    except Exception as e:
+        logger.error(f"Could not store resume fingerprint {fingerprint[:12]}: {e}")
+
+
+def resume_cache_stats():
+    """Hit/miss counters for this worker plus totals recorded in the database."""
+    with _lock:
+        stats = {key: counters[key] for key in ("resume_hits", "resume_misses")}
+    lookups = stats["resume_hits"] + stats["resume_misses"]
+    stats["resume_hit_rate"] = round(stats["resume_hits"] / lookups, 4) if lookups else 0.0
+    stats["resume_entries"] = ResumeFingerprint.objects.count()
+    stats["resume_total_hits"] = ResumeFingerprint.objects.aggregate(total=Sum("hit_count"))["total"] or 0
+    return stats
+
+
+def get_cached_job_data(job_description, company_name=""):
+    """Return the parsed job_data stored for this (normalized) JD, or None."""
+    jd_hash = JobDescriptionAnalysis.make_hash(job_description, company_name)
+    entry = JobDescriptionAnalysis.objects.filter(jd_hash=jd_hash, job_data__isnull=False).first()
+    if entry is None:
+        _count("job_misses")
+        return None
+    _count("job_hits")
+    JobDescriptionAnalysis.objects.filter(pk=entry.pk).update(hit_count=F("hit_count") + 1)
+    print(f"Job description cache hit for {jd_hash[:12]}")
+    return entry.job_data
+
+
+def store_job_data(job_description, company_name, job_data):
+    """Store job_data for this JD unless it is the extraction fallback."""
+    from . import fapp_resume_processor
+
+    if not job_data or job_data == fapp_resume_processor.DEFAULT_JOB_DATA:
+        return
+    jd_hash = JobDescriptionAnalysis.make_hash(job_description, company_name)
+    try:
+        entry = JobDescriptionAnalysis.objects.filter(jd_hash=jd_hash).first()
+        if entry is None:
+            entry = JobDescriptionAnalysis(job_description=job_description, company_name=company_name or "")
+        entry.job_data = job_data
+        entry.analyzed_at = timezone.now()
+        entry.save()
+    except Exception as e:
+        logger.error(f"Could not store job description analysis {jd_hash[:12]}: {e}")
+
+
+def analyze_job_description(entry):
+    """Run extract_job_data for a stored JD and save the result (used to pre-warm postings)."""
+    from . import fapp_resume_processor
+
+    state = fapp_resume_processor.extract_job_data({
+        "job_description": entry.job_description,
+        "company_name": entry.company_name,
+    })
+    job_data = state.get("job_data")
+    if not job_data or job_data == fapp_resume_processor.DEFAULT_JOB_DATA:
+        return False
+    entry.job_data = job_data
+    entry.analyzed_at = timezone.now()
+    entry.save()
+    return True
+
+
+def job_cache_stats():
+    """Hit/miss counters for this worker plus totals recorded in the database."""
+    with _lock:
+        stats = {key: counters[key] for key in ("job_hits", "job_misses")}
+    lookups = stats["job_hits"] + stats["job_misses"]
+    stats["job_hit_rate"] = round(stats["job_hits"] / lookups, 4) if lookups else 0.0
+    stats["job_entries"] = JobDescriptionAnalysis.objects.filter(job_data__isnull=False).count()
+    stats["job_total_hits"] = JobDescriptionAnalysis.objects.aggregate(total=Sum("hit_count"))["total"] or 0
+    return stats
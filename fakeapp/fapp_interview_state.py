@@ -0,0 +1,242 @@
+"""Resume-interview state kept in its own tables instead of request.session.
+
+The Django session only carries the session_id; `load` rebuilds the
+InterviewState from three parts and `save` writes back only what changed:
+
+- context: resume, job description and their extracted data (written once)
+- progress: the remaining scalars and dicts (current round, question number...)
+- every list (list_of_questions, <round>_questions, conversation_history...)
+  as one InterviewTurn row per entry, so a turn updates the answered question
+  and inserts the next one instead of rewriting the whole state.
+
+What was loaded is remembered per session (digests only) to know what changed.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from fakeapp.models import InterviewSessionState, InterviewTurn
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    # States untouched for this long (abandoned interviews) are deleted
+    "TTL_SECONDS": 7 * 24 * 3600,
+    # Sessions whose loaded digests are remembered in this process
+    "MAX_SNAPSHOTS": 1000,
+}
+
+# Keys that don't change after onboarding
+CONTEXT_KEYS = (
+    "resume", "job_description", "company_name",
+    "resume_data", "job_data", "match_analysis", "candidate_digest",
+)
+
+# How many saves between two sweeps for stale states
+EVICT_EVERY = 200
+
+_lock = threading.Lock()
+_snapshots = OrderedDict()  # session_id -> digests of what is stored
+_saves = 0
+counters = {
+    "loads": 0,
+    "saves": 0,
+    "bytes_written": 0,
+    "context_writes": 0,
+    "progress_writes": 0,
+    "rows_inserted": 0,
+    "rows_updated": 0,
+    "rows_deleted": 0,
+    "evicted_states": 0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "INTERVIEW_STATE", {})}
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _digest(value):
+    return hashlib.sha1(_dumps(value).encode("utf-8")).hexdigest()
+
+
+def split_state(state):
+    """(context, progress, lists) parts of an InterviewState."""
+    context, progress, lists = {}, {}, {}
+    for key, value in state.items():
+        if key in CONTEXT_KEYS:
+            context[key] = value
+        elif isinstance(value, list):
+            lists[key] = value
+        else:
+            progress[key] = value
+    return context, progress, lists
+
+
+def _snapshot(context, progress, lists):
+    return {
+        "context": _digest(context),
+        "progress": _digest(progress),
+        "items": {
+            (name, position): _digest(item)
+            for name, items in lists.items()
+            for position, item in enumerate(items)
+        },
+        "lengths": {name: len(items) for name, items in lists.items()},
+    }
+
+
+def _remember(session_id, snapshot):
+    with _lock:
+        _snapshots[session_id] = snapshot
+        _snapshots.move_to_end(session_id)
+        while len(_snapshots) > get_config()["MAX_SNAPSHOTS"]:
+            _snapshots.popitem(last=False)
+
+
+def load(session_id):
+    """The stored InterviewState of `session_id` ({} when there is none)."""
+    row = InterviewSessionState.objects.filter(session_id=session_id).values("context", "progress").first()
+    if row is None:
+        return {}
+    lists = {}
+    for name, item in (
+        InterviewTurn.objects.filter(session_id=session_id)
+        .order_by("list_name", "position")
+        .values_list("list_name", "item")
+    ):
+        lists.setdefault(name, []).append(item)
+    # Lists that were saved empty have no rows
+    for name in row["progress"].pop("_lists", []):
+        lists.setdefault(name, [])
+    _remember(session_id, _snapshot(row["context"], row["progress"], lists))
+    with _lock:
+        counters["loads"] += 1
+    return {**row["context"], **row["progress"], **lists}
+
+
+def save(session_id, state):
+    """Write the parts of `state` that changed since it was loaded (or saved) in this process."""
+    global _saves
+    context, progress, lists = split_state(state)
+    snapshot = _snapshot(context, progress, lists)
+    with _lock:
+        previous = _snapshots.get(session_id)
+    stored_progress = {**progress, "_lists": sorted(lists)}
+    written = 0
+    inserted, updated, deleted = [], 0, 0
+    with transaction.atomic():
+        if previous is None:
+            # Nothing known about what is stored: replace it all
+            InterviewSessionState.objects.update_or_create(
+                session_id=session_id,
+                defaults={"context": context, "progress": stored_progress},
+            )
+            deleted, _ = InterviewTurn.objects.filter(session_id=session_id).delete()
+            inserted = [
+                InterviewTurn(session_id=session_id, list_name=name, position=position, item=item)
+                for name, items in lists.items()
+                for position, item in enumerate(items)
+            ]
+            written += len(_dumps(context)) + len(_dumps(stored_progress))
+            context_changed = progress_changed = True
+        else:
+            context_changed = snapshot["context"] != previous["context"]
+            progress_changed = (
+                snapshot["progress"] != previous["progress"] or snapshot["lengths"].keys() != previous["lengths"].keys()
+            )
+            fields = {}
+            if context_changed:
+                fields["context"] = context
+                written += len(_dumps(context))
+            if progress_changed:
+                fields["progress"] = stored_progress
+                written += len(_dumps(stored_progress))
+            if fields:
+                InterviewSessionState.objects.filter(session_id=session_id).update(updated_at=timezone.now(), **fields)
+            for name, items in lists.items():
+                for position, item in enumerate(items):
+                    digest = previous["items"].get((name, position))
+                    if digest is None:
+                        inserted.append(
+                            InterviewTurn(session_id=session_id, list_name=name, position=position, item=item)
+                        )
+                    elif digest != snapshot["items"][(name, position)]:
+                        InterviewTurn.objects.filter(
+                            session_id=session_id, list_name=name, position=position
+                        ).update(item=item)
+                        updated += 1
+                        written += len(_dumps(item))
+            for name, length in previous["lengths"].items():
+                if length > len(lists.get(name, [])):
+                    count, _ = InterviewTurn.objects.filter(
+                        session_id=session_id, list_name=name, position__gte=len(lists.get(name, []))
+                    ).delete()
+                    deleted += count
+        if inserted:
+            InterviewTurn.objects.bulk_create(inserted)
+            written += sum(len(_dumps(row.item)) for row in inserted)
+    _remember(session_id, snapshot)
+    with _lock:
+        counters["saves"] += 1
+        counters["bytes_written"] += written
+        counters["context_writes"] += int(context_changed)
+        counters["progress_writes"] += int(progress_changed)
+        counters["rows_inserted"] += len(inserted)
+        counters["rows_updated"] += updated
+        counters["rows_deleted"] += deleted
+        _saves += 1
+        due = _saves % EVICT_EVERY == 0
+    if due:
+        evict_stale()
+    return written
+
+
+def forget(session_id):
+    """Delete a finished interview's state."""
+    with transaction.atomic():
+        InterviewTurn.objects.filter(session_id=session_id).delete()
+        deleted, _ = InterviewSessionState.objects.filter(session_id=session_id).delete()
+    with _lock:
+        _snapshots.pop(session_id, None)
+        if deleted:
+            counters["evicted_states"] += 1
+
+
+def evict_stale(ttl_seconds=None):
+    """Delete states not saved for TTL_SECONDS."""
+    ttl_seconds = get_config()["TTL_SECONDS"] if ttl_seconds is None else ttl_seconds
+    cutoff = timezone.now() - timedelta(seconds=ttl_seconds)
+    start = time.perf_counter()
+    stale = list(
+        InterviewSessionState.objects.filter(updated_at__lt=cutoff).values_list("session_id", flat=True)
+    )
+    if stale:
+        with transaction.atomic():
+            InterviewTurn.objects.filter(session_id__in=stale).delete()
+            InterviewSessionState.objects.filter(session_id__in=stale).delete()
+        with _lock:
+            for session_id in stale:
+                _snapshots.pop(session_id, None)
+            counters["evicted_states"] += len(stale)
+        logger.info(f"Evicted interview state of {len(stale)} stale session(s) in {time.perf_counter() - start:.2f}s")
+    return len(stale)
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+        stats["snapshots"] = len(_snapshots)
+    stats["avg_bytes_per_save"] = round(stats["bytes_written"] / stats["saves"], 1) if stats["saves"] else 0.0
+    return stats
@@ -0,0 +1,263 @@
+"""Local recovery of the JSON objects the models are asked to return.
+
+Model replies often wrap the object in prose or a ```json fence, escape every
+quote, leave out a comma, add a trailing one, use single quotes / Python
+literals, or get cut off before the closing brace. `parse_json` fixes those
+deterministically so the LLM repair prompt (`fapp_resume_processor.auto_repaid`)
+only runs when this gives up.
+"""
+import json
+import logging
+import re
+import threading
+
+from . import fapp_metrics
+
+logger = logging.getLogger('simple_logger')
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+BARE_TOKEN_RE = re.compile(r"[A-Za-z0-9_.+\-]+")
+NUMBER_RE = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+LITERALS = {"true": "true", "True": "true", "false": "false", "False": "false",
+            "null": "null", "None": "null"}
+CLOSERS = {"{": "}", "[": "]"}
+# A quote only ends a string when one of these (or the end of the text) follows it
+STRUCTURAL = ",:}]"
+# A quoted key: what follows a string when the comma before it was left out
+KEY_RE = re.compile(r"""\\?(["'])[^"'\n]*?\\?\1\s*:""")
+
+_lock = threading.Lock()
+counters = {
+    "clean": 0,
+    "repaired": 0,
+    "failed": 0,
+    "llm_repaired": 0,
+    "llm_failed": 0,
+}
+
+
+class JSONRepairError(ValueError):
+    pass
+
+
+def _count(name):
+    with _lock:
+        counters[name] += 1
+    fapp_metrics.inc("fakeapp_json_parse_total", outcome=name)
+
+
+def _candidates(text):
+    """Text likely to hold the object: fenced blocks first, then the whole reply."""
+    blocks = [block for block in FENCE_RE.findall(text) if "{" in block or "[" in block]
+    return blocks + [text]
+
+
+def _slices(text):
+    """Outermost `{...}` and `[...]` spans to try, the object first unless the array encloses it."""
+    spans = {}
+    for opener, closer in CLOSERS.items():
+        start = text.find(opener)
+        end = text.rfind(closer)
+        if start != -1 and end > start:
+            spans[opener] = (start, end + 1)
+    order = ["{", "["]
+    if len(spans) == 2 and spans["["][0] < spans["{"][0] and spans["["][1] > spans["{"][1]:
+        # `[{...}, {...}]` - a top-level array, not the first object in it
+        order.reverse()
+    return [text[slice(*spans[opener])] for opener in order if opener in spans]
+
+
+def _starts_value(text):
+    """Whether `text` (after a comma) starts with something that can follow a comma in JSON."""
+    stripped = text.lstrip()
+    if not stripped or stripped[0] in "\"'\\{[}]":
+        return True
+    match = BARE_TOKEN_RE.match(stripped)
+    if not match:
+        return False
+    token = match.group(0)
+    # A literal, a number or an unquoted key
+    return token in LITERALS or bool(NUMBER_RE.match(token)) or stripped[match.end():].lstrip().startswith(":")
+
+
+def _closes_string(text, quote_end):
+    """Whether the quote ending at `quote_end` (exclusive) can close a string."""
+    rest = text[quote_end:]
+    stripped = rest.lstrip()
+    if stripped.startswith("\\") and stripped[1:2] in STRUCTURAL:
+        stripped = stripped[1:]
+    if not stripped:
+        return True
+    if stripped[0] == ",":
+        # `"He said "great", then left"` - a comma inside the text, not between values
+        return _starts_value(stripped[1:])
+    if stripped[0] in STRUCTURAL:
+        return True
+    if stripped[0] not in "\"'\\":
+        return False
+    # `"a": "x"\n "b": 1` or `"a": "x"  "b": 1` - a missing comma before the next key
+    return "\n" in rest[:len(rest) - len(stripped)] or bool(KEY_RE.match(stripped))
+
+
+def _read_string(text, i, quote, escaped_open):
+    """Read a string starting after its opening quote; return (json literal, next index)."""
+    chars = []
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\" and i + 1 < n:
+            nxt = text[i + 1]
+            if escaped_open and nxt == quote and _closes_string(text, i + 2):
+                return '"' + "".join(chars) + '"', i + 2
+            if nxt == "'":
+                chars.append("'")
+            else:
+                chars.append(ch + nxt)
+            i += 2
+            continue
+        if ch == quote and _closes_string(text, i + 1):
+            return '"' + "".join(chars) + '"', i + 1
+        if ch == '"':
+            chars.append('\\"')
+        elif ch == "\n":
+            chars.append("\\n")
+        elif ch == "\t":
+            chars.append("\\t")
+        else:
+            chars.append(ch)
+        i += 1
+    # Cut off mid-string
+    return '"' + "".join(chars).rstrip() + '"', n
+
+
+def repair_json(text):
+    """Rewrite the first object/array in `text` as valid JSON text."""
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        raise JSONRepairError("No JSON object in response")
+    i = min(starts)
+    n = len(text)
+    out = []
+    stack = []
+    need_comma = False
+
+    def emit_value(value):
+        nonlocal need_comma
+        if need_comma and stack:
+            out.append(",")
+        out.append(value)
+        need_comma = True
+
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+        elif ch == "\\" and i + 1 < n and text[i + 1] in "\"'":
+            value, i = _read_string(text, i + 2, text[i + 1], escaped_open=True)
+            emit_value(value)
+        elif ch in "\"'":
+            value, i = _read_string(text, i + 1, ch, escaped_open=False)
+            emit_value(value)
+        elif ch in CLOSERS:
+            if need_comma and stack:
+                out.append(",")
+            stack.append(ch)
+            out.append(ch)
+            need_comma = False
+            i += 1
+        elif ch in "}]":
+            i += 1
+            if ch not in (CLOSERS[opener] for opener in stack):
+                continue
+            if out[-1] == ",":
+                out.pop()
+            if out[-1] == ":":
+                out.append("null")
+            while stack:
+                closer = CLOSERS[stack.pop()]
+                out.append(closer)
+                if closer == ch:
+                    break
+            need_comma = True
+            if not stack:
+                break
+        elif ch == ",":
+            if out[-1] not in ",:[{":
+                out.append(",")
+            need_comma = False
+            i += 1
+        elif ch == ":":
+            out.append(":")
+            need_comma = False
+            i += 1
+        else:
+            match = BARE_TOKEN_RE.match(text, i)
+            if not match:
+                # Stray character (comment marker, ellipsis, ...)
+                i += 1
+                continue
+            token = match.group(0)
+            i = match.end()
+            if token in LITERALS:
+                emit_value(LITERALS[token])
+            elif NUMBER_RE.match(token):
+                emit_value(token)
+            else:
+                emit_value(json.dumps(token))
+
+    if not out:
+        raise JSONRepairError("No JSON object in response")
+    while out[-1] == ",":
+        out.pop()
+    if out[-1] == ":":
+        out.append("null")
+    while stack:
+        out.append(CLOSERS[stack.pop()])
+    return "".join(out)
+
+
+def parse_json(text):
+    """Parse the JSON object in a model reply, repairing it locally if needed.
+
+    Already-parsed dicts/lists are returned as is. Raises JSONRepairError (a
+    ValueError) when nothing usable can be recovered.
+    """
+    if isinstance(text, (dict, list)):
+        return text
+    if not isinstance(text, str):
+        raise JSONRepairError(f"Expected a string, got {type(text).__name__}")
+
+    for candidate in _candidates(text):
+        for sliced in _slices(candidate):
+            try:
+                data = json.loads(sliced)
+            except json.JSONDecodeError:
+                continue
+            _count("clean")
+            return data
+
+    for candidate in _candidates(text):
+        try:
+            data = json.loads(repair_json(candidate))
+        except ValueError:
+            continue
+        _count("repaired")
+        logger.info("Repaired malformed JSON locally")
+        return data
+
+    _count("failed")
+    raise JSONRepairError("Could not repair JSON locally")
+
+
+def record_llm_repair(succeeded):
+    """Called by the LLM repair fallback so the stats cover both paths."""
+    _count("llm_repaired" if succeeded else "llm_failed")
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+    malformed = stats["repaired"] + stats["failed"]
+    stats["local_repair_rate"] = round(stats["repaired"] / malformed, 4) if malformed else 0.0
+    stats["llm_calls"] = stats["llm_repaired"] + stats["llm_failed"]
+    return stats
@@ -0,0 +1,240 @@
+"""Content-addressed cache for LLM responses.
+
+Plugs into LangChain's `BaseCache` hook, so every `llm.invoke` / `chain.invoke`
+on a model built with `cache=get_cache()` is served from here when the same
+model, parameters and prompt were seen before. Two tiers:
+
+* an in-process LRU (per worker) for the hottest entries
+* a SQLite file shared by all workers on the box
+
+Entries expire after `TTL_SECONDS` and the disk tier is trimmed back to
+`MAX_ENTRIES` (least recently used first).
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from django.conf import settings
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    "ENABLED": True,
+    "PATH": "llm_cache.sqlite3",
+    "MEMORY_ENTRIES": 256,
+    "MAX_ENTRIES": 20000,
+    "TTL_SECONDS": 7 * 24 * 3600,
+    # Question generation samples from the model, so repeated prompts are
+    # expected to give different questions. Only cache them when asked to.
+    "CACHE_QUESTIONS": False,
+}
+
+# How many disk writes between two eviction passes
+EVICT_EVERY = 100
+
+
+def make_key(prompt: str, llm_string: str) -> str:
+    """Hash of the model name/parameters (`llm_string`) and the prompt."""
+    digest = hashlib.sha256()
+    digest.update(llm_string.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TieredLLMCache(BaseCache):
+    """In-memory LRU in front of a SQLite table shared across processes."""
+
+    def __init__(self, path, memory_entries=256, max_entries=20000, ttl_seconds=7 * 24 * 3600):
+        self.path = str(path)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (expires_at, serialized generations)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "expired": 0,
+            "evicted": 0,
+            "errors": 0,
+        }
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _remember(self, key, expires_at, value):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = make_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return loads(entry[1])
+                del self._memory[key]
+                self.counters["expired"] += 1
+
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] <= now:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._count("expired")
+                row = None
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache lookup failed: {e}")
+            self._count("errors")
+            row = None
+
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self._remember(key, row[1], row[0])
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = make_key(prompt, llm_string)
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        value = dumps(list(return_val))
+        self._remember(key, expires_at, value)
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {e}")
+            self._count("errors")
+            return
+        with self._lock:
+            self.counters["writes"] += 1
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired rows, then trim the disk tier to `max_entries`."""
+        try:
+            conn = self._connection()
+            expired = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            total = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            evicted = 0
+            if total > self.max_entries:
+                evicted = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    " SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?)",
+                    (total - self.max_entries,),
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache eviction failed: {e}")
+            self._count("errors")
+            return
+        with self._lock:
+            self.counters["expired"] += max(expired, 0)
+            self.counters["evicted"] += max(evicted, 0)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._memory.clear()
+        try:
+            self._connection().execute("DELETE FROM llm_cache")
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache clear failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        try:
+            stats["disk_entries"] = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        except sqlite3.Error:
+            stats["disk_entries"] = None
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "LLM_CACHE", {})}
+
+
+def get_cache(deterministic: bool = True) -> Optional[TieredLLMCache]:
+    """Return the shared cache, or None when caching is off for this kind of call.
+
+    Pass `deterministic=False` for sampled calls (question generation); those
+    are only cached when `LLM_CACHE["CACHE_QUESTIONS"]` is set.
+    """
+    global _cache
+    config = get_config()
+    if not config["ENABLED"]:
+        return None
+    if not deterministic and not config["CACHE_QUESTIONS"]:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TieredLLMCache(
+                config["PATH"],
+                memory_entries=config["MEMORY_ENTRIES"],
+                max_entries=config["MAX_ENTRIES"],
+                ttl_seconds=config["TTL_SECONDS"],
+            )
+    return _cache
+
+
+def stats() -> dict:
+    """Hit/miss counters for this worker plus the shared disk tier size."""
+    if _cache is None:
+        return {}
+    return _cache.stats()
@@ -0,0 +1,189 @@
+"""In-process metrics for external calls, rendered in Prometheus text format at /metrics.
+
+LLM calls are recorded by fapp_prompting's callback (every chat model gets
+it), STT and TTS calls by `track_call`. Counters and histograms are per worker
+process; the scrape also includes the stats() of the caches and queues.
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('simple_logger')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+HELP = {
+    "fakeapp_external_call_seconds": "Latency of LLM/STT/TTS calls",
+    "fakeapp_external_calls_total": "LLM/STT/TTS calls by outcome",
+    "fakeapp_llm_input_tokens": "Prompt tokens per LLM call",
+    "fakeapp_llm_output_tokens": "Completion tokens per LLM call",
+    "fakeapp_llm_retries_total": "LLM requests retried after a 429",
+    "fakeapp_json_parse_total": "Parsing of model JSON replies by outcome",
+    "fakeapp_fallback_defaults_total": "Times a default was used because a model call or its output failed",
+    "fakeapp_session_seconds": "Session load/save latency",
+    "fakeapp_session_bytes": "Encoded session payload size",
+}
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_buckets = {}  # name -> bucket bounds
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _buckets.setdefault(name, buckets)
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * len(buckets) + [0.0, 0]
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[index] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+
+def record_call(kind, site, model, seconds, outcome="ok"):
+    observe("fakeapp_external_call_seconds", seconds, kind=kind, site=site, model=model)
+    inc("fakeapp_external_calls_total", kind=kind, site=site, model=model, outcome=outcome)
+
+
+def record_tokens(site, model, input_tokens, output_tokens):
+    observe("fakeapp_llm_input_tokens", input_tokens, buckets=TOKEN_BUCKETS, site=site, model=model)
+    observe("fakeapp_llm_output_tokens", output_tokens, buckets=TOKEN_BUCKETS, site=site, model=model)
+
+
+def fallback(site):
+    """Count a default question/score/analysis used in place of a failed model call."""
+    inc("fakeapp_fallback_defaults_total", site=site)
+
+
+@contextmanager
+def track_call(kind, site, model):
+    """Time an STT/TTS (or other non-LangChain) call; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_call(kind, site, model, time.perf_counter() - start, outcome="error")
+        raise
+    record_call(kind, site, model, time.perf_counter() - start)
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = [
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in items
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and (math.isinf(value) or math.isnan(value)):
+        return "+Inf" if value > 0 else "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _gauges(prefix, stats, labels=()):
+    """Flatten a stats() dict into (name, labels, value) gauges; nested dicts become a label."""
+    for key, value in stats.items():
+        if isinstance(value, bool) or value is None:
+            continue
+        if isinstance(value, (int, float)):
+            yield f"{prefix}_{key}", labels, value
+        elif isinstance(value, dict):
+            label = "priority" if prefix.endswith("scheduler") else "name"
+            for sub_key, sub_value in value.items():
+                if isinstance(sub_value, dict):
+                    yield from _gauges(prefix, sub_value, labels + ((label, sub_key),))
+                elif isinstance(sub_value, (int, float)) and not isinstance(sub_value, bool):
+                    yield f"{prefix}_{key}", labels + (("name", sub_key),), sub_value
+
+
+def module_stats():
+    """stats() of the caches, queues and clients that keep their own counters."""
+    from . import (fapp_chat_history, fapp_clients, fapp_document_cache, fapp_interview_state,
+                   fapp_json_repair, fapp_llm_cache, fapp_prefetch, fapp_prompting, fapp_replay,
+                   fapp_scheduler, fapp_sessions, fapp_skill_context, fapp_tts_cache,
+                   fapp_write_behind)
+
+    sources = {
+        "llm_cache": fapp_llm_cache.stats,
+        "prefetch": fapp_prefetch.stats,
+        "tts_cache": fapp_tts_cache.stats,
+        "resume_cache": fapp_document_cache.resume_cache_stats,
+        "job_cache": fapp_document_cache.job_cache_stats,
+        "http": fapp_clients.stats,
+        "scheduler": fapp_scheduler.stats,
+        "chat_history": fapp_chat_history.stats,
+        "interview_state": fapp_interview_state.stats,
+        "json_repair": fapp_json_repair.stats,
+        "replay": fapp_replay.stats,
+        "sessions": fapp_sessions.stats,
+        "write_behind": fapp_write_behind.stats,
+        "skill_context": fapp_skill_context.stats,
+        # Keyed by prompt name, so nest it one level for _gauges
+        "prompts": lambda: {"by_prompt": fapp_prompting.stats()},
+    }
+    collected = {}
+    for name, source in sources.items():
+        try:
+            collected[name] = source()
+        except Exception as e:
+            logger.error(f"Could not collect {name} stats: {e}")
+    return collected
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(value) for key, value in _histograms.items()}
+        buckets = dict(_buckets)
+
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# HELP {name} {HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(buckets[name], values):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+
+    gauges = {}
+    for module, stats in module_stats().items():
+        for name, labels, value in _gauges(f"fakeapp_{module}", stats):
+            gauges.setdefault(name, []).append((labels, value))
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,117 @@
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import fapp_scheduler
+
+logger = logging.getLogger('simple_logger')
+
+# Drop the oldest speculative results beyond this many (abandoned sessions)
+MAX_PENDING = 500
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, "PREFETCH_WORKERS", 4), thread_name_prefix="prefetch")
+_lock = threading.Lock()
+_pending = {}  # (serial, question_index) -> (future, fingerprint)
+counters = {
+    "started": 0,
+    "hits": 0,
+    "misses": 0,
+    "discarded": 0,
+    "skipped": 0,
+    "shed": 0,
+    "saved_seconds": 0.0,
+    "waited_seconds": 0.0,
+}
+
+
+def is_enabled():
+    return getattr(settings, "RESUME_QUESTION_PREFETCH", False)
+
+
+def _count(name, amount=1):
+    with _lock:
+        counters[name] += amount
+
+
+def _generate(generator, state):
+    start = time.perf_counter()
+    with fapp_scheduler.collect_sheds() as sheds:
+        new_state = generator(state)
+    if sheds:
+        # The generator fell back to its default question; let the turn try again inline
+        raise fapp_scheduler.RateLimitShed("Prefetched question generation was shed by the rate limiter")
+    return new_state, time.perf_counter() - start
+
+
+def start(key, fingerprint, generator, state):
+    """Run `generator` on a copy of `state` in the background.
+
+    `fingerprint` describes the inputs the generated question depends on; the
+    result is only used by `take` when the caller's fingerprint still matches.
+    """
+    future = _executor.submit(_generate, generator, copy.deepcopy(state))
+    with _lock:
+        _pending[key] = (future, fingerprint)
+        counters["started"] += 1
+        while len(_pending) > MAX_PENDING:
+            stale_future, _ = _pending.pop(next(iter(_pending)))
+            stale_future.cancel()
+
+
+def skip():
+    """Record a turn where prefetching was pointless (the next question needs the answer)."""
+    _count("skipped")
+
+
+def take(key, fingerprint):
+    """Return the state produced by a matching prefetch, or None to generate inline."""
+    with _lock:
+        entry = _pending.pop(key, None)
+    if entry is None:
+        _count("misses")
+        return None
+    future, expected = entry
+    if expected != fingerprint:
+        future.cancel()
+        _count("discarded")
+        logger.info(f"Prefetch for {key} discarded: expected {expected}, got {fingerprint}")
+        return None
+
+    wait_start = time.perf_counter()
+    try:
+        new_state, generation_seconds = future.result()
+    except Exception as e:
+        print(f"Prefetched question generation failed: {e}")
+        _count("shed" if fapp_scheduler.is_shed(e) else "misses")
+        return None
+    waited = time.perf_counter() - wait_start
+    saved = max(generation_seconds - waited, 0.0)
+    with _lock:
+        counters["hits"] += 1
+        counters["saved_seconds"] += saved
+        counters["waited_seconds"] += waited
+    logger.info(f"Prefetch hit for {key}: generation took {generation_seconds:.2f}s, waited {waited:.2f}s, saved {saved:.2f}s")
+    return new_state
+
+
+def forget(serial):
+    """Cancel anything still pending for a finished session."""
+    with _lock:
+        keys = [key for key in _pending if key[0] == serial]
+        entries = [_pending.pop(key) for key in keys]
+    for future, _ in entries:
+        future.cancel()
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+        stats["pending"] = len(_pending)
+    used = stats["hits"] + stats["misses"] + stats["discarded"] + stats["shed"]
+    stats["hit_rate"] = round(stats["hits"] / used, 4) if used else 0.0
+    stats["avg_saved_seconds"] = round(stats["saved_seconds"] / stats["hits"], 3) if stats["hits"] else 0.0
+    return stats
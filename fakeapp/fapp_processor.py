@@ -4,20 +4,37 @@ from langchain_community.vectorstores import Chroma
 import wave
 import os
 import re
+import shutil
+import subprocess
+import tempfile
+import uuid
 
 from datetime import datetime
 import pandas as pd
 from dotenv import load_dotenv
+from django.conf import settings
 load_dotenv()
 import speech_recognition as sr
 from gtts import gTTS
 from . import fapp_resume_processor
+from . import fapp_chat_history
+from . import fapp_clients
+from . import fapp_json_repair
+from . import fapp_llm_cache
+from . import fapp_metrics
+from . import fapp_prefetch
+from . import fapp_prompting
+from . import fapp_replay
+from . import fapp_scheduler
+from . import fapp_scoring
+from . import fapp_skill_context
+from . import fapp_stt
+from . import fapp_tts_cache
+from . import fapp_write_behind
 from langchain_groq import ChatGroq
-from groq import Groq
 import json
-from fakeapp.models import InterviewResponse,IntervieweeDetails, IntervieweeSkill, skillbased_interview, resumebased_interview
+from fakeapp.models import InterviewResponse, resumebased_interview
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.chat_history import InMemoryChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 os.environ["GROQ_API_KEY"]=""
 
@@ -75,83 +92,216 @@ def extract_resume_text(file_path):
         text = textract.process(file_path).decode('utf-8')
         
     return text.strip()
-def fetch_prompt():
-    with open("prompt.txt", "r") as file:
-        prompt = file.read()
-    return prompt
-
-llm=ChatGroq(model_name="llama3-70b-8192",temperature=0.7)
-store={}
+# Skill-based questions are sampled; only cached when LLM_CACHE["CACHE_QUESTIONS"] is set
+llm=fapp_clients.get_chat_model(temperature=0.7,cache=fapp_llm_cache.get_cache(deterministic=False))
 
 def get_session_history(session_id: str) -> BaseChatMessageHistory:
-    if session_id not in store:
-        store[session_id] = InMemoryChatMessageHistory()
-    return store[session_id]
+    # Stored in ChatMessage so every worker sees the session; the model gets a bounded window
+    return fapp_chat_history.get_session_history(session_id)
 model_with_memory=RunnableWithMessageHistory(llm,get_session_history)
+class TTSBackend:
+    """Turns question text into an audio file. Selected with settings.TTS_BACKEND."""
+    name = "base"
+    extension = "mp3"
+    content_type = "audio/mpeg"
+    # Whether stream() yields playable audio before the whole text is synthesized
+    supports_streaming = False
+
+    def __init__(self, lang="en", voice=None):
+        self.lang = lang
+        self.voice = voice
+
+    def synthesize(self, text, audio_file_name):
+        raise NotImplementedError
+
+    def stream(self, text):
+        """Yield audio bytes; backends without sentence streaming yield the whole file."""
+        tmp_file_name = os.path.join(tempfile.gettempdir(), f"tts_{uuid.uuid4().hex}.{self.extension}")
+        try:
+            self.synthesize(text, tmp_file_name)
+            with open(tmp_file_name, "rb") as f:
+                yield f.read()
+        finally:
+            if os.path.exists(tmp_file_name):
+                os.remove(tmp_file_name)
+
+    def duration(self, audio_file_name):
+        """Length of the synthesized audio in seconds."""
+        with wave.open(audio_file_name, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS; one HTTPS round trip per sentence."""
+    name = "gtts"
+    supports_streaming = True
+    # gTTS returns 32 kbit/s MP3
+    BITRATE = 32000
+
+    def synthesize(self, text, audio_file_name):
+        if fapp_replay.enabled():
+            with open(audio_file_name, "wb") as f:
+                f.write(self._replayable(text))
+            return
+        gTTS(text=text, lang=self.lang, tld=self.voice or "com", slow=False).save(audio_file_name)
+
+    def stream(self, text):
+        for sentence in split_sentences(text):
+            if fapp_replay.enabled():
+                yield self._replayable(sentence)
+            else:
+                yield from gTTS(text=sentence, lang=self.lang, tld=self.voice or "com", slow=False).stream()
+
+    def _replayable(self, text):
+        """The whole MP3 for `text`, recorded or replayed by fapp_replay."""
+        return fapp_replay.call(
+            fapp_replay.TTS, [self.name, self.lang, self.voice, text],
+            lambda: b"".join(gTTS(text=text, lang=self.lang, tld=self.voice or "com", slow=False).stream())
+        )
+
+    def duration(self, audio_file_name):
+        return os.path.getsize(audio_file_name) * 8 / self.BITRATE
+
+class EspeakBackend(TTSBackend):
+    """Local espeak-ng on CPU, writes WAV."""
+    name = "espeak"
+    extension = "wav"
+    content_type = "audio/wav"
+    binary = "espeak-ng"
+
+    def synthesize(self, text, audio_file_name):
+        subprocess.run(
+            [self.binary, "-v", self.voice or self.lang, "-w", audio_file_name, text],
+            check=True, capture_output=True, timeout=60
+        )
+
+class PiperBackend(TTSBackend):
+    """Local Piper neural TTS on CPU, writes WAV. TTS_VOICES["piper"] is the path to the .onnx voice model."""
+    name = "piper"
+    extension = "wav"
+    content_type = "audio/wav"
+    binary = "piper"
+
+    def synthesize(self, text, audio_file_name):
+        if not self.voice:
+            raise ValueError('Piper needs TTS_VOICES["piper"] set to a voice model (.onnx)')
+        subprocess.run(
+            [self.binary, "--model", self.voice, "--output_file", audio_file_name],
+            input=text.encode("utf-8"), check=True, capture_output=True, timeout=60
+        )
+
+TTS_BACKENDS = {backend.name: backend for backend in (GTTSBackend, EspeakBackend, PiperBackend)}
+_tts_backend = None
+
+def get_tts_backend(name=None):
+    """Return the configured TTS backend (or `name`), falling back to gTTS when a local engine is missing."""
+    global _tts_backend
+    if name is None and _tts_backend is not None:
+        return _tts_backend
+    backend_name = name or getattr(settings, "TTS_BACKEND", "gtts")
+    backend_class = TTS_BACKENDS.get(backend_name)
+    if backend_class is None:
+        raise ValueError(f"Unknown TTS backend {backend_name!r}, expected one of {sorted(TTS_BACKENDS)}")
+    binary = getattr(backend_class, "binary", None)
+    if binary and shutil.which(binary) is None:
+        logger.error(f"TTS backend {backend_name} needs {binary} on PATH; using gtts instead")
+        backend_class = GTTSBackend
+    # Voices are backend specific, so a fallback to gTTS gets gTTS's own voice
+    voice = getattr(settings, "TTS_VOICES", {}).get(backend_class.name)
+    backend = backend_class(lang=getattr(settings, "TTS_LANG", "en"), voice=voice)
+    if name is None:
+        _tts_backend = backend
+    return backend
+
 def text_to_mp3(text, audio_file_name):
-    """Convert text to MP3 using gTTS"""
+    """Convert text to speech with the configured backend (gTTS unless TTS_BACKEND says otherwise)"""
     try:
-        tts = gTTS(text=text, lang="en", slow=False)
         # Ensure the directory exists
         os.makedirs(os.path.dirname(audio_file_name), exist_ok=True)
-        tts.save(audio_file_name)
+        backend = get_tts_backend()
+        with fapp_metrics.track_call("tts", "text_to_mp3", backend.name):
+            backend.synthesize(text, audio_file_name)
         return audio_file_name
     except Exception as e:
         print(f"Error in text_to_mp3: {str(e)}")
         return None
 
-def restructured_response(ai_response):
-    match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-    if match:
-        json_str = match.group(0)  # Extract matched JSON string
-       
-        json_data = json.loads(json_str) 
-        print("json data from restructured_response is ",json_data)
-        print(json_data)
-        # Parse JSON
-        return json_data
-        
-    
+def split_sentences(text):
+    """Split text into sentences so synthesis can start on the first one."""
+    return [sentence for sentence in re.split(r'(?<=[.!?])\s+', text.strip()) if sentence]
 
-def get_skills_by_session_id(session_id):
+def _stream_frames(backend, text, audio_file_name, on_complete):
+    partial_file_name = f"{audio_file_name}.{uuid.uuid4().hex}.part"
+    started = False
     try:
+        with open(partial_file_name, "wb") as f, fapp_metrics.track_call("tts", "stream_mp3", backend.name):
+            for chunk in backend.stream(text):
+                f.write(chunk)
+                started = True
+                yield chunk
+        os.replace(partial_file_name, audio_file_name)
+        if on_complete:
+            on_complete()
+    except Exception as e:
+        logger.error(f"Streaming TTS failed for {audio_file_name}: {e}")
+        # Before the first frame the caller can still answer with an error instead of audio
+        if not started:
+            raise
+    finally:
+        if os.path.exists(partial_file_name):
+            os.remove(partial_file_name)
 
-        interviewee = IntervieweeDetails.objects.get(session_id=session_id)
-        # getch max questions from interviewee
-        max_questions= skillbased_interview.objects.filter(interviewee=interviewee).values_list('question_count', flat=True).first()
-
-        skill_list = IntervieweeSkill.objects.filter(interviewee=interviewee).values_list('skill_name', flat=True)
-        print("skills are ", skill_list )
-
-        # skills = interviewee.skills.all()  
-        # skill_list = [skill.skill_name for skill in skills]
-
-        return skill_list, max_questions
-    except IntervieweeDetails.DoesNotExist:
-        print(f"Interviewee with session_id {session_id} does not exist.")
-        return []
-def update_prompt_with_skills(prompt,session_id):
-    skills, total_questions = get_skills_by_session_id(session_id)
-    if skills:
-        skill_str = ", ".join(skills)
-        replacements = {"thetopics": skill_str,"thismany": str(total_questions+1)}
-        updated_prompt = prompt
-        for old, new in replacements.items():
-            updated_prompt = updated_prompt.replace(old, new)
-
-        return updated_prompt
-    else:
-        print("No skills found for the given session ID.")
-        return prompt
+def _prepend(first, frames):
+    try:
+        yield first
+        yield from frames
+    finally:
+        frames.close()
+
+def stream_mp3(text, audio_file_name, on_complete=None):
+    """Synthesize `text` sentence by sentence; return an iterator over the audio frames.
+
+    The first sentence is synthesized before this returns, so a failing backend
+    raises here rather than ending a 200 response early. The frames are also
+    written to `audio_file_name` so the question can be replayed; `on_complete`
+    is called once the file is in place.
+    """
+    os.makedirs(os.path.dirname(audio_file_name), exist_ok=True)
+    frames = _stream_frames(get_tts_backend(), text, audio_file_name, on_complete)
+    first = next(frames, None)
+    if first is None:
+        raise RuntimeError(f"TTS produced no audio for {audio_file_name}")
+    return _prepend(first, frames)
+
+def question_audio_file(text, serial, question_number):
+    """Return the MEDIA_ROOT-relative audio file for a question.
+
+    With the TTS cache on, identical questions share one file; otherwise each
+    session gets Q_{n}_{serial}.mp3. Synthesis is left to views.question_audio
+    when TTS_STREAMING is on. Returns None when synthesis fails.
+    """
+    streaming = getattr(settings, "TTS_STREAMING", False)
+    if fapp_tts_cache.is_enabled():
+        if streaming:
+            return fapp_tts_cache.cache_file_name(text)
+        return fapp_tts_cache.get_or_synthesize(text)
+    file_name = f"Q_{question_number}_{serial}.{get_tts_backend().extension}"
+    if not streaming and not text_to_mp3(text, os.path.join(settings.MEDIA_ROOT, file_name)):
+        return None
+    return file_name
+
+def restructured_response(ai_response):
+    json_data = fapp_json_repair.parse_json(ai_response)
+    print("json data from restructured_response is ",json_data)
+    return json_data
 
+@fapp_scheduler.with_priority(fapp_scheduler.QUESTION)
 def fetch_question(result,serial):
-    config = {"configurable": {"session_id": serial}}
+    config = {"configurable": {"session_id": serial}, **fapp_prompting.call_config("skill_question")}
 
     data=model_with_memory.invoke((result),config=config).content
     print("data is ",data)
     try:
         response_json = restructured_response(data)
-        response_json=json.loads(response_json)
     except Exception as e:
         print("Error in restructured_response:", e)
         response_json = fapp_resume_processor.auto_repaid(data)
@@ -161,10 +311,16 @@ def fetch_question(result,serial):
         return question
 
 def fetch_prev_question(serial,counter):
-    interviewee = IntervieweeDetails.objects.get(session_id=serial)
-    # fetch question for given question number
+    context = fapp_skill_context.get(serial)
+    question = context.question(counter)
+    # Question 0 is the opening one and has no row
+    if question or counter < 1:
+        return question
+    # Asked by another worker: read it from the database
+    fapp_write_behind.wait_for_question(serial, counter)
     question = InterviewResponse.objects.filter(session_id=serial, question_number=counter).values_list('question_text', flat=True).first()
     if question:
+        context.advance(counter, question)
         return question
     else:
         print(f"No question found for session ID {serial} and question number {counter}.")
@@ -178,26 +334,84 @@ def audio_skill_processor(INPUT_FILENAME,serial,counter,max_questions):
     score=28393
     print("result is "+result)
     print("session id is "+serial)
+    context=fapp_skill_context.get(serial)
     if(counter<=max_questions):
         if counter==0:
-            prompt=fetch_prompt()
-        
-            prompt=update_prompt_with_skills(prompt,serial)
+            prompt=context.prompt
             print("the first counter")
             next_question=fetch_question(prompt,serial)
         else:
             print("counter is "+str(counter))
             next_question=fetch_question(result,serial)
             new_row = {"qno": counter+1, "cust_name": serial, "question": next_question }
-        file_name=f"Q_{counter+1}_{serial}.mp3"
-        OUTPUT_FILENAME=text_to_mp3(next_question,f"media/{file_name}")
+        file_name=question_audio_file(next_question, serial, counter+1)
     pquestion=fetch_prev_question(serial,counter)
-    eval_json=fapp_resume_processor.evaluate_response(pquestion,result)
-    score=eval_json["score"]
-    feedback=eval_json["feedback"]
-    print("modified path is "+file_name)
+    if counter<=max_questions:
+        context.advance(counter+1, next_question)
+    if fapp_scoring.is_enabled():
+        # Scored in the background; views.result waits for it
+        score, feedback = None, None
+        if counter > 0:
+            fapp_scoring.enqueue(serial, counter, pquestion, result)
+    else:
+        eval_json=fapp_resume_processor.evaluate_response(pquestion,result)
+        score=eval_json["score"]
+        feedback=eval_json["feedback"]
+    print("modified path is", file_name)
     return next_question,file_name,result,score,feedback
 
+# Questions asked per round of the resume-based interview, in order
+RESUME_ROUNDS = [("project", 3), ("technical", 4), ("scenario", 2), ("behavioral", 2)]
+RESUME_ROUND_GENERATORS = {
+    "project": fapp_resume_processor.generate_project_questions,
+    "technical": fapp_resume_processor.generate_technical_questions,
+    "scenario": fapp_resume_processor.generate_scenario_questions,
+    "behavioral": fapp_resume_processor.generate_behavioral_questions,
+}
+# Rounds whose generator reads the earlier answers given in the same round
+ADAPTIVE_ROUNDS = {"project", "technical"}
+
+def next_resume_round(question_type, question_number):
+    """Return the (question_type, question_number) of the next question to generate."""
+    for index, (round_type, limit) in enumerate(RESUME_ROUNDS):
+        if round_type != question_type:
+            continue
+        if question_number < limit:
+            return round_type, question_number
+        if index + 1 < len(RESUME_ROUNDS):
+            return RESUME_ROUNDS[index + 1][0], 0
+    return "perform_assessment", 0
+
+def next_resume_question(state, serial, counter):
+    """Append the next question of the current round, using a matching prefetch when there is one."""
+    question_type = state["current_question_type"]
+    if fapp_prefetch.is_enabled():
+        fingerprint = (question_type, state["current_question_number"], len(state.get("list_of_questions", [])))
+        prefetched = fapp_prefetch.take((serial, counter), fingerprint)
+        if prefetched is not None:
+            question = prefetched["list_of_questions"][-1]
+            state.setdefault("list_of_questions", []).append(question)
+            state.setdefault(f"{question_type}_questions", []).append(question)
+            return state
+    return RESUME_ROUND_GENERATORS[question_type](state)
+
+def prefetch_next_resume_question(state, serial, counter, answered_type=None):
+    """Start generating the question for turn `counter` while the candidate answers.
+
+    `answered_type` is the round of the question awaiting an answer. When the next
+    question belongs to that same round and the round adapts to earlier answers,
+    the prefetch would be thrown away, so it is not started.
+    """
+    question_type, question_number = next_resume_round(state["current_question_type"], state.get("current_question_number") or 0)
+    if question_type == "perform_assessment":
+        return
+    if question_type in ADAPTIVE_ROUNDS and question_type == answered_type:
+        fapp_prefetch.skip()
+        return
+    fingerprint = (question_type, question_number, len(state.get("list_of_questions", [])))
+    prefetch_state = {**state, "current_question_type": question_type, "current_question_number": question_number}
+    fapp_prefetch.start((serial, counter), fingerprint, RESUME_ROUND_GENERATORS[question_type], prefetch_state)
+
 def audio_resume_processor(INPUT_FILENAME,serial,counter,max_questions,state):
     result=audio_to_text(INPUT_FILENAME)
     print("result is "+result)
@@ -206,15 +420,27 @@ def audio_resume_processor(INPUT_FILENAME,serial,counter,max_questions,state):
     else:
         question="Tell me about yourself"
     
-    evaluate_response=fapp_resume_processor.evaluate_response(question,result)
-    score=evaluate_response["score"]
-    feedback=evaluate_response["feedback"]
-    if counter!=0:
-        state["list_of_questions"][-1]["score"]=score
-        state["list_of_questions"][-1]["feedback"]=feedback
-        state["list_of_questions"][-1]["answer"]=result
+    if fapp_scoring.batch_enabled():
+        # Everything is scored in one call by perform_batch_assessment at result time
+        score, feedback = None, None
+        if counter!=0:
+            state["list_of_questions"][-1]["answer"]=result
+    elif fapp_scoring.is_enabled():
+        # Scored in the background; views.result waits for it and merges the scores
+        score, feedback = None, None
+        if counter!=0:
+            fapp_scoring.enqueue(serial, counter, question, result)
+            state["list_of_questions"][-1]["answer"]=result
+    else:
+        evaluate_response=fapp_resume_processor.evaluate_response(question,result)
+        score=evaluate_response["score"]
+        feedback=evaluate_response["feedback"]
+        if counter!=0:
+            state["list_of_questions"][-1]["score"]=score
+            state["list_of_questions"][-1]["feedback"]=feedback
+            state["list_of_questions"][-1]["answer"]=result
     
-    print("score is "+str(score), "feedback is "+feedback)
+    print("score is "+str(score), "feedback is "+str(feedback))
     # print(question,result,score,feedback)
     if counter==0:
         question="Tell me about yourself"
@@ -223,45 +449,20 @@ def audio_resume_processor(INPUT_FILENAME,serial,counter,max_questions,state):
         state["current_question_number"]=0
         state["conversation_history"]=q_a_json
 
-    if state["current_question_type"]=="project":
-        if state["current_question_number"] < 3:
-            print("#############Inside project############################")
-            state = fapp_resume_processor.generate_project_questions(state)
-            question=state["list_of_questions"][-1]["question"]
-            state["current_question_number"] = state["current_question_number"]+1
-        elif state["current_question_number"] >= 3:
-            state["current_question_type"] = "technical"
-            state["current_question_number"] = 0
-    if state["current_question_type"]=="technical":
-        if state["current_question_number"] < 4:
-            print("#############Inside technical############################")
-            state = fapp_resume_processor.generate_technical_questions(state)
-            question=state["list_of_questions"][-1]["question"]
-            print ("latest question is ",question)
-            state["current_question_number"] += 1
-        elif state["current_question_number"] >= 4:
-            state["current_question_type"] = "scenario"
-            state["current_question_number"] = 0
-    if state["current_question_type"]=="scenario":
-        if state["current_question_number"] < 2:
-            print("#############Inside scenario############################")
-            state = fapp_resume_processor.generate_scenario_questions(state)
-            question=state["list_of_questions"][-1]["question"]
-            state["current_question_number"] += 1
-        elif state["current_question_number"] >= 2:
-            state["current_question_type"] = "behavioral"
-            state["current_question_number"] = 0
-    if state["current_question_type"]=="behavioral":
-        if state["current_question_number"] < 2:
-            print("#############Inside behavioral############################")
-            state = fapp_resume_processor.generate_behavioral_questions(state)
-            question=state["list_of_questions"][-1]["question"]
-            state["current_question_number"] += 1
-        elif state["current_question_number"] >= 2:
-            state["current_question_type"] = "perform_assessment"
-            question="thank you for your time"
-    file_name=f"Q_{counter+1}_{serial}.mp3"
-    OUTPUT_FILENAME=text_to_mp3(question,f"media/{file_name}")
+    question_type, question_number = next_resume_round(state["current_question_type"], state["current_question_number"])
+    state["current_question_type"] = question_type
+    state["current_question_number"] = question_number
+    if question_type == "perform_assessment":
+        question="thank you for your time"
+    else:
+        print(f"#############Inside {question_type}############################")
+        state = next_resume_question(state, serial, counter)
+        question=state["list_of_questions"][-1]["question"]
+        print ("latest question is ",question)
+        state["current_question_number"] += 1
+        if fapp_prefetch.is_enabled():
+            prefetch_next_resume_question(state, serial, counter + 1, answered_type=question_type)
+    file_name=question_audio_file(question, serial, counter+1)
     print(state["current_question_type"],state["current_question_number"])
     print("______________________________")
     print("list of questions is ",state["list_of_questions"])
@@ -271,26 +472,11 @@ def audio_resume_processor(INPUT_FILENAME,serial,counter,max_questions,state):
 
 
 def audio_to_text(INPUT_FILENAME):
-    try:
-        client = Groq()
-        with open(INPUT_FILENAME, "rb") as file:
-            translation = client.audio.translations.create(file=(INPUT_FILENAME, file.read()), model="whisper-large-v3")
-            text = translation["text"]
-            print("text is "+text)
-            return text
-    except Exception as e:
-        r = sr.Recognizer()
-        hellow=sr.AudioFile(INPUT_FILENAME)
-        with hellow as source:
-            audio = r.record(source)
-        try:
-            s = r.recognize_google(audio)
-            print(s)
-            return s
-        except Exception as e: 
-            print("Exception: "+str(e)) 
-            return "error"
-    
+    """Transcribe an answer with settings.STT_BACKEND, falling back to STT_FALLBACK"""
+    text = fapp_stt.transcribe(INPUT_FILENAME)
+    print("text is "+text)
+    return text
+
 def get_results_from_db(session_id):
     """Get interview results from the database"""
     responses = InterviewResponse.objects.filter(session_id=session_id).order_by('question_number')
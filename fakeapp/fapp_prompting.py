@@ -0,0 +1,178 @@
+"""Compact prompt context and per-call token accounting.
+
+`compact_json` serializes resume/JD/match data without indentation or empty
+fields, `select` keeps only the keys a prompt actually uses, and
+`trim_history` fits a round's previous answers into PROMPT_BUDGET["HISTORY_TOKENS"].
+
+`token_counter` is a LangChain callback attached to the shared chat models;
+calls tagged with `call_config("name")` are reported per name by `stats()`
+(prompt tokens and latency), so prompt sizes can be compared before/after.
+The same numbers go to fapp_metrics for /metrics.
+"""
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from langchain_core.callbacks import BaseCallbackHandler
+
+from . import fapp_metrics
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    # Previous answers sent with each question-generation call
+    "HISTORY_TOKENS": 600,
+    # Longest single answer/feedback string kept in that history
+    "FIELD_CHARS": 400,
+}
+
+# Fields of list_of_questions entries the question generators use
+HISTORY_FIELDS = ("question", "answer", "score", "feedback")
+
+try:
+    import tiktoken
+
+    # Not Llama's tokenizer, but close enough to compare prompt sizes
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "PROMPT_BUDGET", {})}
+
+
+def count_tokens(text):
+    """Token count of `text` (tiktoken when installed, otherwise ~4 characters per token)."""
+    if not isinstance(text, str):
+        text = compact_json(text)
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def prune(data):
+    """Drop None, empty strings and empty containers, recursively."""
+    if isinstance(data, dict):
+        pruned = {key: prune(value) for key, value in data.items()}
+        return {key: value for key, value in pruned.items() if value not in (None, "", [], {})}
+    if isinstance(data, (list, tuple)):
+        pruned = [prune(value) for value in data]
+        return [value for value in pruned if value not in (None, "", [], {})]
+    if isinstance(data, str):
+        return data.strip()
+    return data
+
+
+def select(data, keys):
+    """The subset of dict `data` a prompt needs."""
+    if not isinstance(data, dict):
+        return data
+    return {key: data[key] for key in keys if key in data}
+
+
+def compact_json(data):
+    return json.dumps(prune(data), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _shorten(value, limit):
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit].rstrip() + "..."
+    return value
+
+
+def trim_history(entries, max_tokens=None, fields=HISTORY_FIELDS):
+    """Compact JSON of the newest `entries` that fit in `max_tokens`, oldest first."""
+    config = get_config()
+    max_tokens = config["HISTORY_TOKENS"] if max_tokens is None else max_tokens
+    kept = []
+    used = 2
+    for entry in reversed(entries or []):
+        item = prune({field: _shorten(entry.get(field), config["FIELD_CHARS"]) for field in fields})
+        if not item:
+            continue
+        cost = count_tokens(compact_json(item)) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(item)
+        used += cost
+    kept.reverse()
+    return compact_json(kept)
+
+
+def call_config(name):
+    """RunnableConfig that tags an LLM call so its tokens and latency are reported under `name`."""
+    return {"metadata": {"prompt_name": name}}
+
+
+def _model_name(kwargs):
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model") or params.get("model_name") or "unknown"
+
+
+class TokenCounter(BaseCallbackHandler):
+    """Counts prompt tokens and latency of every chat model call, per prompt name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {}  # run_id -> (name, model, start, prompt_tokens)
+        self.calls = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        name = (metadata or {}).get("prompt_name", "untagged")
+        tokens = sum(count_tokens(message.content) for batch in messages for message in batch)
+        with self._lock:
+            self._started[run_id] = (name, _model_name(kwargs), time.perf_counter(), tokens)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        name = (metadata or {}).get("prompt_name", "untagged")
+        tokens = sum(count_tokens(prompt) for prompt in prompts)
+        with self._lock:
+            self._started[run_id] = (name, _model_name(kwargs), time.perf_counter(), tokens)
+
+    def _finish(self, run_id, completion_tokens=0, error=False):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            if started is None:
+                return
+            name, model, start, prompt_tokens = started
+            seconds = time.perf_counter() - start
+            call = self.calls.setdefault(name, {
+                "calls": 0, "errors": 0, "prompt_tokens": 0, "max_prompt_tokens": 0,
+                "completion_tokens": 0, "seconds": 0.0,
+            })
+            call["calls"] += 1
+            call["errors"] += int(error)
+            call["prompt_tokens"] += prompt_tokens
+            call["max_prompt_tokens"] = max(call["max_prompt_tokens"], prompt_tokens)
+            call["completion_tokens"] += completion_tokens
+            call["seconds"] += seconds
+        fapp_metrics.record_call("llm", name, model, seconds, outcome="error" if error else "ok")
+        if not error:
+            fapp_metrics.record_tokens(name, model, prompt_tokens, completion_tokens)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        completion = sum(
+            count_tokens(generation.text) for generations in response.generations for generation in generations
+        )
+        self._finish(run_id, completion)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+    def stats(self):
+        with self._lock:
+            calls = {name: dict(call) for name, call in self.calls.items()}
+        for call in calls.values():
+            call["avg_prompt_tokens"] = round(call["prompt_tokens"] / call["calls"], 1) if call["calls"] else 0.0
+            call["avg_seconds"] = round(call["seconds"] / call["calls"], 3) if call["calls"] else 0.0
+        return calls
+
+
+token_counter = TokenCounter()
+
+
+def stats():
+    return token_counter.stats()
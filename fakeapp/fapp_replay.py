@@ -0,0 +1,291 @@
+"""Record and replay of the external services an interview depends on.
+
+EXTERNAL_SERVICES["MODE"] selects how Groq (chat completions and audio
+translations), gTTS and Google speech recognition are reached:
+
+    "live"    call the services (default)
+    "record"  call them and also save every request/response pair under CASSETTE_DIR
+    "replay"  never touch the network: answer from the recordings, after the
+              configured LATENCY and failing ERROR_RATE of the calls
+
+Groq calls are recorded at the HTTP level in fapp_clients' transport, keyed by
+method, path and the normalized request body. gTTS and Google speech are
+recorded around the library call, keyed by the text / audio digest. Each kind
+of recording (KINDS) has its own directory and entry shape. In replay a request
+that was never recorded gets a recording of the same kind and shape (chosen by
+its key, so it is stable), unless STRICT is set; `stats()` counts those misses.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger('simple_logger')
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+DEFAULTS = {
+    "MODE": LIVE,
+    "CASSETTE_DIR": os.path.join(settings.BASE_DIR, "replay_cassettes"),
+    # Seconds added to each replayed call, as (min, max) per kind
+    "LATENCY": {"llm": (0.0, 0.0), "stt": (0.0, 0.0), "tts": (0.0, 0.0)},
+    # Share of replayed calls that fail, per kind
+    "ERROR_RATE": {"llm": 0.0, "stt": 0.0, "tts": 0.0},
+    # HTTP status of an injected Groq failure (the SDKs retry 429 and 5xx)
+    "ERROR_STATUS": 503,
+    # Raise ReplayMiss instead of serving another recording of the same kind
+    "STRICT": False,
+}
+
+# Groq chat completions, Groq audio translations (both HTTP), Google speech and gTTS
+LLM = "llm"
+STT_HTTP = "stt_http"
+STT_GOOGLE = "stt_google"
+TTS = "tts"
+KINDS = (LLM, STT_HTTP, STT_GOOGLE, TTS)
+# Fields an entry needs to be served: HTTP recordings, library-call recordings
+HTTP_FIELDS = ("status", "headers", "body")
+
+# Response headers kept with a recording; the rest describe the original connection
+KEPT_HEADERS = ("content-type",)
+# Request fields that differ between otherwise identical chat calls
+VOLATILE_FIELDS = ("user", "seed")
+
+_lock = threading.Lock()
+_recordings = {}  # kind directory -> {key: entry}, loaded on first replay
+counters = {
+    "recorded": 0,
+    "replayed": 0,
+    "misses": 0,
+    "injected_errors": 0,
+    "injected_latency_seconds": 0.0,
+}
+
+
+class ReplayMiss(LookupError):
+    """Replay mode got a request with no usable recording."""
+
+
+class InjectedError(RuntimeError):
+    """A replayed call failed on purpose (EXTERNAL_SERVICES["ERROR_RATE"])."""
+
+
+def get_config():
+    config = {**DEFAULTS, **getattr(settings, "EXTERNAL_SERVICES", {})}
+    config["LATENCY"] = {**DEFAULTS["LATENCY"], **config["LATENCY"]}
+    config["ERROR_RATE"] = {**DEFAULTS["ERROR_RATE"], **config["ERROR_RATE"]}
+    return config
+
+
+def mode():
+    value = get_config()["MODE"]
+    if value not in (LIVE, RECORD, REPLAY):
+        raise ValueError(f"Unknown EXTERNAL_SERVICES mode {value!r}, expected live, record or replay")
+    return value
+
+
+def enabled():
+    """True when calls are recorded or replayed rather than just made."""
+    return mode() != LIVE
+
+
+def make_key(kind, parts):
+    payload = json.dumps([kind, parts], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def service(kind):
+    """The LATENCY / ERROR_RATE key of a kind of recording ("stt_http" -> "stt")."""
+    return kind.split("_")[0]
+
+
+def _kind_dir(kind):
+    return os.path.join(get_config()["CASSETTE_DIR"], kind)
+
+
+def _save(kind, key, entry):
+    directory = _kind_dir(kind)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}.json")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+    with _lock:
+        counters["recorded"] += 1
+        if directory in _recordings:
+            _recordings[directory][key] = entry
+
+
+def _load(kind):
+    directory = _kind_dir(kind)
+    with _lock:
+        if directory in _recordings:
+            return _recordings[directory]
+    entries = {}
+    if os.path.isdir(directory):
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, file_name), encoding="utf-8") as f:
+                    entries[file_name[:-len(".json")]] = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable recording {file_name}: {e}")
+    with _lock:
+        return _recordings.setdefault(directory, entries)
+
+
+def has_recordings():
+    return any(_load(kind) for kind in KINDS)
+
+
+def _is_http(entry):
+    return all(field in entry for field in HTTP_FIELDS)
+
+
+def _is_result(entry):
+    return "text" in entry or "bytes" in entry
+
+
+def _lookup(kind, key, usable):
+    """The recording for `key`, or a stand-in of the same kind when it was never recorded.
+
+    Only entries for which `usable(entry)` is true are served; ReplayMiss when there are none.
+    """
+    entries = _load(kind)
+    entry = entries.get(key)
+    if entry is not None and usable(entry):
+        with _lock:
+            counters["replayed"] += 1
+        return entry
+    with _lock:
+        counters["misses"] += 1
+    keys = [] if get_config()["STRICT"] else sorted(name for name, entry in entries.items() if usable(entry))
+    if not keys:
+        raise ReplayMiss(f"No usable {kind} recording for {key[:12]} in {_kind_dir(kind)}")
+    return entries[keys[int(key, 16) % len(keys)]]
+
+
+def _inject(kind):
+    """Sleep for the configured latency; True when this call should fail."""
+    config = get_config()
+    low, high = config["LATENCY"].get(service(kind), (0.0, 0.0))
+    delay = random.uniform(low, high)
+    if delay > 0:
+        time.sleep(delay)
+    failed = random.random() < config["ERROR_RATE"].get(service(kind), 0.0)
+    with _lock:
+        counters["injected_latency_seconds"] += delay
+        counters["injected_errors"] += int(failed)
+    return failed
+
+
+def call(kind, parts, func):
+    """Run `func()` (which returns bytes or a str) live, recorded or replayed, keyed by `parts`."""
+    current = mode()
+    if current == LIVE:
+        return func()
+    key = make_key(kind, parts)
+    if current == RECORD:
+        result = func()
+        if isinstance(result, bytes):
+            _save(kind, key, {"parts": parts, "bytes": base64.b64encode(result).decode("ascii")})
+        else:
+            _save(kind, key, {"parts": parts, "text": result})
+        return result
+    if _inject(kind):
+        raise InjectedError(f"Injected {kind} failure")
+    entry = _lookup(kind, key, _is_result)
+    if "bytes" in entry:
+        return base64.b64decode(entry["bytes"])
+    return entry["text"]
+
+
+def http_kind(request):
+    return STT_HTTP if "/audio/" in request.url.path else LLM
+
+
+def normalize_body(request):
+    """Request body with the parts that change between identical calls taken out."""
+    body = request.content
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return hashlib.sha256(body).hexdigest()
+        for field in VOLATILE_FIELDS:
+            data.pop(field, None)
+        return data
+    boundary = re.search(r"boundary=([^;]+)", content_type)
+    if boundary:
+        body = body.replace(boundary.group(1).strip('"').encode("ascii"), b"BOUNDARY")
+        # The uploaded file is named after the session's audio path
+        body = re.sub(rb'filename="[^"]*"', b'filename=""', body)
+    return hashlib.sha256(body).hexdigest()
+
+
+def send_http(request, send_request):
+    """Transport hook for Groq requests; `send_request` makes the real call."""
+    current = mode()
+    # Only API calls are POSTs; the warm-up HEAD and the like go straight through
+    if current == LIVE or request.method != "POST":
+        return send_request(request)
+    request.read()
+    kind = http_kind(request)
+    key = make_key(kind, [request.method, request.url.path, normalize_body(request)])
+    if current == RECORD:
+        response = send_request(request)
+        response.read()
+        # Rate-limit and server errors are not what a replay should serve back
+        if response.status_code < 500 and response.status_code != 429:
+            _save(kind, key, {
+                "path": request.url.path,
+                "status": response.status_code,
+                "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+                "body": response.text,
+            })
+        return response
+    if _inject(kind):
+        return httpx.Response(
+            get_config()["ERROR_STATUS"],
+            headers={"content-type": "application/json"},
+            content=json.dumps({"error": {"message": "Injected failure", "type": "replay"}}).encode("utf-8"),
+            request=request,
+        )
+    entry = _lookup(kind, key, _is_http)
+    return httpx.Response(
+        entry["status"],
+        headers=entry["headers"],
+        content=entry["body"].encode("utf-8"),
+        request=request,
+    )
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+        loaded = {directory: len(entries) for directory, entries in _recordings.items()}
+    stats["loaded"] = {kind: loaded[_kind_dir(kind)] for kind in KINDS if _kind_dir(kind) in loaded}
+    stats["mode"] = mode()
+    return stats
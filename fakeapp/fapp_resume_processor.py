@@ -1,6 +1,10 @@
 from typing import Dict, List, Annotated, TypedDict, Tuple, Optional
 import os
+import copy
 import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
@@ -12,6 +16,12 @@ from IPython.display import Image, display
 from langchain_groq import ChatGroq
 from langchain_core.caches import BaseCache
 import pandas as pd
+from . import fapp_clients
+from . import fapp_json_repair
+from . import fapp_llm_cache
+from . import fapp_metrics
+from . import fapp_prompting
+from . import fapp_scheduler
 ChatGroq.model_rebuild()
 os.environ["GROQ_API_KEY"] =""
 # Define State Types
@@ -62,6 +72,8 @@ class InterviewState(TypedDict):
     resume_data: Optional[ResumeData]
     job_data: Optional[JobData]
     match_analysis: Optional[MatchAnalysis]
+    # Compact profile built once from the three above; what the question generators send
+    candidate_digest: Optional[Dict]
     technical_questions: List[InterviewQuestion]
     project_questions: List[InterviewQuestion]
     scenario_questions: List[InterviewQuestion]
@@ -74,7 +86,11 @@ class InterviewState(TypedDict):
     current_step: str
 
 # Initialize LLM
-llm=ChatGroq(model_name="llama3-70b-8192")
+# Extraction, JSON repair, evaluation and assessment go through the response cache;
+# question generation is sampled and only cached when LLM_CACHE["CACHE_QUESTIONS"] is set
+llm=fapp_clients.get_chat_model(cache=fapp_llm_cache.get_cache())
+question_llm=fapp_clients.get_chat_model(cache=fapp_llm_cache.get_cache(deterministic=False))
+logger = logging.getLogger('simple_logger')
 
 # Function nodes for the graph
 def initialize_state(state: InterviewState) -> InterviewState:
@@ -85,6 +101,7 @@ def initialize_state(state: InterviewState) -> InterviewState:
         "resume_data": None,
         "job_data": None,
         "match_analysis": None,
+        "candidate_digest": None,
         "technical_questions": [],
         "project_questions": [],
         "scenario_questions": [],
@@ -97,6 +114,7 @@ def initialize_state(state: InterviewState) -> InterviewState:
         "current_step": "extract_resume_data"
     }
 
+@fapp_scheduler.with_priority(fapp_scheduler.BACKGROUND)
 def extract_resume_data(state: InterviewState) -> InterviewState:
     """Extract structured data from resume."""
     resume = state["resume"]
@@ -154,12 +172,13 @@ def extract_resume_data(state: InterviewState) -> InterviewState:
     
     try:
       
-        resume_data = chain.invoke({"resume": resume})
+        resume_data = chain.invoke({"resume": resume}, config=fapp_prompting.call_config("extract_resume_data"))
 
         return {**state, "resume_data": resume_data, "current_step": "extract_job_data"}
     except Exception as e:
         # Handle parsing errors gracefully
         print(f"Error extracting resume data: {e}")
+        fapp_metrics.fallback("extract_resume_data")
         default_data = {
             "skills": {},
             "projects": [],
@@ -169,6 +188,16 @@ def extract_resume_data(state: InterviewState) -> InterviewState:
         return {**state, "resume_data": default_data, "current_step": "extract_job_data"}
         
 
+# Fallback used when the job description can't be parsed
+DEFAULT_JOB_DATA = {
+    "top_skills": {"technical_skills": ["Python", "Data processing"], "soft_skills": ["Communication", "Problem-solving"]},
+    "preferred_skills": ["Cloud platforms", "Database management"],
+    "roles_responsibilities": ["Code development", "System optimization"],
+    "behavioral_requirements": ["Team collaboration", "Learning mindset"],
+    "domain": "Technology"
+}
+
+@fapp_scheduler.with_priority(fapp_scheduler.BACKGROUND)
 def extract_job_data(state: InterviewState) -> InterviewState:
     """Extract structured data from job description."""
     job_description = state["job_description"]
@@ -204,17 +233,15 @@ def extract_job_data(state: InterviewState) -> InterviewState:
     try:
         print("Parsing job description...")
         # Use the LLM directly to get raw text response
-        raw_response = llm.invoke(prompt)
+        raw_response = llm.invoke(prompt, config=fapp_prompting.call_config("extract_job_data"))
         
         # Extract content from the response
         response_text = raw_response.content
         
         # Try to parse the JSON
         try:
-            # Remove any text before the first '{' and after the last '}'
-            clean_json_str = response_text[response_text.find('{'):response_text.rfind('}')+1]
-            job_data = json.loads(clean_json_str)
-        except json.JSONDecodeError as e:
+            job_data = fapp_json_repair.parse_json(response_text)
+        except ValueError as e:
             print(f"Initial JSON parsing failed: {e}")
             
             # Attempt to fix the JSON using the LLM
@@ -226,23 +253,20 @@ def extract_job_data(state: InterviewState) -> InterviewState:
 
                 Return ONLY the fixed JSON object with no explanations"""
             try:
-                fix_response = llm.invoke(fix_prompt)
+                fix_response = llm.invoke(fix_prompt, config=fapp_prompting.call_config("json_repair"))
                 fixed_text = fix_response.content
                 
                 # Find JSON-like content in the response
                 clean_json_str = fixed_text[fixed_text.find('{'):fixed_text.rfind('}')+1]
                 job_data = json.loads(clean_json_str)
+                fapp_json_repair.record_llm_repair(True)
                 print("Successfully fixed malformed JSON")
             except Exception as fix_e:
+                fapp_json_repair.record_llm_repair(False)
                 print(f"Failed to fix JSON: {fix_e}")
                 # Use default data
-                job_data = {
-                    "top_skills": {"technical_skills": ["Python", "Data processing"], "soft_skills": ["Communication", "Problem-solving"]},
-                    "preferred_skills": ["Cloud platforms", "Database management"],
-                    "roles_responsibilities": ["Code development", "System optimization"],
-                    "behavioral_requirements": ["Team collaboration", "Learning mindset"],
-                    "domain": "Technology"
-                }
+                fapp_metrics.fallback("extract_job_data")
+                job_data = copy.deepcopy(DEFAULT_JOB_DATA)
         
         # Make sure all required keys are present
         if "top_skills" not in job_data:
@@ -266,15 +290,10 @@ def extract_job_data(state: InterviewState) -> InterviewState:
         return {**state, "job_data": job_data, "current_step": "perform_match_analysis"}
     except Exception as e:
         print(f"Error extracting job data: {e}")
-        default_data = {
-            "top_skills": {"technical_skills": ["Python", "Data processing"], "soft_skills": ["Communication", "Problem-solving"]},
-            "preferred_skills": ["Cloud platforms", "Database management"],
-            "roles_responsibilities": ["Code development", "System optimization"],
-            "behavioral_requirements": ["Team collaboration", "Learning mindset"],
-            "domain": "Technology"
-        }
-        return {**state, "job_data": default_data, "current_step": "perform_match_analysis"}
+        fapp_metrics.fallback("extract_job_data")
+        return {**state, "job_data": copy.deepcopy(DEFAULT_JOB_DATA), "current_step": "perform_match_analysis"}
 
+@fapp_scheduler.with_priority(fapp_scheduler.BACKGROUND)
 def perform_match_analysis(state: InterviewState) -> InterviewState:
     """Analyze the match between resume and job requirements."""
     resume_data = state.get("resume_data", {})
@@ -296,10 +315,10 @@ def perform_match_analysis(state: InterviewState) -> InterviewState:
     prompt = f"""Compare the candidate's resume with the job requirements and analyze the match.
 
         Resume data:
-        {json.dumps(resume_data, indent=2)}
+        {fapp_prompting.compact_json(fapp_prompting.select(resume_data, ("skills", "projects", "experience")))}
 
         Job data:
-        {json.dumps(job_data, indent=2)}
+        {fapp_prompting.compact_json(fapp_prompting.select(job_data, ("top_skills", "preferred_skills", "roles_responsibilities", "domain")))}
 
         Provide an analysis of the match in valid JSON format with these fields:
         1. matching_skills: Array of skills that appear in both resume and job
@@ -322,15 +341,13 @@ def perform_match_analysis(state: InterviewState) -> InterviewState:
     try:
         print("Performing match analysis...")
         # Get raw LLM response
-        raw_response = llm.invoke(prompt)
+        raw_response = llm.invoke(prompt, config=fapp_prompting.call_config("match_analysis"))
         response_text = raw_response.content
         
         # Try to parse the JSON
         try:
-            # Remove any text before the first '{' and after the last '}'
-            clean_json_str = response_text[response_text.find('{'):response_text.rfind('}')+1]
-            match_analysis = json.loads(clean_json_str)
-        except json.JSONDecodeError as e:
+            match_analysis = fapp_json_repair.parse_json(response_text)
+        except ValueError as e:
             print(f"Initial JSON parsing failed: {e}")
             
             # Attempt to fix the JSON using the LLM
@@ -343,16 +360,19 @@ def perform_match_analysis(state: InterviewState) -> InterviewState:
             Return ONLY the fixed JSON object with no explanations:"""
             
             try:
-                fix_response = llm.invoke(fix_prompt)
+                fix_response = llm.invoke(fix_prompt, config=fapp_prompting.call_config("json_repair"))
                 fixed_text = fix_response.content
                 
                 # Find JSON-like content in the response
                 clean_json_str = fixed_text[fixed_text.find('{'):fixed_text.rfind('}')+1]
                 match_analysis = json.loads(clean_json_str)
+                fapp_json_repair.record_llm_repair(True)
                 print("Successfully fixed malformed JSON")
             except Exception as fix_e:
+                fapp_json_repair.record_llm_repair(False)
                 print(f"Failed to fix JSON: {fix_e}")
                 # Use default data
+                fapp_metrics.fallback("match_analysis")
                 match_analysis = {
                     "matching_skills": ["Python", "Communication"],
                     "missing_skills": ["Data processing frameworks"],
@@ -395,6 +415,7 @@ def perform_match_analysis(state: InterviewState) -> InterviewState:
         return {**state, "match_analysis": match_analysis, "current_step": "generate_technical_questions"}
     except Exception as e:
         print(f"Error performing match analysis: {e}")
+        fapp_metrics.fallback("match_analysis")
         default_analysis = {
             "matching_skills": ["Python", "Communication"],
             "missing_skills": ["Data processing frameworks"],
@@ -406,11 +427,173 @@ def perform_match_analysis(state: InterviewState) -> InterviewState:
         }
         return {**state, "match_analysis": default_analysis, "current_step": "generate_technical_questions"}
 
+# Fallback questions used when generation fails (also pre-rendered by warm_tts_cache)
+DEFAULT_TECHNICAL_QUESTION = {
+    "question": f"Based on your experience, how would you implement a solution for processing large datasets efficiently?",
+    "expected_answer": "The candidate should discuss specific algorithms, tools, or frameworks they would use."
+}
+
+DEFAULT_PROJECT_QUESTIONS = [
+    {
+        "question": "Please describe your most challenging project and how you approached it.",
+        "expected_answer": "Describe the project, challenges faced, and solutions implemented"
+    },
+    {
+        "question": "How did you handle a situation where project requirements changed significantly?",
+        "expected_answer": "explain few examples of how you adapted to changes"
+    },
+    {
+        "question": "Tell me about a time you collaborated with others on a technical project.",
+        "expected_answer": "Describe the project, your role, and how you worked with others"
+    }
+]
+
+DEFAULT_BEHAVIORAL_QUESTIONS = [
+    {
+        "question": "Tell me about a time when you had to adapt to a significant change at work.",
+        "expected_answer": "Describe the change, your response, and the outcome"
+    },
+    {
+        "question": "Describe a situation where you had to work with a difficult team member.",
+        "expected_answer": "Explain the conflict, your approach to resolution, and the result"
+    }
+]
+
+DEFAULT_SCENARIO_QUESTIONS = [
+    {
+        "question": "Imagine you're facing a tight deadline with competing priorities. How would you approach this situation?",
+        "expected_answer": "I would prioritize tasks based on urgency and impact, communicate with stakeholders, and focus on delivering the most critical work first."
+    },
+    {
+        "question": "Describe how you would handle a situation where a critical system you're responsible for fails in production.",
+        "expected_answer": "I would immediately assess the situation, communicate with the team, and implement a rollback or fix while keeping stakeholders informed."
+    }
+]
+
+# Limits on what goes into the candidate digest
+DIGEST_SKILLS = 12
+DIGEST_PROJECTS = 3
+DIGEST_EXPERIENCE = 3
+DIGEST_RESPONSIBILITIES = 5
+DIGEST_TEXT_CHARS = 240
+
+def _job_skill_names(job_data):
+    top_skills = job_data.get("top_skills") or {}
+    if isinstance(top_skills, dict):
+        return list(top_skills.get("technical_skills") or []) + list(top_skills.get("soft_skills") or [])
+    return list(top_skills) if isinstance(top_skills, list) else []
+
+def _short(text, limit=DIGEST_TEXT_CHARS):
+    text = " ".join(str(text or "").split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+def build_candidate_digest(state: InterviewState) -> InterviewState:
+    """Summarize resume, job and match data once so each question prompt sends a small profile.
+
+    Projects are ranked by how many job skills their technologies and description mention.
+    """
+    resume_data = state.get("resume_data") or {}
+    job_data = state.get("job_data") or {}
+    match_analysis = state.get("match_analysis") or {}
+
+    matching = list(match_analysis.get("matching_skills") or [])
+    job_skills = _job_skill_names(job_data)
+    wanted = {skill.lower() for skill in matching + job_skills if isinstance(skill, str)}
+
+    skills = resume_data.get("skills") or {}
+    if isinstance(skills, dict):
+        # Skills the job asks for first, then the rest in resume order
+        ordered = sorted(skills.items(), key=lambda item: item[0].lower() not in wanted)
+        resume_skills = {name: level for name, level in ordered[:DIGEST_SKILLS]}
+    else:
+        resume_skills = list(skills)[:DIGEST_SKILLS]
+
+    def relevance(project):
+        text = " ".join([str(project.get("description", ""))] + [str(t) for t in project.get("technologies") or []]).lower()
+        return sum(skill in text for skill in wanted)
+
+    projects = [project for project in resume_data.get("projects") or [] if isinstance(project, dict)]
+    key_projects = [
+        {
+            "title": project.get("title"),
+            "technologies": project.get("technologies"),
+            "summary": _short(project.get("description")),
+            "outcomes": (project.get("outcomes") or [])[:2],
+        }
+        for project in sorted(projects, key=relevance, reverse=True)[:DIGEST_PROJECTS]
+    ]
+    experience = [
+        {
+            "role": job.get("role"),
+            "company": job.get("company"),
+            "duration": job.get("duration"),
+            "highlights": [_short(item, 120) for item in (job.get("responsibilities") or [])[:2]],
+        }
+        for job in (resume_data.get("experience") or [])[:DIGEST_EXPERIENCE]
+        if isinstance(job, dict)
+    ]
+    experience_match = match_analysis.get("experience_match") or {}
+    if isinstance(experience_match, dict):
+        experience_match = {
+            "rating": experience_match.get("rating"),
+            "explanation": _short(experience_match.get("explanation")),
+        }
+
+    digest = fapp_prompting.prune({
+        "resume_skills": resume_skills,
+        "matching_skills": matching,
+        "missing_skills": list(match_analysis.get("missing_skills") or []),
+        "skill_match_percentage": match_analysis.get("skill_match_percentage"),
+        "experience_match": experience_match,
+        "key_projects": key_projects,
+        "experience": experience,
+        "job_top_skills": job_data.get("top_skills"),
+        "top_responsibilities": (job_data.get("roles_responsibilities") or [])[:DIGEST_RESPONSIBILITIES],
+        "behavioral_requirements": job_data.get("behavioral_requirements"),
+        "domain": job_data.get("domain", "Technology"),
+    })
+    logger.info(f"Candidate digest: {fapp_prompting.count_tokens(digest)} tokens")
+    return {**state, "candidate_digest": digest}
+
+def get_candidate_digest(state: InterviewState) -> Dict:
+    """The session's digest; built on the fly for sessions started before digests existed."""
+    return state.get("candidate_digest") or build_candidate_digest(state)["candidate_digest"]
+
+def run_onboarding_pipeline(state: InterviewState, concurrent: bool = True) -> InterviewState:
+    """Extract resume and job data, perform the match analysis and build the candidate digest.
+
+    Resume and job description extraction don't depend on each other, so with
+    `concurrent` they run side by side and match analysis starts as soon as
+    both have finished. With `concurrent=False` the steps run one after another.
+    Extraction is skipped for `resume_data` / `job_data` already present (cached).
+    """
+    start = time.perf_counter()
+    steps = []
+    if not state.get("resume_data"):
+        steps.append(("resume_data", extract_resume_data))
+    if not state.get("job_data"):
+        steps.append(("job_data", extract_job_data))
+
+    if concurrent and len(steps) > 1:
+        with ThreadPoolExecutor(max_workers=len(steps)) as executor:
+            futures = [(key, executor.submit(step, state)) for key, step in steps]
+            results = {key: future.result()[key] for key, future in futures}
+    else:
+        results = {key: step(state)[key] for key, step in steps}
+
+    state = {**state, **results, "current_step": "perform_match_analysis"}
+    state = perform_match_analysis(state)
+    state = build_candidate_digest(state)
+    elapsed = time.perf_counter() - start
+    mode = "concurrent" if concurrent else "sequential"
+    print(f"Onboarding pipeline ({mode}) finished in {elapsed:.2f}s")
+    logger.info(f"Onboarding pipeline ({mode}) finished in {elapsed:.2f}s")
+    return state
+
+@fapp_scheduler.with_priority(fapp_scheduler.QUESTION)
 def generate_technical_questions(state: InterviewState) -> InterviewState:
     """Generate a single technical interview question based on matching skills and previous responses."""
-    resume_data = state["resume_data"]
-    job_data = state["job_data"]
-    match_analysis = state["match_analysis"]
+    digest = get_candidate_digest(state)
     current_question_index = state.get("current_question_index", 0)
     technical_questions = state.get("technical_questions", [])
     
@@ -462,27 +645,24 @@ def generate_technical_questions(state: InterviewState) -> InterviewState:
         Previous responses: {previous_responses}""")
     ])
     
-    chain = prompt | llm 
+    chain = prompt | question_llm 
     
     try:
         response = chain.invoke({
-            "resume_skills": resume_data["skills"],
-            "job_top_skills": job_data["top_skills"],
-            "matching_skills": match_analysis["matching_skills"],
-            "missing_skills": match_analysis["missing_skills"],
+            "resume_skills": fapp_prompting.compact_json(digest.get("resume_skills")),
+            "job_top_skills": fapp_prompting.compact_json(digest.get("job_top_skills")),
+            "matching_skills": fapp_prompting.compact_json(digest.get("matching_skills")),
+            "missing_skills": fapp_prompting.compact_json(digest.get("missing_skills")),
             "question_number": current_question_index + 1,
-            "previous_responses": previous_responses
-        }).content
+            "previous_responses": fapp_prompting.trim_history(previous_responses)
+        }, config=fapp_prompting.call_config("technical_question")).content
 
 
         
         # Ensure the response is well-formed JSON
         try:
             if isinstance(response, str):
-                
-                modified_text = response[response.find('{'):response.rfind('}')+1]
-
-                question = json.loads(modified_text)
+                question = fapp_json_repair.parse_json(response)
             else:
                 # Use the response directly if it's already parsed
                 question = response
@@ -511,10 +691,8 @@ def generate_technical_questions(state: InterviewState) -> InterviewState:
         }
     except Exception as e:
         print(f"Error generating technical question: {e}")
-        default_question = {
-            "question": f"Based on your experience, how would you implement a solution for processing large datasets efficiently?",
-            "expected_answer": "The candidate should discuss specific algorithms, tools, or frameworks they would use."
-        }
+        fapp_metrics.fallback("technical_question")
+        default_question = dict(DEFAULT_TECHNICAL_QUESTION)
         
         technical_questions.append(default_question)
         question_list=state["list_of_questions"] 
@@ -525,38 +703,17 @@ def generate_technical_questions(state: InterviewState) -> InterviewState:
             "technical_questions": technical_questions
         }
 
+@fapp_scheduler.with_priority(fapp_scheduler.QUESTION)
 def generate_project_questions(state: InterviewState) -> InterviewState:
     """Generate questions about the candidate's projects and work experience."""
 
-    resume_data = state.get("resume_data", {})
-    job_data = state.get("job_data", {})
+    digest = get_candidate_digest(state)
     state["current_question_type"]="project"
     current_question_index = state.get("current_question_index", 0)
     project_questions = state.get("project_questions", [])
     project_responses = [resp for resp in state.get("responses", []) if resp.get("question_type") == "project"]
-    # Ensure we have the necessary data structures
-    if not resume_data:
-        resume_data = {"projects": [], "experience": []}
-        
-    if not job_data:
-        job_data = {"roles_responsibilities": []}
     # Create default questions in case of failure
-    default_questions = [
-        {
-            "question": "Please describe your most challenging project and how you approached it.",
-            "expected_answer": "Describe the project, challenges faced, and solutions implemented",
-            
-        },
-        {
-            "question": "How did you handle a situation where project requirements changed significantly?",
-            "expected_answer": "explain few examples of how you adapted to changes",
-     
-        },
-        {
-            "question": "Tell me about a time you collaborated with others on a technical project.",
-            "expected_answer": "Describe the project, your role, and how you worked with others", 
-        }
-    ]
+    default_questions = copy.deepcopy(DEFAULT_PROJECT_QUESTIONS)
     
     try:
         print("Generating project questions...")
@@ -606,22 +763,19 @@ def generate_project_questions(state: InterviewState) -> InterviewState:
         
         
             # Get response
-        chain = prompt | llm 
+        chain = prompt | question_llm 
         response = chain.invoke({
-        "resume": resume_data,
-        "job_description": job_data,
+        "resume": fapp_prompting.compact_json(fapp_prompting.select(digest, ("resume_skills", "key_projects", "experience"))),
+        "job_description": fapp_prompting.compact_json(fapp_prompting.select(digest, ("job_top_skills", "top_responsibilities", "domain"))),
         
         "question_number": current_question_index + 1,
-        "project_responses": previous_responses
-        }).content
+        "project_responses": fapp_prompting.trim_history(previous_responses)
+        }, config=fapp_prompting.call_config("project_question")).content
         
         # Ensure the response is well-formed JSON
         try:
             if isinstance(response, str):
-                # Remove any text before the first '{' and after the last '}'
-                modified_text = response[response.find('{'):response.rfind('}')+1]
-                # Try to parse the string as JSON if it's a string
-                question = json.loads(modified_text)
+                question = fapp_json_repair.parse_json(response)
             else:
                 # Use the response directly if it's already parsed
                 question = response
@@ -646,6 +800,7 @@ def generate_project_questions(state: InterviewState) -> InterviewState:
         }
     except Exception as e:
             print(f"Error generating project question: {e}")
+            fapp_metrics.fallback("project_question")
             if len(project_questions) < len(default_questions):
                 q=default_questions[len(project_questions)]
                 
@@ -658,32 +813,21 @@ def generate_project_questions(state: InterviewState) -> InterviewState:
             return {**state, "project_questions": project_questions,"list_of_questions": question_list}
 
 
+@fapp_scheduler.with_priority(fapp_scheduler.QUESTION)
 def generate_behavioral_questions(state: InterviewState) -> InterviewState:
     """Generate questions about the candidate's projects and work experience."""
-    job_data=state.get("job_data", {})
-    if not job_data:
-        job_data = {"behavioral_requirements": [], "domain": "Technology"}
+    digest = get_candidate_digest(state)
     state["current_question_type"]="behavioral"
     company_name=state["company_name"]
-    domain = job_data.get("domain", "Technology")
-    behavioral_reqs = job_data.get("behavioral_requirements", [])
+    domain = digest.get("domain", "Technology")
+    behavioral_reqs = digest.get("behavioral_requirements", [])
   
     current_question_index = state.get("current_question_index", 0)
     behavioral_questions = state.get("behavioral_questions", [])
     behavioral_responses = [resp for resp in state.get("responses", []) if resp.get("question_type") == "behavioral"]
     
     # Create default questions in case of failure
-    default_questions = [
-      {
-            "question": "Tell me about a time when you had to adapt to a significant change at work.",
-             
-            "expected_answer": "Describe the change, your response, and the outcome"
-        },
-        {
-            "question": "Describe a situation where you had to work with a difficult team member.",
-            "expected_answer": "Explain the conflict, your approach to resolution, and the result"
-        }
-    ]
+    default_questions = copy.deepcopy(DEFAULT_BEHAVIORAL_QUESTIONS)
     
     try:
         print("Generating behavioral questions...")
@@ -723,20 +867,17 @@ Double check that your JSON has a comma between the "question" field and the "ex
         ])
         
         # Get response
-        chain = prompt | llm
+        chain = prompt | question_llm
         response = chain.invoke({
             "company_name": company_name,
-            "behavioral_reqs": behavioral_reqs,
+            "behavioral_reqs": fapp_prompting.compact_json(behavioral_reqs),
             "domain": domain
-        }).content
+        }, config=fapp_prompting.call_config("behavioral_question")).content
         
         # Ensure the response is well-formed JSON
         try:
             if isinstance(response, str):
-                # Remove any text before the first '{' and after the last '}'
-                modified_text = response[response.find('{'):response.rfind('}')+1]
-                # Try to parse the string as JSON if it's a string
-                question = json.loads(modified_text)
+                question = fapp_json_repair.parse_json(response)
             else:
                 # Use the response directly if it's already parsed
                 question = response
@@ -762,6 +903,7 @@ Double check that your JSON has a comma between the "question" field and the "ex
         }
     except Exception as e:
             print(f"Error generating behavioral question: {e}")
+            fapp_metrics.fallback("behavioral_question")
             # Safely get a default question
             if len(behavioral_questions) < len(default_questions):
                 default_q = default_questions[len(behavioral_questions)]
@@ -774,36 +916,21 @@ Double check that your JSON has a comma between the "question" field and the "ex
             
             return {**state, "behavioral_questions": behavioral_questions,"list_of_questions": question_list}
 
+@fapp_scheduler.with_priority(fapp_scheduler.QUESTION)
 def generate_scenario_questions(state: InterviewState) -> InterviewState:
     """Generate questions about the candidate's projects and work experience."""
-    match_analysis = state.get("match_analysis", {})
-    job_data = state.get("job_data", {})
-    if not job_data:
-        job_data = {"scenario_requirements": [], "domain": "Technology"}
+    digest = get_candidate_digest(state)
     state["current_question_type"]="scenario"
-    if not match_analysis:
-        match_analysis = {"experience_match": {"rating": "Not evaluated", "explanation": "No evaluation available"}}
-    responsibilities = job_data.get("roles_responsibilities", [])
-    domain = job_data.get("domain", "Technology")
-    experience_match = match_analysis.get("experience_match", {"rating": "Not evaluated", "explanation": "No evaluation available"})
+    responsibilities = digest.get("top_responsibilities", [])
+    domain = digest.get("domain", "Technology")
+    experience_match = digest.get("experience_match", {"rating": "Not evaluated", "explanation": "No evaluation available"})
   
     current_question_index = state.get("current_question_index", 0)
     scenario_questions = state.get("scenario_questions", [])
     scenario_responses = [resp for resp in state.get("responses", []) if resp.get("question_type") == "behavioral"]
     # Ensure we have the necessary data structures
     # Create default questions in case of failure
-    default_questions = [
-      {
-            "question": "Imagine you're facing a tight deadline with competing priorities. How would you approach this situation?",
-            "expected_answer": "I would prioritize tasks based on urgency and impact, communicate with stakeholders, and focus on delivering the most critical work first."
-           
-        },
-        {
-            "question": "Describe how you would handle a situation where a critical system you're responsible for fails in production.",
-            "expected_answer": "I would immediately assess the situation, communicate with the team, and implement a rollback or fix while keeping stakeholders informed."
-           
-        }
-    ]
+    default_questions = copy.deepcopy(DEFAULT_SCENARIO_QUESTIONS)
     
     try:
         print("Generating scenario questions...")
@@ -843,20 +970,17 @@ Double check that your JSON has a comma between the "question" field and the "ex
         ])
         
         # Get response
-        chain = prompt | llm 
+        chain = prompt | question_llm 
         response = chain.invoke({
-            "responsibilities": str(responsibilities),
+            "responsibilities": fapp_prompting.compact_json(responsibilities),
             "domain": str(domain),
-            "experience_match": str(experience_match)
-        }).content
+            "experience_match": fapp_prompting.compact_json(experience_match)
+        }, config=fapp_prompting.call_config("scenario_question")).content
         
         # Ensure the response is well-formed JSON
         try:
             if isinstance(response, str):
-                # Try to parse the string as JSON if it's a string
-                modified_text = response[response.find('{'):response.rfind('}')+1]
-
-                question = json.loads(modified_text)
+                question = fapp_json_repair.parse_json(response)
             else:
                 # Use the response directly if it's already parsed
                 question = response
@@ -883,6 +1007,7 @@ Double check that your JSON has a comma between the "question" field and the "ex
         }
     except Exception as e:
         print(f"Error generating scenario question: {e}")
+        fapp_metrics.fallback("scenario_question")
         # Safely get the default question
         if len(scenario_questions) < len(default_questions):
             default_q = default_questions[len(scenario_questions)]
@@ -895,6 +1020,7 @@ Double check that your JSON has a comma between the "question" field and the "ex
         return {**state, "scenario_questions": scenario_questions,"list_of_questions": question_list}
 
 def auto_repaid(response_text):
+    """Ask the model to fix JSON that fapp_json_repair.parse_json could not recover."""
     fix_prompt=f"""The following text is supposed to be a JSON object, but it may have formatting errors.
             Please fix any JSON syntax errors and return ONLY the corrected valid JSON.
             in case of any {{  }} are missing plz add.
@@ -903,14 +1029,16 @@ def auto_repaid(response_text):
 
             Return ONLY the fixed JSON object with no explanations:"""
     try:
-        fix_response = llm.invoke(fix_prompt)
+        fix_response = llm.invoke(fix_prompt, config=fapp_prompting.call_config("json_repair"))
         fixed_text = fix_response.content
         modified_text = fixed_text[fixed_text.find('{'):fixed_text.rfind('}')+1]
         print("Successfully fixed malformed JSON")
         print("the response text is", modified_text)
         data= json.loads(modified_text)
+        fapp_json_repair.record_llm_repair(True)
         return data
     except Exception as fix_e:
+        fapp_json_repair.record_llm_repair(False)
         print(f"Failed to fix JSON: {fix_e}")
         # Use default data
         return response_text
@@ -1028,6 +1156,43 @@ def ask_question(state: InterviewState) -> Dict:
     # Fallback - should never reach here
     return {**state, "current_step": "perform_assessment"}
 
+def summarize_scores(responses) -> Dict:
+    """Average the numeric scores per question type and overall (None when there are none)."""
+    totals = {}
+    all_scores = []
+    for resp in responses:
+        score = resp.get("score")
+        if isinstance(score, (int, float)):
+            all_scores.append(score)
+            q_type = resp.get("question_type", "")
+            if q_type in ("technical", "behavioral", "scenario", "project"):
+                totals.setdefault(q_type, []).append(score)
+
+    summary = {
+        f"{q_type}_score": round(sum(totals[q_type]) / len(totals[q_type])) if q_type in totals else None
+        for q_type in ("technical", "project", "scenario", "behavioral")
+    }
+    summary["overall_score"] = round(sum(all_scores) / len(all_scores)) if all_scores else None
+    return summary
+
+def complete_assessment(assessment: Dict, scores: Dict, resume_fit) -> Dict:
+    """Overlay the calculated scores on the model's assessment and fill in missing sections."""
+    # Use calculated scores if they're available and not in assessment
+    for key, value in scores.items():
+        if value is not None:
+            assessment[key] = value
+    assessment["resume_fit"]=int(resume_fit)
+    
+    # Ensure all required keys are present
+    if "improvements" not in assessment:
+        assessment["improvements"] = ["Candidate should consider expanding their skills in the missing areas."]
+    if "strengths" not in assessment:
+        assessment["strengths"] = ["Technical skills aligned with job requirements."]
+    if "weaknesses" not in assessment:
+        assessment["weaknesses"] = ["Limited information to assess all required areas."]
+    return assessment
+
+@fapp_scheduler.with_priority(fapp_scheduler.BACKGROUND)
 def perform_assessment(state: InterviewState) -> Dict:
     """Perform the final assessment of the candidate."""
     resume_data = state["resume_data"]
@@ -1036,42 +1201,7 @@ def perform_assessment(state: InterviewState) -> Dict:
     resume_fit=match_analysis.get("skill_match_percentage", "30")
 
     responses = state["list_of_questions"]
-    
-    # Calculate average scores from the evaluations
-    total_technical_score = 0
-    technical_count = 0
-    total_behavioral_score = 0
-    total_scenario_score = 0
-    scenario_count = 0
-    total_project_score = 0
-    project_count = 0
-    behavioral_count = 0
-    all_scores = []
-    
-    for resp in responses:
-        
-        score = resp.get("score")
-        if isinstance(score, (int, float)):
-            all_scores.append(score)
-            q_type = resp.get("question_type", "")
-            if q_type == "technical":
-                total_technical_score += score
-                technical_count += 1
-            elif q_type in ["behavioral"]:
-                total_behavioral_score += score
-                behavioral_count += 1
-            elif q_type in ["scenario"]:
-                total_scenario_score += score
-                scenario_count += 1
-            elif q_type in ["project"]:
-                total_project_score += score
-                project_count += 1
-    
-    avg_technical_score = round(total_technical_score / technical_count) if technical_count > 0 else None
-    avg_project_score = round(total_project_score / project_count) if project_count > 0 else None
-    avg_scenario_score = round(total_scenario_score / scenario_count) if scenario_count > 0 else None
-    avg_behavioral_score = round(total_behavioral_score / behavioral_count) if behavioral_count > 0 else None
-    overall_score = round(sum(all_scores) / len(all_scores)) if all_scores else None
+    scores = summarize_scores(responses)
     
     print("performing assessment")
     
@@ -1099,42 +1229,23 @@ def perform_assessment(state: InterviewState) -> Dict:
     
     try:
         assessment = chain.invoke({
-            "resume_data": resume_data,
-            "job_data": job_data,
-            "match_analysis": match_analysis,
-            "responses": responses,
-        }).content
+            "resume_data": fapp_prompting.compact_json(fapp_prompting.select(resume_data, ("skills", "projects", "experience"))),
+            "job_data": fapp_prompting.compact_json(job_data),
+            "match_analysis": fapp_prompting.compact_json(match_analysis),
+            "responses": fapp_prompting.compact_json([
+                fapp_prompting.select(resp, ("question_type", "question", "answer", "score", "feedback"))
+                for resp in responses
+            ]),
+        }, config=fapp_prompting.call_config("assessment")).content
         try:
             if isinstance(assessment, str):
-                # Try to parse the string as JSON if it's a string
-                modified_text = assessment[assessment.find('{'):assessment.rfind('}')+1]
-                # Try to parse the string as JSON if it's a string
-                assessment = json.loads(modified_text)
+                assessment = fapp_json_repair.parse_json(assessment)
         except Exception as e:
             assessment=auto_repaid(assessment)
 
         # print(f"the respones for the interview are {responses}")
         print(f"Assessment generated: {assessment}")
-        # Use calculated scores if they're available and not in assessment
-        if avg_technical_score is not None :
-            assessment["technical_score"] = avg_technical_score
-        if avg_behavioral_score is not None :
-            assessment["behavioral_score"] = avg_behavioral_score
-        if avg_project_score is not None :
-            assessment["project_score"] = avg_project_score
-        if avg_scenario_score is not None :
-            assessment["scenario_score"] = avg_scenario_score
-        if overall_score is not None :
-            assessment["overall_score"] = overall_score
-        assessment["resume_fit"]=int(resume_fit)
-        
-        # Ensure all required keys are present
-        if "improvements" not in assessment:
-            assessment["improvements"] = ["Candidate should consider expanding their skills in the missing areas."]
-        if "strengths" not in assessment:
-            assessment["strengths"] = ["Technical skills aligned with job requirements."]
-        if "weaknesses" not in assessment:
-            assessment["weaknesses"] = ["Limited information to assess all required areas."]
+        assessment = complete_assessment(assessment, scores, resume_fit)
         print("the assessment is", assessment)
         return {
             **state, 
@@ -1143,23 +1254,146 @@ def perform_assessment(state: InterviewState) -> Dict:
         }
     except Exception as e:
         print(f"Error performing assessment: {e}")
-        default_assessment = {
-            "scenario_score": avg_scenario_score or 50,
-            "project_score": avg_project_score or 50,
-            "technical_score": avg_technical_score or 50,
-            "behavioral_score": avg_behavioral_score or 50,
-            "overall_score": overall_score or 50,
-            "resume_fit": int(resume_fit) or 50,
-            "strengths": ["Unable to properly assess strengths"],
-            "weaknesses": ["Unable to properly assess weaknesses"],
-            "improvements": ["Consider a more thorough interview process"]
-        }
+        fapp_metrics.fallback("assessment")
         return {
             **state, 
-            "assessment": default_assessment,
+            "assessment": default_assessment(scores, resume_fit),
             "current_step": END
         }
 
+def default_assessment(scores: Dict, resume_fit) -> Dict:
+    """Assessment from the calculated scores alone, for when the model call fails."""
+    return {
+        "scenario_score": scores["scenario_score"] or 50,
+        "project_score": scores["project_score"] or 50,
+        "technical_score": scores["technical_score"] or 50,
+        "behavioral_score": scores["behavioral_score"] or 50,
+        "overall_score": scores["overall_score"] or 50,
+        "resume_fit": int(resume_fit) or 50,
+        "strengths": ["Unable to properly assess strengths"],
+        "weaknesses": ["Unable to properly assess weaknesses"],
+        "improvements": ["Consider a more thorough interview process"]
+    }
+
+def validate_batch_evaluation(item, expected_ids) -> Optional[Dict]:
+    """Return {"id", "score", "feedback"} if the item is usable, else None."""
+    if not isinstance(item, dict):
+        return None
+    try:
+        item_id = int(item.get("id"))
+        score = float(item.get("score"))
+    except (TypeError, ValueError):
+        return None
+    feedback = item.get("feedback")
+    if item_id not in expected_ids or not 0 <= score <= 100 or not isinstance(feedback, str) or not feedback.strip():
+        return None
+    return {"id": item_id, "score": int(score) if score.is_integer() else score, "feedback": feedback.strip()}
+
+@fapp_scheduler.with_priority(fapp_scheduler.BACKGROUND)
+def perform_batch_assessment(state: InterviewState) -> Dict:
+    """Score every answer and write the assessment in one call.
+
+    Replaces the per-answer evaluate_response calls plus perform_assessment when
+    settings.BATCH_SCORING is on. Items the model leaves out or returns malformed
+    are re-scored one by one with evaluate_response.
+    """
+    job_data = state["job_data"]
+    match_analysis = state["match_analysis"]
+    resume_fit = match_analysis.get("skill_match_percentage", "30")
+    responses = state["list_of_questions"]
+
+    items = [
+        {
+            "id": index + 1,
+            "question_type": resp.get("question_type", ""),
+            "question": resp.get("question", ""),
+            "answer": resp.get("answer", ""),
+        }
+        for index, resp in enumerate(responses)
+        if resp.get("answer")
+    ]
+    expected_ids = {item["id"] for item in items}
+    print(f"performing batch assessment of {len(items)} answers")
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", """You are an expert hiring assessor grading a finished interview.
+        For EVERY interview item, score the candidate's answer from 0-100 (score liberally, it is a subjective assessment)
+        and give brief constructive feedback. Then assess the candidate overall:
+
+        1. strengths: list[str] Key positive aspects identified based on interview response (3-5 points)
+        2. weaknesses: list[str] Areas for improvement based on interview response (3-5 points)
+        3. improvements: list[str] Improvement suggestions Specific actionable feedback based on interview response (3-5 points)
+
+        Return ONLY a valid JSON object in this exact format:
+        {{
+        "evaluations": [{{"id": 1, "score": 75, "feedback": "Your specific feedback here"}}],
+        "strengths": ["..."],
+        "weaknesses": ["..."],
+        "improvements": ["..."]
+        }}
+        There must be one entry in "evaluations" per interview item, using the item's id."""),
+        ("user", """Job data: {job_data}
+        Match analysis: {match_analysis}
+        Interview items: {items}""")
+    ])
+    chain = prompt | llm
+
+    try:
+        result = chain.invoke({
+            "job_data": fapp_prompting.compact_json(job_data),
+            "match_analysis": fapp_prompting.compact_json(match_analysis),
+            "items": fapp_prompting.compact_json(items),
+        }, config=fapp_prompting.call_config("batch_assessment")).content
+        result = fapp_json_repair.parse_json(result)
+        if not isinstance(result, dict):
+            raise ValueError("Batch assessment is not a JSON object")
+    except Exception as e:
+        if fapp_scheduler.is_shed(e):
+            # Scoring the answers one by one would only queue more calls behind the rate limiter
+            print(f"Batch assessment shed by the rate limiter, using the calculated scores: {e}")
+            fapp_metrics.fallback("batch_assessment")
+            return {
+                **state,
+                "assessment": default_assessment(summarize_scores(responses), resume_fit),
+                "current_step": END
+            }
+        print(f"Batch assessment failed, scoring answers one by one: {e}")
+        for item in items:
+            evaluation = evaluate_response(item["question"], item["answer"])
+            responses[item["id"] - 1]["score"] = evaluation["score"]
+            responses[item["id"] - 1]["feedback"] = evaluation["feedback"]
+        return perform_assessment(state)
+
+    scored = set()
+    for raw_item in result.get("evaluations") or []:
+        evaluation = validate_batch_evaluation(raw_item, expected_ids)
+        if evaluation is None or evaluation["id"] in scored:
+            continue
+        scored.add(evaluation["id"])
+        responses[evaluation["id"] - 1]["score"] = evaluation["score"]
+        responses[evaluation["id"] - 1]["feedback"] = evaluation["feedback"]
+
+    failed = [item for item in items if item["id"] not in scored]
+    if failed:
+        logger.info(f"Batch assessment re-scoring {len(failed)} of {len(items)} answers individually")
+    for item in failed:
+        evaluation = evaluate_response(item["question"], item["answer"])
+        responses[item["id"] - 1]["score"] = evaluation["score"]
+        responses[item["id"] - 1]["feedback"] = evaluation["feedback"]
+
+    assessment = {
+        key: result[key]
+        for key in ("strengths", "weaknesses", "improvements")
+        if isinstance(result.get(key), list) and result[key]
+    }
+    assessment = complete_assessment(assessment, summarize_scores(responses), resume_fit)
+    print("the assessment is", assessment)
+    return {
+        **state,
+        "assessment": assessment,
+        "current_step": END
+    }
+
 # Build the graph
 def build_graph():
     """Build and compile the interview process graph."""
@@ -1170,6 +1404,7 @@ def build_graph():
     workflow.add_node("extract_resume_data", extract_resume_data)
     workflow.add_node("extract_job_data", extract_job_data)
     workflow.add_node("perform_match_analysis", perform_match_analysis)
+    workflow.add_node("build_candidate_digest", build_candidate_digest)
     workflow.add_node("generate_technical_questions", generate_technical_questions)
     workflow.add_node("generate_project_questions", generate_project_questions)
 
@@ -1184,7 +1419,8 @@ def build_graph():
     workflow.add_edge("initialize_state", "extract_resume_data")
     workflow.add_edge("extract_resume_data", "extract_job_data")
     workflow.add_edge("extract_job_data", "perform_match_analysis")
-    workflow.add_edge("perform_match_analysis", "generate_project_questions")
+    workflow.add_edge("perform_match_analysis", "build_candidate_digest")
+    workflow.add_edge("build_candidate_digest", "generate_project_questions")
     workflow.add_edge("generate_project_questions", "ask_question")
     
     # Edge from generate_technical_questions to ask_question
@@ -1256,6 +1492,7 @@ def route_next_step(state: InterviewState) -> Dict:
 # print(json.dumps(result, indent=2))
 
 
+@fapp_scheduler.with_priority(fapp_scheduler.EVALUATION)
 def evaluate_response(question_text, response: str) -> dict:
     """Evaluate a user's response to an interview question and provide scoring and feedback."""
     # question_text = question.get("question", "")
@@ -1299,15 +1536,13 @@ def evaluate_response(question_text, response: str) -> dict:
     
     try:
         # Get raw LLM response
-        raw_response = llm.invoke(prompt)
+        raw_response = llm.invoke(prompt, config=fapp_prompting.call_config("evaluate_response"))
         response_text = raw_response.content
         
         # Try direct JSON parsing first
         try:
-            # Extract what looks like JSON (from first { to last })
-            json_text = response_text[response_text.find('{'):response_text.rfind('}')+1]
-            evaluation = json.loads(json_text)
-        except json.JSONDecodeError:
+            evaluation = fapp_json_repair.parse_json(response_text)
+        except ValueError:
             try:
                 # Try to fix the JSON using auto_repaid function
                 evaluation = auto_repaid(response_text)
@@ -1318,6 +1553,7 @@ def evaluate_response(question_text, response: str) -> dict:
         
         # If parsing completely failed, use default evaluation
         if not evaluation:
+            fapp_metrics.fallback("evaluate_response")
             evaluation = {
                 "score": 0,
                 "feedback": "Unable to evaluate response fully."
@@ -1443,9 +1679,7 @@ def run_interview_interactive(resume: str, job_description: str, company_name: s
     
     # Run initialization steps
     state = initialize_state(state)
-    state = extract_resume_data(state)
-    state = extract_job_data(state)
-    state = perform_match_analysis(state)
+    state = run_onboarding_pipeline(state)
     
     # Generate questions for different categories
     state["current_question_type"] = "project"
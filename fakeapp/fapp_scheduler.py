@@ -0,0 +1,355 @@
+"""Priority-aware rate limiting for outbound LLM calls.
+
+Every chat completion leaving the shared HTTP client (fapp_clients) waits for a
+token from a bucket sized to the Groq requests-per-minute limit. Waiting calls
+are served in priority order and the lower classes must leave part of the
+bucket untouched, so under pressure the next question still goes out while
+assessment narratives and extraction wait, and eventually get shed.
+
+The priority of a call comes from the code that makes it:
+
+    @fapp_scheduler.with_priority(fapp_scheduler.QUESTION)
+    def generate_technical_questions(state): ...
+
+Set LLM_RATE_LIMIT["SHARED_PATH"] to share one bucket between worker processes.
+"""
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import fapp_metrics
+
+logger = logging.getLogger('simple_logger')
+
+QUESTION = 0
+EVALUATION = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {QUESTION: "question", EVALUATION: "evaluation", BACKGROUND: "background"}
+
+DEFAULTS = {
+    "ENABLED": True,
+    "REQUESTS_PER_MINUTE": 30,
+    "BURST": 10,
+    # Share of the bucket each class must leave for the classes above it
+    "RESERVE": {QUESTION: 0.0, EVALUATION: 0.2, BACKGROUND: 0.5},
+    # Seconds a call may queue before it is shed (None waits forever)
+    "MAX_WAIT": {QUESTION: None, EVALUATION: 60.0, BACKGROUND: 20.0},
+    # How many times a 429 is retried here; the SDK itself doesn't retry scheduled calls (fapp_clients)
+    "MAX_RETRIES": 3,
+    # SQLite file holding a bucket shared by all workers; None keeps it per process
+    "SHARED_PATH": None,
+}
+
+# Only chat completions are limited; the audio endpoints have their own quota
+LIMITED_PATH_SUFFIX = "/chat/completions"
+
+_priority = contextvars.ContextVar("llm_priority", default=None)
+# List the calls shed inside a `collect_sheds` block are appended to
+_sheds = contextvars.ContextVar("llm_sheds", default=None)
+
+
+class RateLimitShed(RuntimeError):
+    """A low-priority LLM call waited too long for the rate limiter and was dropped."""
+
+
+def is_shed(error):
+    """Whether `error` is a RateLimitShed or was raised because of one.
+
+    The SDK wraps exceptions raised in the transport (APIConnectionError), so
+    the shed is found on the exception's cause chain.
+    """
+    while error is not None:
+        if isinstance(error, RateLimitShed):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def get_config():
+    config = {**DEFAULTS, **getattr(settings, "LLM_RATE_LIMIT", {})}
+    config["RESERVE"] = {**DEFAULTS["RESERVE"], **config["RESERVE"]}
+    config["MAX_WAIT"] = {**DEFAULTS["MAX_WAIT"], **config["MAX_WAIT"]}
+    return config
+
+
+def current_priority():
+    priority = _priority.get()
+    return BACKGROUND if priority is None else priority
+
+
+@contextmanager
+def priority(level):
+    """Run the block's LLM calls at `level` unless an outer caller already set one."""
+    token = _priority.set(level) if _priority.get() is None else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _priority.reset(token)
+
+
+def with_priority(level):
+    """Decorator form of `priority`; works in executor threads too since it sets the level on entry."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with priority(level):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect_sheds():
+    """Yield a list that gets the level of every call shed inside the block.
+
+    For callers whose LLM code catches the shed and falls back to a default,
+    but that need to know the result is a fallback.
+    """
+    sheds = []
+    token = _sheds.set(sheds)
+    try:
+        yield sheds
+    finally:
+        _sheds.reset(token)
+
+
+class TokenBucket:
+    """In-process bucket; callers hold the scheduler lock."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, reserve):
+        """Take a token if one is left above `reserve`; otherwise return seconds to wait."""
+        now = self.clock()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        needed = 1 + reserve
+        if self.tokens >= needed:
+            self.tokens -= 1
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def pause(self, seconds):
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+        # Refill from the end of the pause, not through it
+        self.tokens = 0.0
+        self.updated = self.blocked_until
+
+
+class SharedTokenBucket:
+    """Same bucket kept in a SQLite row so every worker process draws from it."""
+
+    def __init__(self, path, rate, capacity):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_rate_limit ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL,"
+                " blocked_until REAL NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO llm_rate_limit (id, tokens, updated, blocked_until) VALUES (1, ?, ?, 0)",
+                (self.capacity, time.time()),
+            )
+            self._local.conn = conn
+        return conn
+
+    def try_take(self, reserve):
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated, blocked_until = conn.execute(
+                "SELECT tokens, updated, blocked_until FROM llm_rate_limit WHERE id = 1"
+            ).fetchone()
+            if now < blocked_until:
+                conn.execute("COMMIT")
+                return blocked_until - now
+            tokens = min(self.capacity, tokens + max(now - updated, 0) * self.rate)
+            needed = 1 + reserve
+            wait = 0.0
+            if tokens >= needed:
+                tokens -= 1
+            else:
+                wait = (needed - tokens) / self.rate
+            conn.execute("UPDATE llm_rate_limit SET tokens = ?, updated = ? WHERE id = 1", (tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def pause(self, seconds):
+        until = time.time() + seconds
+        self._connection().execute(
+            "UPDATE llm_rate_limit SET tokens = 0, blocked_until = MAX(blocked_until, ?),"
+            " updated = MAX(blocked_until, ?) WHERE id = 1",
+            (until, until),
+        )
+
+
+class Scheduler:
+    def __init__(self, config, clock=time.monotonic):
+        rate = config["REQUESTS_PER_MINUTE"] / 60.0
+        capacity = config["BURST"]
+        self.clock = clock
+        if config["SHARED_PATH"]:
+            self.bucket = SharedTokenBucket(config["SHARED_PATH"], rate, capacity)
+        else:
+            self.bucket = TokenBucket(rate, capacity, clock)
+        self.capacity = capacity
+        self.reserve = config["RESERVE"]
+        self.max_wait = config["MAX_WAIT"]
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self.counters = {
+            name: {"queued": 0, "max_queued": 0, "acquired": 0, "shed": 0, "rate_limited": 0, "wait_seconds": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+
+    def acquire(self, level):
+        """Block until a call at `level` may go out; raises RateLimitShed when it waited too long."""
+        counters = self.counters[PRIORITY_NAMES[level]]
+        entry = (level, next(self._seq))
+        max_wait = self.max_wait.get(level)
+        start = self.clock()
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            counters["queued"] += 1
+            counters["max_queued"] = max(counters["max_queued"], counters["queued"])
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] == entry:
+                        wait = self.bucket.try_take(self.reserve[level] * self.capacity)
+                        if wait == 0.0:
+                            heapq.heappop(self._queue)
+                            break
+                    waited = self.clock() - start
+                    if max_wait is not None and waited >= max_wait:
+                        self._queue.remove(entry)
+                        heapq.heapify(self._queue)
+                        counters["shed"] += 1
+                        sheds = _sheds.get()
+                        if sheds is not None:
+                            sheds.append(level)
+                        raise RateLimitShed(
+                            f"{PRIORITY_NAMES[level]} LLM call shed after waiting {waited:.1f}s for the rate limiter"
+                        )
+                    timeout = 0.5 if wait is None else min(max(wait, 0.01), 0.5)
+                    if max_wait is not None:
+                        timeout = min(timeout, max_wait - waited)
+                    self._cond.wait(timeout)
+            finally:
+                counters["queued"] -= 1
+                self._cond.notify_all()
+            waited = self.clock() - start
+            counters["acquired"] += 1
+            counters["wait_seconds"] += waited
+        if waited > 1:
+            logger.info(f"{PRIORITY_NAMES[level]} LLM call waited {waited:.2f}s for the rate limiter")
+
+    def rate_limited(self, level, retry_after):
+        """The API answered 429: stop every class until `retry_after` has passed."""
+        with self._cond:
+            self.counters[PRIORITY_NAMES[level]]["rate_limited"] += 1
+            fapp_metrics.inc("fakeapp_llm_retries_total", priority=PRIORITY_NAMES[level])
+            self.bucket.pause(retry_after)
+            self._cond.notify_all()
+        logger.error(f"Groq rate limit hit by a {PRIORITY_NAMES[level]} call; pausing {retry_after:.1f}s")
+
+    def stats(self):
+        with self._cond:
+            stats = {name: dict(counters) for name, counters in self.counters.items()}
+        for counters in stats.values():
+            counters["avg_wait_seconds"] = (
+                round(counters["wait_seconds"] / counters["acquired"], 3) if counters["acquired"] else 0.0
+            )
+        return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler, or None when LLM_RATE_LIMIT is disabled."""
+    global _scheduler
+    config = get_config()
+    if not config["ENABLED"]:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(config)
+    return _scheduler
+
+
+def applies_to(request):
+    return request.method == "POST" and request.url.path.endswith(LIMITED_PATH_SUFFIX)
+
+
+def retry_after_seconds(response, attempt):
+    """Seconds to back off after a 429, from the headers or exponential backoff."""
+    value = response.headers.get("retry-after")
+    try:
+        return max(float(value), 0.5)
+    except (TypeError, ValueError):
+        return min(2.0 ** attempt, 30.0)
+
+
+def send(request, send_request):
+    """Send `request` through the scheduler, retrying 429s; used by fapp_clients' transport."""
+    scheduler = get_scheduler()
+    if scheduler is None or not applies_to(request):
+        return send_request(request)
+    level = current_priority()
+    max_retries = get_config()["MAX_RETRIES"]
+    request.read()
+    for attempt in range(max_retries + 1):
+        scheduler.acquire(level)
+        response = send_request(request)
+        if response.status_code != 429 or attempt == max_retries:
+            return response
+        response.read()
+        response.close()
+        scheduler.rate_limited(level, retry_after_seconds(response, attempt))
+    return response
+
+
+def stats():
+    if _scheduler is None:
+        return {}
+    return _scheduler.stats()
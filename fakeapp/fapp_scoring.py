@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+from fakeapp.models import InterviewResponse
+from . import fapp_resume_processor
+from . import fapp_write_behind
+
+logger = logging.getLogger('simple_logger')
+
+# How often to re-check the database for scores owned by other workers
+POLL_INTERVAL = 0.5
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, "SCORING_WORKERS", 4), thread_name_prefix="scoring")
+_lock = threading.Lock()
+_pending = {}  # session_id -> {question_number: future}
+
+
+def is_enabled():
+    return getattr(settings, "DEFERRED_SCORING", False)
+
+
+def batch_enabled():
+    """Resume interviews are scored in one call at result time (see perform_batch_assessment)."""
+    return getattr(settings, "BATCH_SCORING", False)
+
+
+def _score(session_id, question_number, question_text, answer):
+    try:
+        evaluation = fapp_resume_processor.evaluate_response(question_text, answer)
+        # With WRITE_BEHIND the row may still be queued (here or in another worker)
+        fapp_write_behind.wait_for_question(session_id, question_number)
+        updated = InterviewResponse.objects.filter(
+            session_id=session_id,
+            question_number=question_number
+        ).update(score=evaluation["score"], feedback=evaluation["feedback"])
+        if not updated:
+            logger.error(f"Deferred score for {session_id} Q{question_number} not written: no such row")
+        return evaluation
+    except Exception as e:
+        logger.error(f"Deferred scoring failed for {session_id} Q{question_number}: {e}")
+        raise
+    finally:
+        # Worker threads get their own DB connection; don't leak it
+        connections.close_all()
+
+
+def enqueue(session_id, question_number, question_text, answer):
+    """Score an answer in the background and write it to InterviewResponse."""
+    future = _executor.submit(_score, session_id, question_number, question_text, answer)
+    with _lock:
+        _pending.setdefault(session_id, {})[question_number] = future
+    return future
+
+
+def wait_for_session(session_id, timeout=None):
+    """Block until every outstanding score for this session is written.
+
+    Returns {question_number: evaluation} for the answers scored by this worker.
+    Answers queued on other workers are picked up by polling the database until
+    they have a score or `timeout` runs out.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "SCORING_WAIT_TIMEOUT", 60)
+    deadline = time.monotonic() + timeout
+    with _lock:
+        futures = _pending.pop(session_id, {})
+
+    start = time.perf_counter()
+    wait(futures.values(), timeout=timeout)
+    evaluations = {}
+    for question_number, future in futures.items():
+        if future.done() and not future.cancelled() and future.exception() is None:
+            evaluations[question_number] = future.result()
+
+    while time.monotonic() < deadline:
+        unscored = InterviewResponse.objects.filter(
+            session_id=session_id,
+            answer_text__isnull=False,
+            score__isnull=True
+        ).exists()
+        if not unscored:
+            break
+        time.sleep(POLL_INTERVAL)
+    logger.info(f"Waited {time.perf_counter() - start:.2f}s for deferred scores of {session_id}")
+    return evaluations
+
+
+def merge_scores(session_id, list_of_questions, evaluations=None):
+    """Copy deferred scores into state["list_of_questions"] (question N is item N-1)."""
+    scores = {
+        number: {"score": score, "feedback": feedback}
+        for number, score, feedback in InterviewResponse.objects.filter(
+            session_id=session_id,
+            score__isnull=False
+        ).values_list("question_number", "score", "feedback")
+    }
+    scores.update(evaluations or {})
+    for question_number, evaluation in scores.items():
+        index = question_number - 1
+        if 0 <= index < len(list_of_questions) and isinstance(list_of_questions[index], dict):
+            list_of_questions[index]["score"] = evaluation.get("score")
+            list_of_questions[index]["feedback"] = evaluation.get("feedback")
+    return list_of_questions
+
+
+def save_scores(session_id, list_of_questions):
+    """Write scores from state["list_of_questions"] back to InterviewResponse (question N is item N-1)."""
+    for index, question in enumerate(list_of_questions):
+        if isinstance(question, dict) and question.get("score") is not None:
+            InterviewResponse.objects.filter(
+                session_id=session_id,
+                question_number=index + 1
+            ).update(score=question["score"], feedback=question.get("feedback"))
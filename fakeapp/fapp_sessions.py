@@ -0,0 +1,126 @@
+"""Session engine: cache in front of the session table, compact payloads, timings.
+
+SESSION_ENGINE = "fakeapp.fapp_sessions" reads sessions from the "sessions"
+cache (SESSION_CACHE_ALIAS) and only goes to the database on a miss; saves
+write through to both, as Django's cached_db engine does. Payloads are encoded
+with msgpack when it is installed (compact JSON otherwise) and zlib-compressed
+when that makes them smaller, unless SESSION_STORE["COMPRESS"] is turned off.
+Load/save latency and payload size are counted in `stats()` and exported by
+fapp_metrics.
+"""
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.core import signing
+
+from . import fapp_metrics
+
+logger = logging.getLogger('simple_logger')
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFAULTS = {
+    # zlib the payload before signing (kept only when it is smaller), like Django's default encoder
+    "COMPRESS": True,
+}
+
+SIZE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+_lock = threading.Lock()
+counters = {
+    "loads": 0,
+    "cache_misses": 0,
+    "saves": 0,
+    "load_seconds": 0.0,
+    "save_seconds": 0.0,
+    "payload_bytes": 0,
+    "max_payload_bytes": 0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "SESSION_STORE", {})}
+
+
+class CompactSerializer:
+    """SESSION_SERIALIZER for JSON-compatible session data: msgpack, or JSON without whitespace."""
+
+    def dumps(self, obj):
+        if msgpack is not None:
+            return msgpack.packb(obj, use_bin_type=True)
+        return json.dumps(obj, separators=(",", ":")).encode("latin-1")
+
+    def loads(self, data):
+        if msgpack is not None:
+            try:
+                return msgpack.unpackb(data, raw=False)
+            except ValueError:
+                # Written before msgpack was installed
+                pass
+        return json.loads(data.decode("latin-1"))
+
+
+def _record(operation, seconds, size=None):
+    with _lock:
+        counters[f"{operation}s"] += 1
+        counters[f"{operation}_seconds"] += seconds
+        if size is not None:
+            counters["payload_bytes"] += size
+            counters["max_payload_bytes"] = max(counters["max_payload_bytes"], size)
+    fapp_metrics.observe("fakeapp_session_seconds", seconds, operation=operation)
+    if size is not None:
+        fapp_metrics.observe("fakeapp_session_bytes", size, buckets=SIZE_BUCKETS)
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = "fakeapp.fapp_sessions"
+
+    def encode(self, session_dict):
+        return signing.dumps(
+            session_dict,
+            salt=self.key_salt,
+            serializer=self.serializer,
+            compress=get_config()["COMPRESS"],
+        )
+
+    def _get_session_from_db(self):
+        with _lock:
+            counters["cache_misses"] += 1
+        return super()._get_session_from_db()
+
+    def load(self):
+        start = time.perf_counter()
+        data = super().load()
+        _record("load", time.perf_counter() - start)
+        return data
+
+    def save(self, must_create=False):
+        start = time.perf_counter()
+        super().save(must_create=must_create)
+        # create_model_instance() encoded the payload that was just written
+        _record("save", time.perf_counter() - start, len(getattr(self, "_last_payload", "")))
+
+    def create_model_instance(self, data):
+        instance = super().create_model_instance(data)
+        self._last_payload = instance.session_data
+        return instance
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+    stats["serializer"] = "msgpack" if msgpack is not None else "json"
+    stats["cache_hit_rate"] = (
+        round(1 - stats["cache_misses"] / stats["loads"], 4) if stats["loads"] else 0.0
+    )
+    stats["avg_load_ms"] = round(stats["load_seconds"] / stats["loads"] * 1000, 3) if stats["loads"] else 0.0
+    stats["avg_save_ms"] = round(stats["save_seconds"] / stats["saves"] * 1000, 3) if stats["saves"] else 0.0
+    stats["avg_payload_bytes"] = round(stats["payload_bytes"] / stats["saves"], 1) if stats["saves"] else 0.0
+    return stats
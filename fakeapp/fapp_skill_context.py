@@ -0,0 +1,172 @@
+"""Per-session context of a skill-based interview, kept in memory between turns.
+
+The interviewee's skills, question count, rendered opening prompt and the last
+question asked are loaded once per session and worker (or handed over by
+save_user_info) and then updated in place as turns advance, so a turn does not
+query IntervieweeDetails/IntervieweeSkill or re-read prompt.txt. Contexts are
+kept in an LRU of SKILL_CONTEXT["MAX_SESSIONS"] and dropped after
+TTL_SECONDS without a turn; a worker that never saw the session loads it from
+the database.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from fakeapp.models import IntervieweeSkill, skillbased_interview
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    "MAX_SESSIONS": 1000,
+    # Contexts of sessions without a turn for this long are dropped (abandoned interviews)
+    "TTL_SECONDS": 3600,
+}
+
+PROMPT_FILE = "prompt.txt"
+
+_lock = threading.Lock()
+_contexts = OrderedDict()  # session_id -> SkillContext
+_template = None  # (mtime, text) of PROMPT_FILE
+counters = {
+    "hits": 0,
+    "misses": 0,
+    "loads": 0,
+    "question_hits": 0,
+    "question_misses": 0,
+    "evicted": 0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "SKILL_CONTEXT", {})}
+
+
+def _count(name, amount=1):
+    with _lock:
+        counters[name] += amount
+
+
+class SkillContext:
+    """What every turn of one skill-based interview needs."""
+
+    def __init__(self, session_id, skills, question_count):
+        self.session_id = session_id
+        self.skills = list(skills)
+        self.question_count = question_count
+        self._prompt = None
+        # (question_number, question_text) of the last question asked
+        self.last_question = None
+        self.touched = time.monotonic()
+
+    @property
+    def prompt(self):
+        """The opening prompt with the skills and question count filled in."""
+        if self._prompt is None:
+            self._prompt = render_prompt(prompt_template(), self.skills, self.question_count)
+        return self._prompt
+
+    def question(self, question_number):
+        """Text of question `question_number` if it is the last one asked, else None."""
+        if self.last_question and self.last_question[0] == question_number:
+            return self.last_question[1]
+        return None
+
+    def advance(self, question_number, question_text):
+        self.last_question = (question_number, question_text)
+        self.touched = time.monotonic()
+
+
+def prompt_template():
+    """Contents of PROMPT_FILE, read again only when the file changes."""
+    global _template
+    mtime = os.stat(PROMPT_FILE).st_mtime
+    with _lock:
+        if _template is not None and _template[0] == mtime:
+            return _template[1]
+    with open(PROMPT_FILE, "r") as file:
+        text = file.read()
+    with _lock:
+        _template = (mtime, text)
+    return text
+
+
+def render_prompt(template, skills, question_count):
+    if not skills:
+        print("No skills found for the given session ID.")
+        return template
+    replacements = {"thetopics": ", ".join(skills), "thismany": str((question_count or 0) + 1)}
+    for old, new in replacements.items():
+        template = template.replace(old, new)
+    return template
+
+
+def _store(context):
+    config = get_config()
+    now = time.monotonic()
+    with _lock:
+        _contexts[context.session_id] = context
+        _contexts.move_to_end(context.session_id)
+        while _contexts:
+            oldest = next(iter(_contexts.values()))
+            if len(_contexts) <= config["MAX_SESSIONS"] and now - oldest.touched <= config["TTL_SECONDS"]:
+                break
+            _contexts.popitem(last=False)
+            counters["evicted"] += 1
+    return context
+
+
+def start(session_id, skills, question_count):
+    """Context of a session that was just created; saves the first turn's queries."""
+    return _store(SkillContext(session_id, dict.fromkeys(skills), question_count))
+
+
+def _load(session_id):
+    question_count = (
+        skillbased_interview.objects.filter(interviewee__session_id=session_id)
+        .values_list("question_count", flat=True)
+        .first()
+    )
+    skills = IntervieweeSkill.objects.filter(interviewee__session_id=session_id).values_list("skill_name", flat=True)
+    _count("loads")
+    return SkillContext(session_id, skills, question_count)
+
+
+def get(session_id):
+    """The cached context of `session_id`, loaded from the database on a miss."""
+    with _lock:
+        context = _contexts.get(session_id)
+        if context is not None:
+            _contexts.move_to_end(session_id)
+            counters["hits"] += 1
+            return context
+        counters["misses"] += 1
+    return _store(_load(session_id))
+
+
+def cached_question(session_id, question_number):
+    """Text of question `question_number` when this worker asked it, without touching the database."""
+    with _lock:
+        context = _contexts.get(session_id)
+    if context is None:
+        return None
+    question = context.question(question_number)
+    _count("question_hits" if question else "question_misses")
+    return question
+
+
+def forget(session_id):
+    with _lock:
+        _contexts.pop(session_id, None)
+
+
+def stats():
+    with _lock:
+        stats = dict(counters)
+        stats["sessions"] = len(_contexts)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
@@ -0,0 +1,161 @@
+"""Speech-to-text backends for candidate answers.
+
+`transcribe(path)` runs settings.STT_BACKEND and, when that raises, STT_FALLBACK.
+The local faster-whisper model is loaded once per worker (see `preload`, called
+from FakeappConfig.ready) instead of on the first answer.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import fapp_metrics, fapp_replay
+
+logger = logging.getLogger('simple_logger')
+
+
+class STTBackend:
+    name = "base"
+
+    def transcribe(self, audio_file_name):
+        raise NotImplementedError
+
+    def load(self):
+        """Load models or clients up front; no-op for remote backends."""
+
+
+class GroqWhisperBackend(STTBackend):
+    """whisper-large-v3 through the Groq API (translates to English) on the shared connection pool."""
+    name = "groq"
+    model = "whisper-large-v3"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._client is None:
+                from . import fapp_clients
+
+                self._client = fapp_clients.get_groq_client()
+        return self._client
+
+    def transcribe(self, audio_file_name):
+        client = self._client or self.load()
+        with open(audio_file_name, "rb") as file:
+            translation = client.audio.translations.create(file=(audio_file_name, file.read()), model=self.model)
+        return translation.text
+
+
+class GoogleSpeechBackend(STTBackend):
+    """speech_recognition's free Google Web Speech endpoint."""
+    name = "google"
+
+    def transcribe(self, audio_file_name):
+        return fapp_replay.call(
+            fapp_replay.STT_GOOGLE, [self.name, fapp_replay.file_digest(audio_file_name)], lambda: self._recognize(audio_file_name)
+        )
+
+    def _recognize(self, audio_file_name):
+        import speech_recognition as sr
+
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(audio_file_name) as source:
+            audio = recognizer.record(source)
+        return recognizer.recognize_google(audio)
+
+
+class FasterWhisperBackend(STTBackend):
+    """Local Whisper on CPU via faster-whisper (CTranslate2), int8 by default."""
+    name = "faster_whisper"
+
+    def __init__(self, model_size="base.en", compute_type="int8", cpu_threads=0):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError:
+                    raise RuntimeError("STT backend faster_whisper needs the faster-whisper package installed")
+                start = time.perf_counter()
+                self._model = WhisperModel(
+                    self.model_size,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads
+                )
+                logger.info(f"Loaded faster-whisper {self.model_size} ({self.compute_type}) in {time.perf_counter() - start:.2f}s")
+        return self._model
+
+    def transcribe(self, audio_file_name):
+        model = self._model or self.load()
+        # Greedy decoding: answers are short and latency matters more than the last bit of accuracy
+        segments, _ = model.transcribe(audio_file_name, beam_size=1, vad_filter=True)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+STT_BACKENDS = {
+    backend.name: backend for backend in (GroqWhisperBackend, GoogleSpeechBackend, FasterWhisperBackend)
+}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name):
+    """Return the shared instance of backend `name`."""
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend_class = STT_BACKENDS.get(name)
+            if backend_class is None:
+                raise ValueError(f"Unknown STT backend {name!r}, expected one of {sorted(STT_BACKENDS)}")
+            if backend_class is FasterWhisperBackend:
+                backend = FasterWhisperBackend(
+                    model_size=getattr(settings, "STT_LOCAL_MODEL", "base.en"),
+                    compute_type=getattr(settings, "STT_COMPUTE_TYPE", "int8"),
+                    cpu_threads=getattr(settings, "STT_CPU_THREADS", 0)
+                )
+            else:
+                backend = backend_class()
+            _backends[name] = backend
+    return backend
+
+
+def configured_backends():
+    """Names of the primary and fallback backends, in the order they are tried."""
+    names = [getattr(settings, "STT_BACKEND", "groq"), getattr(settings, "STT_FALLBACK", "google")]
+    return [name for i, name in enumerate(names) if name and name not in names[:i]]
+
+
+def preload():
+    """Load the local model (if configured) so the first answer doesn't pay for it."""
+    for name in configured_backends():
+        if name == FasterWhisperBackend.name:
+            try:
+                get_backend(name).load()
+            except Exception as e:
+                logger.error(f"Could not preload STT backend {name}: {e}")
+
+
+def transcribe(audio_file_name):
+    """Transcribe with the primary backend, then the fallback. Returns "error" if both fail."""
+    for name in configured_backends():
+        start = time.perf_counter()
+        try:
+            with fapp_metrics.track_call("stt", "audio_to_text", name):
+                text = get_backend(name).transcribe(audio_file_name)
+        except Exception as e:
+            print(f"STT backend {name} failed: {e}")
+            logger.error(f"STT backend {name} failed on {audio_file_name}: {e}")
+            continue
+        logger.info(f"STT {name} took {time.perf_counter() - start:.2f}s")
+        return text
+    return "error"
@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    "ENABLED": True,
+    # Relative to MEDIA_ROOT so cached files are served from MEDIA_URL
+    "DIR": "tts_cache",
+    "MAX_BYTES": 200 * 1024 * 1024,
+}
+
+AUDIO_EXTENSIONS = (".mp3", ".wav")
+
+_lock = threading.Lock()
+counters = {
+    "hits": 0,
+    "misses": 0,
+    "evicted": 0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "TTS_CACHE", {})}
+
+
+def is_enabled():
+    return get_config()["ENABLED"]
+
+
+def _count(name, amount=1):
+    with _lock:
+        counters[name] += amount
+
+
+def normalize_text(text):
+    return " ".join((text or "").split()).lower()
+
+
+def _backend():
+    from . import fapp_processor
+
+    return fapp_processor.get_tts_backend()
+
+
+def cache_key(text, backend=None):
+    """Hash of the normalized text plus the backend, voice and language it is spoken in."""
+    backend = backend or _backend()
+    return hashlib.sha256(
+        f"{backend.name}\n{backend.lang}\n{backend.voice}\n{normalize_text(text)}".encode("utf-8")
+    ).hexdigest()
+
+
+def cache_file_name(text):
+    """Path of the cached audio for `text`, relative to MEDIA_ROOT."""
+    backend = _backend()
+    return f"{get_config()['DIR']}/{cache_key(text, backend)}.{backend.extension}"
+
+
+def cache_path(text):
+    return os.path.join(settings.MEDIA_ROOT, cache_file_name(text))
+
+
+def lookup(text):
+    """Return the cached file path and mark it recently used, or None."""
+    path = cache_path(text)
+    if not os.path.isfile(path):
+        _count("misses")
+        return None
+    _count("hits")
+    try:
+        # The file's mtime is the LRU clock
+        os.utime(path)
+    except OSError:
+        pass
+    return path
+
+
+def get_or_synthesize(text):
+    """Return the MEDIA_ROOT-relative audio file for `text`, synthesizing it on a miss.
+
+    Returns None when synthesis fails.
+    """
+    from . import fapp_processor
+
+    file_name = cache_file_name(text)
+    if lookup(text):
+        return file_name
+    path = os.path.join(settings.MEDIA_ROOT, file_name)
+    partial_path = f"{path}.{uuid.uuid4().hex}.part"
+    if not fapp_processor.text_to_mp3(text, partial_path):
+        # evict() only sees finished files, so a partial one would stay forever
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return None
+    os.replace(partial_path, path)
+    evict()
+    return file_name
+
+
+def evict(max_bytes=None):
+    """Delete least recently used files until the cache fits in MAX_BYTES."""
+    config = get_config()
+    max_bytes = config["MAX_BYTES"] if max_bytes is None else max_bytes
+    directory = os.path.join(settings.MEDIA_ROOT, config["DIR"])
+    try:
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(AUDIO_EXTENSIONS):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return 0
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return 0
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.error(f"Could not evict {path}: {e}")
+            continue
+        total -= size
+        evicted += 1
+    _count("evicted", evicted)
+    return evicted
+
+
+def stats():
+    config = get_config()
+    directory = os.path.join(settings.MEDIA_ROOT, config["DIR"])
+    files = size = 0
+    if os.path.isdir(directory):
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(AUDIO_EXTENSIONS):
+                files += 1
+                size += entry.stat().st_size
+    with _lock:
+        stats = dict(counters)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["files"] = files
+    stats["bytes"] = size
+    return stats
@@ -0,0 +1,182 @@
+"""Write-behind buffer for the per-turn InterviewResponse writes.
+
+Each upload_audio stores the answer to the previous question and inserts the
+next one. With WRITE_BEHIND["ENABLED"] those turns are queued and a background
+thread commits them every FLUSH_INTERVAL seconds, in one transaction per batch,
+so parallel interviews take the SQLite write lock a few times a second instead
+of several times per turn.
+
+Anything that reads these rows calls `wait_for_question` first: it flushes this
+process's queue and, when the turn was queued by another worker, polls until
+that worker's flush lands (at most READ_WAIT seconds).
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from fakeapp.models import InterviewResponse
+
+logger = logging.getLogger('simple_logger')
+
+DEFAULTS = {
+    "ENABLED": False,
+    "FLUSH_INTERVAL": 0.2,
+    # Flush early once this many turns are queued
+    "MAX_BATCH": 100,
+    # How long a read waits for a turn queued in another worker process
+    "READ_WAIT": 2.0,
+}
+
+# How often a waiting read re-checks the database
+POLL_INTERVAL = 0.05
+
+_cond = threading.Condition()
+# Held while a batch is written, so batches commit in the order they were queued
+_flush_lock = threading.Lock()
+_queue = []
+_thread = None
+counters = {
+    "queued": 0,
+    "written": 0,
+    "failed": 0,
+    "flushes": 0,
+    "max_batch": 0,
+    "flush_seconds": 0.0,
+    "read_waits": 0,
+    "read_wait_seconds": 0.0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "WRITE_BEHIND", {})}
+
+
+def is_enabled():
+    return get_config()["ENABLED"]
+
+
+def commit_turn(session_id, counter, answer, score, feedback, question):
+    """Store the answer to question `counter` and insert question `counter + 1` in one transaction.
+
+    The answered row gets one UPDATE of the changed columns (no SELECT first),
+    the next question one INSERT. Inside a batch this is a savepoint, so a bad
+    turn only rolls back itself.
+    """
+    with transaction.atomic():
+        if counter > 0:
+            fields = {"answer_text": answer}
+            # With deferred scoring a worker writes score/feedback; don't overwrite them
+            if score is not None:
+                fields.update(score=score, feedback=feedback)
+            InterviewResponse.objects.filter(session_id=session_id, question_number=counter).update(**fields)
+        InterviewResponse.objects.create(session_id=session_id, question_number=counter + 1, question_text=question)
+
+
+def record_turn(session_id, counter, answer, score, feedback, question):
+    """Commit the turn now, or queue it for the next flush when write-behind is enabled."""
+    turn = (session_id, counter, answer, score, feedback, question)
+    if not is_enabled():
+        commit_turn(*turn)
+        return
+    _start()
+    with _cond:
+        _queue.append(turn)
+        counters["queued"] += 1
+        if len(_queue) >= get_config()["MAX_BATCH"]:
+            _cond.notify_all()
+
+
+def flush():
+    """Commit every queued turn of this process; returns how many were written."""
+    with _flush_lock:
+        with _cond:
+            batch = list(_queue)
+            del _queue[:]
+        if not batch:
+            return 0
+        start = time.perf_counter()
+        failed = 0
+        try:
+            with transaction.atomic():
+                for turn in batch:
+                    try:
+                        commit_turn(*turn)
+                    except IntegrityError as e:
+                        # One bad turn (e.g. a retried upload) must not take the rest of the batch with it
+                        failed += 1
+                        logger.error(f"Write-behind turn {turn[1]} of {turn[0]} failed: {e}")
+        except Exception:
+            # e.g. the database stayed locked past the busy timeout: keep the turns for the next flush
+            with _cond:
+                _queue[:0] = batch
+            raise
+        elapsed = time.perf_counter() - start
+        with _cond:
+            counters["flushes"] += 1
+            counters["written"] += len(batch) - failed
+            counters["failed"] += failed
+            counters["max_batch"] = max(counters["max_batch"], len(batch))
+            counters["flush_seconds"] += elapsed
+        return len(batch) - failed
+
+
+def wait_for_question(session_id, question_number):
+    """Make sure question `question_number` of the session (and the answers before it) is in the database."""
+    if not is_enabled():
+        return True
+    try:
+        flush()
+    except Exception as e:
+        logger.error(f"Write-behind flush before reading {session_id} failed: {e}")
+    query = InterviewResponse.objects.filter(session_id=session_id, question_number=question_number)
+    # Question 0 is the opening "tell me about yourself" and has no row
+    if question_number < 1 or query.exists():
+        return True
+    start = time.perf_counter()
+    deadline = time.monotonic() + get_config()["READ_WAIT"]
+    found = False
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        if query.exists():
+            found = True
+            break
+    with _cond:
+        counters["read_waits"] += 1
+        counters["read_wait_seconds"] += time.perf_counter() - start
+    if not found:
+        logger.error(f"Question {question_number} of {session_id} not written after {get_config()['READ_WAIT']}s")
+    return found
+
+
+def _run():
+    while True:
+        interval = get_config()["FLUSH_INTERVAL"]
+        with _cond:
+            _cond.wait_for(lambda: len(_queue) >= get_config()["MAX_BATCH"], timeout=interval)
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"Write-behind flush failed: {e}")
+            connection.close()
+
+
+def _start():
+    global _thread
+    with _cond:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="write-behind", daemon=True)
+            _thread.start()
+            # Don't lose queued turns when the worker exits
+            atexit.register(flush)
+
+
+def stats():
+    with _cond:
+        stats = dict(counters)
+        stats["pending"] = len(_queue)
+    stats["avg_batch"] = round(stats["written"] / stats["flushes"], 2) if stats["flushes"] else 0.0
+    return stats
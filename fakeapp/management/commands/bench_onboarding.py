@@ -0,0 +1,64 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fakeapp import fapp_processor, fapp_resume_processor
+
+
+class Command(BaseCommand):
+    help = "Compare sequential and concurrent onboarding (resume/JD extraction + match analysis) timings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--resume", help="Path to a resume file (.pdf, .docx, .txt)")
+        parser.add_argument("--jd-file", help="Path to a text file with the job description")
+        parser.add_argument("--company", default="", help="Company name")
+        parser.add_argument("--state-file", default="SAVE_STATE.json",
+                            help="Saved interview state used when --resume/--jd-file are not given")
+        parser.add_argument("--runs", type=int, default=3, help="Runs per mode")
+
+    def handle(self, *args, **options):
+        resume, job_description, company_name = self.load_inputs(options)
+        timings = {"sequential": [], "concurrent": []}
+
+        for run in range(options["runs"]):
+            # Alternate modes so neither consistently benefits from warm connections
+            for mode in ("sequential", "concurrent"):
+                state = fapp_resume_processor.initialize_state({
+                    "resume": resume,
+                    "job_description": job_description,
+                    "company_name": company_name,
+                    "responses": [],
+                    "conversation_history": [],
+                })
+                start = time.perf_counter()
+                fapp_resume_processor.run_onboarding_pipeline(state, concurrent=(mode == "concurrent"))
+                elapsed = time.perf_counter() - start
+                timings[mode].append(elapsed)
+                self.stdout.write(f"run {run + 1} {mode:<10} {elapsed:.2f}s")
+
+        self.stdout.write("")
+        for mode, values in timings.items():
+            self.stdout.write(
+                f"{mode:<10} mean {statistics.mean(values):.2f}s  "
+                f"min {min(values):.2f}s  max {max(values):.2f}s"
+            )
+        speedup = statistics.mean(timings["sequential"]) / statistics.mean(timings["concurrent"])
+        self.stdout.write(self.style.SUCCESS(f"concurrent speedup: {speedup:.2f}x"))
+
+    def load_inputs(self, options):
+        if options["resume"] or options["jd_file"]:
+            if not (options["resume"] and options["jd_file"]):
+                raise CommandError("--resume and --jd-file must be given together")
+            resume = fapp_processor.extract_resume_text(options["resume"])
+            with open(options["jd_file"], "r", encoding="utf-8") as f:
+                job_description = f.read()
+            return resume, job_description, options["company"]
+
+        try:
+            with open(options["state_file"], "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except OSError as e:
+            raise CommandError(f"Could not read {options['state_file']}: {e}")
+        return saved["resume"], saved["job_description"], options["company"] or saved.get("company_name", "")
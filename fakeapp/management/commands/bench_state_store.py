@@ -0,0 +1,103 @@
+import copy
+import json
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from fakeapp import fapp_interview_state
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+ANSWER_FIELDS = ("answer", "score", "feedback")
+
+
+class WrittenBytes:
+    """execute_wrapper adding up the size of the parameters of write statements."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.statements = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            self.statements += 1
+            rows = params if many else [params]
+            for row in rows:
+                for value in row or ():
+                    if isinstance(value, (str, bytes)):
+                        self.bytes += len(value)
+        return execute(sql, params, many, context)
+
+
+def interview_turns(saved):
+    """States after each turn of a resume interview, replayed from a finished one."""
+    questions = saved.get("list_of_questions", [])
+    state = {
+        **copy.deepcopy(saved),
+        "list_of_questions": [],
+        "responses": [],
+        "assessment": None,
+        "current_question_type": "project",
+        "current_question_number": 0,
+    }
+    for name in ("technical", "project", "scenario", "behavioral"):
+        state[f"{name}_questions"] = []
+    yield copy.deepcopy(state)
+    for number, question in enumerate(questions):
+        if state["list_of_questions"]:
+            answered = questions[number - 1]
+            state["list_of_questions"][-1].update({field: answered.get(field) for field in ANSWER_FIELDS})
+        asked = {key: value for key, value in question.items() if key not in ANSWER_FIELDS}
+        state["list_of_questions"].append(asked)
+        state.setdefault(f"{question.get('question_type')}_questions", []).append(dict(asked))
+        state["current_question_type"] = question.get("question_type", state["current_question_type"])
+        state["current_question_number"] += 1
+        yield copy.deepcopy(state)
+
+
+class Command(BaseCommand):
+    help = "Bytes written per turn when the resume-interview state is kept in the session vs. fapp_interview_state."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--state-file", default="SAVE_STATE.json", help="A finished interview's saved state")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["state_file"], "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except OSError as e:
+            raise CommandError(f"Could not read {options['state_file']}: {e}")
+
+        session_rows, store_rows = [], []
+        # Everything is rolled back; only the statements are measured
+        with transaction.atomic():
+            session = SessionStore()
+            session["session_id"] = "benchstate"
+            for turn, state in enumerate(interview_turns(saved)):
+                before = WrittenBytes()
+                with connection.execute_wrapper(before):
+                    session["state"] = state
+                    session["counter"] = turn
+                    session.save()
+                session_rows.append(before)
+
+                after = WrittenBytes()
+                with connection.execute_wrapper(after):
+                    # What upload_audio does: load, change, save
+                    if turn:
+                        fapp_interview_state.load("benchstate")
+                    fapp_interview_state.save("benchstate", state)
+                store_rows.append(after)
+            transaction.set_rollback(True)
+        fapp_interview_state.forget("benchstate")
+
+        self.stdout.write(f"{'turn':>4}{'session bytes':>16}{'state store bytes':>20}{'statements':>12}")
+        for turn, (before, after) in enumerate(zip(session_rows, store_rows)):
+            self.stdout.write(f"{turn:>4}{before.bytes:>16}{after.bytes:>20}{after.statements:>12}")
+        turns = session_rows[1:]
+        if turns:
+            session_avg = sum(row.bytes for row in turns) / len(turns)
+            store_avg = sum(row.bytes for row in store_rows[1:]) / len(turns)
+            self.stdout.write("")
+            self.stdout.write(f"per turn after onboarding: session {session_avg:.0f} bytes, state store {store_avg:.0f} bytes")
+            self.stdout.write(self.style.SUCCESS(f"{session_avg / max(store_avg, 1):.1f}x fewer bytes written per turn"))
@@ -0,0 +1,105 @@
+import csv
+import os
+import re
+import statistics
+import time
+import wave
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fakeapp import fapp_stt
+
+
+def normalize_words(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", (text or "").lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """(substitutions + deletions + insertions) / reference words, by edit distance."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            ))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def audio_seconds(path):
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Compare STT backends on recorded answers: latency, real-time factor and word error rate."
+
+    def add_arguments(self, parser):
+        parser.add_argument("manifest",
+                            help="CSV with columns audio,reference (audio paths relative to the manifest)")
+        parser.add_argument("--backend", action="append", choices=sorted(fapp_stt.STT_BACKENDS),
+                            help="Backend to measure (repeatable, default: all)")
+
+    def handle(self, *args, **options):
+        manifest = options["manifest"]
+        if not os.path.isfile(manifest):
+            raise CommandError(f"{manifest} not found")
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, newline="", encoding="utf-8") as f:
+            samples = [
+                (os.path.join(base_dir, row["audio"]), row["reference"])
+                for row in csv.DictReader(f)
+            ]
+        if not samples:
+            raise CommandError("Manifest has no rows")
+
+        for name in options["backend"] or sorted(fapp_stt.STT_BACKENDS):
+            backend = fapp_stt.get_backend(name)
+            try:
+                start = time.perf_counter()
+                backend.load()
+                load_seconds = time.perf_counter() - start
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"{name}: not available ({e}), skipped"))
+                continue
+
+            latencies, rtfs, errors = [], [], []
+            failures = 0
+            ref_words = 0
+            for path, reference in samples:
+                start = time.perf_counter()
+                try:
+                    hypothesis = backend.transcribe(path)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"{name}: {os.path.basename(path)} failed: {e}"))
+                    failures += 1
+                    continue
+                elapsed = time.perf_counter() - start
+                latencies.append(elapsed)
+                duration = audio_seconds(path)
+                if duration:
+                    rtfs.append(elapsed / duration)
+                words = len(normalize_words(reference))
+                errors.append(word_error_rate(reference, hypothesis) * words)
+                ref_words += words
+
+            if not latencies:
+                self.stdout.write(f"{name:15s} all {failures} sample(s) failed")
+                continue
+            self.stdout.write(
+                f"{name:15s} samples={len(latencies)} failed={failures} load={load_seconds:.2f}s "
+                f"mean={statistics.mean(latencies):.3f}s "
+                f"median={statistics.median(latencies):.3f}s "
+                f"max={max(latencies):.3f}s "
+                f"rtf={statistics.mean(rtfs) if rtfs else float('nan'):.3f} "
+                f"wer={sum(errors) / ref_words if ref_words else 0.0:.3f}"
+            )
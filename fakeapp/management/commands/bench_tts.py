@@ -0,0 +1,49 @@
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fakeapp import fapp_processor
+from fakeapp.management.commands.warm_tts_cache import known_phrases
+
+
+class Command(BaseCommand):
+    help = "Compare TTS backends: synthesis latency and real-time factor (synthesis time / audio length)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", action="append", choices=sorted(fapp_processor.TTS_BACKENDS),
+                            help="Backend to measure (repeatable, default: all)")
+        parser.add_argument("--runs", type=int, default=1, help="Passes over the phrase list per backend")
+
+    def handle(self, *args, **options):
+        names = options["backend"] or sorted(fapp_processor.TTS_BACKENDS)
+        phrases = known_phrases()
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in names:
+                backend = fapp_processor.get_tts_backend(name)
+                if backend.name != name:
+                    self.stdout.write(self.style.WARNING(f"{name}: not available here, skipped"))
+                    continue
+                latencies, rtfs = [], []
+                for run in range(options["runs"]):
+                    for i, phrase in enumerate(phrases):
+                        path = os.path.join(tmp, f"{name}_{run}_{i}.{backend.extension}")
+                        start = time.perf_counter()
+                        try:
+                            backend.synthesize(phrase, path)
+                        except Exception as e:
+                            raise CommandError(f"{name} failed on {phrase!r}: {e}")
+                        elapsed = time.perf_counter() - start
+                        latencies.append(elapsed)
+                        audio_seconds = backend.duration(path)
+                        if audio_seconds:
+                            rtfs.append(elapsed / audio_seconds)
+                self.stdout.write(
+                    f"{name:8s} phrases={len(latencies)} "
+                    f"mean={statistics.mean(latencies):.3f}s "
+                    f"median={statistics.median(latencies):.3f}s "
+                    f"max={max(latencies):.3f}s "
+                    f"rtf={statistics.mean(rtfs) if rtfs else float('nan'):.3f}"
+                )
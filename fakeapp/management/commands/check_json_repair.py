@@ -0,0 +1,38 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fakeapp import fapp_json_repair
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "json_repair_corpus.json")
+
+
+class Command(BaseCommand):
+    help = "Run the local JSON repair over the corpus of malformed model replies and report regressions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--corpus", default=CORPUS, help="JSON list of {source, text, expected}")
+
+    def handle(self, *args, **options):
+        with open(options["corpus"], encoding="utf-8") as f:
+            corpus = json.load(f)
+
+        failures = 0
+        for case in corpus:
+            try:
+                parsed = fapp_json_repair.parse_json(case["text"])
+            except fapp_json_repair.JSONRepairError as e:
+                parsed = e
+            if parsed != case["expected"]:
+                failures += 1
+                self.stdout.write(self.style.ERROR(f"{case['source']}: expected {case['expected']!r}, got {parsed!r}"))
+
+        stats = fapp_json_repair.stats()
+        self.stdout.write(
+            f"{len(corpus)} case(s): {stats['clean']} clean, {stats['repaired']} repaired locally, "
+            f"{stats['failed']} unrecoverable"
+        )
+        if failures:
+            raise CommandError(f"{failures} case(s) parsed differently than expected")
+        self.stdout.write(self.style.SUCCESS("All cases parsed as expected"))
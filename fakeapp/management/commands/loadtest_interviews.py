@@ -0,0 +1,366 @@
+import base64
+import glob
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import wave
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+
+from fakeapp import fapp_chat_history, fapp_interview_state, fapp_replay, fapp_skill_context, fapp_write_behind
+from fakeapp.apps import warm_up_worker
+from fakeapp.models import ChatMessage, InterviewResponse, IntervieweeDetails
+
+DEFAULT_SKILLS = ["Python", "Django", "SQL"]
+DEFAULT_RESUME = """Jane Doe - Backend Engineer
+Skills: Python, Django, PostgreSQL, Redis, Docker, AWS
+Experience: 4 years building REST APIs and data pipelines at a fintech startup.
+Projects: payment reconciliation service (Django, Celery); real-time fraud alerts (Kafka, Python).
+Education: B.Tech Computer Science
+"""
+DEFAULT_JOB_DESCRIPTION = """Backend Engineer. Build and operate Django services on AWS.
+Requirements: 3+ years of Python, Django REST APIs, SQL, caching, Docker, CI/CD.
+"""
+# upload_audio fixes the resume round at 11 questions
+RESUME_CYCLES = 11
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+# Served for every external call by --stub: one reply that fits the question, scoring
+# and extraction prompts well enough for the views to take their normal paths
+STUB_REPLY = {
+    "Question": "Can you walk me through a project where you used this skill?",
+    "question": "Can you walk me through a project where you used this skill?",
+    "score": 6,
+    "feedback": "Reasonable answer.",
+}
+STUB_TRANSCRIPT = "I would start by profiling the slow path and then fix the biggest cost first."
+# A few silent MPEG-2 layer III frames
+STUB_MP3 = (b"\xff\xf3\x14\xc4" + b"\x00" * 140) * 8
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of `values` (0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def write_stub_cassettes(directory):
+    """A recording of each kind under `directory`; fapp_replay serves it as the stand-in for every call."""
+    completion = {
+        "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": json.dumps(STUB_REPLY)}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+    entries = {
+        fapp_replay.LLM: {"path": "/openai/v1/chat/completions", "status": 200,
+                          "headers": {"content-type": "application/json"}, "body": json.dumps(completion)},
+        fapp_replay.STT_HTTP: {"path": "/openai/v1/audio/translations", "status": 200,
+                               "headers": {"content-type": "application/json"},
+                               "body": json.dumps({"text": STUB_TRANSCRIPT})},
+        fapp_replay.STT_GOOGLE: {"parts": [], "text": STUB_TRANSCRIPT},
+        fapp_replay.TTS: {"parts": [], "bytes": base64.b64encode(STUB_MP3).decode("ascii")},
+    }
+    for kind, entry in entries.items():
+        os.makedirs(os.path.join(directory, kind), exist_ok=True)
+        with open(os.path.join(directory, kind, "stub.json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+
+def write_silent_wav(path, seconds=2.0, rate=16000):
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+
+
+class DatabaseWaits:
+    """execute_wrapper recording time spent in write statements and "database is locked" errors."""
+
+    def __init__(self):
+        self.queries = 0
+        self.write_seconds = []
+        self.locked = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        is_write = sql.lstrip().upper().startswith(WRITE_STATEMENTS)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if "locked" in str(e):
+                self.locked += 1
+            raise
+        finally:
+            self.queries += 1
+            if is_write:
+                self.write_seconds.append(time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    help = ("Simulate concurrent candidates going through a whole interview against the real views "
+            "(external services replayed by default) and report per-endpoint latency and database lock waits.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5, help="Concurrent candidates")
+        parser.add_argument("--interviews", type=int, default=1, help="Interviews per candidate")
+        parser.add_argument("--flow", choices=["skill", "resume", "mixed"], default="skill",
+                            help="Interview type; mixed alternates between candidates")
+        parser.add_argument("--cycles", type=int, default=5, help="MAX_CYCLES of a skill-based interview")
+        parser.add_argument("--skills", nargs="+", default=DEFAULT_SKILLS)
+        parser.add_argument("--audio", help="WAV answer uploaded on every turn (default: 2s of silence)")
+        parser.add_argument("--resume", help="Resume file for the resume flow (default: a short text resume)")
+        parser.add_argument("--jd-file", help="Job description text file for the resume flow")
+        parser.add_argument("--think", type=float, default=0.0, help="Seconds a candidate waits between turns")
+        parser.add_argument("--ramp", type=float, default=0.0, help="Seconds between candidate start times")
+        parser.add_argument("--live", action="store_true",
+                            help="Call the real external services instead of EXTERNAL_SERVICES replay")
+        parser.add_argument("--stub", action="store_true",
+                            help="Answer every external call with a canned reply instead of the recordings "
+                                 "(the default when there are none)")
+        parser.add_argument("--keep", action="store_true",
+                            help="Leave the interviews' rows and media files in place instead of deleting them")
+        parser.add_argument("--no-rate-limit", action="store_true",
+                            help="Disable LLM_RATE_LIMIT so replayed calls are not throttled")
+        parser.add_argument("--write-behind", action="store_true",
+                            help="Queue per-turn InterviewResponse writes (WRITE_BEHIND) for this run")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["interviews"] < 1:
+            raise CommandError("--users and --interviews must be at least 1")
+        if options["live"] and options["stub"]:
+            raise CommandError("--live and --stub can't be combined")
+        work_dir = tempfile.mkdtemp(prefix="loadtest_")
+        if not options["live"]:
+            settings.EXTERNAL_SERVICES = {**getattr(settings, "EXTERNAL_SERVICES", {}), "MODE": fapp_replay.REPLAY}
+            if not options["stub"] and not fapp_replay.has_recordings():
+                self.stdout.write(
+                    f"No recordings in {fapp_replay.get_config()['CASSETTE_DIR']}; answering external calls "
+                    "with canned replies (--stub)."
+                )
+                options["stub"] = True
+            if options["stub"]:
+                cassette_dir = os.path.join(work_dir, "cassettes")
+                write_stub_cassettes(cassette_dir)
+                settings.EXTERNAL_SERVICES = {
+                    **settings.EXTERNAL_SERVICES, "CASSETTE_DIR": cassette_dir, "STRICT": False
+                }
+        if options["no_rate_limit"]:
+            settings.LLM_RATE_LIMIT = {**getattr(settings, "LLM_RATE_LIMIT", {}), "ENABLED": False}
+        if options["write_behind"]:
+            settings.WRITE_BEHIND = {**getattr(settings, "WRITE_BEHIND", {}), "ENABLED": True}
+
+        audio_path = options["audio"]
+        if not audio_path:
+            audio_path = os.path.join(work_dir, "answer.wav")
+            write_silent_wav(audio_path)
+        with open(audio_path, "rb") as f:
+            self.audio = f.read()
+        if options["resume"]:
+            self.resume_name = os.path.basename(options["resume"])
+            with open(options["resume"], "rb") as f:
+                self.resume = f.read()
+        else:
+            self.resume_name, self.resume = "resume.txt", DEFAULT_RESUME.encode("utf-8")
+        if options["jd_file"]:
+            with open(options["jd_file"], "r", encoding="utf-8") as f:
+                self.job_description = f.read()
+        else:
+            self.job_description = DEFAULT_JOB_DESCRIPTION
+        self.options = options
+
+        self.lock = threading.Lock()
+        self.timings = {}  # endpoint -> [seconds]
+        self.failures = {}  # endpoint -> count
+        self.interview_seconds = []
+        self.completed = 0
+        self.db = []
+        self.created = []  # (interview session_id, Django session key)
+        # test-audio overwrites the shared sample; put it back afterwards
+        test_audio = os.path.join(settings.MEDIA_ROOT, "test_audio.wav")
+        test_audio_backup = os.path.join(work_dir, "test_audio.wav")
+        if os.path.isfile(test_audio):
+            shutil.copyfile(test_audio, test_audio_backup)
+
+        # What the server workers do at start-up, so the first turns aren't timed with it
+        warm_up_worker()
+        threads = []
+        start = time.perf_counter()
+        for user in range(options["users"]):
+            flow = options["flow"]
+            if flow == "mixed":
+                flow = "skill" if user % 2 == 0 else "resume"
+            thread = threading.Thread(target=self.run_candidate, args=(user, flow), name=f"candidate-{user}")
+            threads.append(thread)
+            thread.start()
+            if options["ramp"]:
+                time.sleep(options["ramp"])
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        self.report(elapsed)
+        if os.path.isfile(test_audio_backup):
+            shutil.copyfile(test_audio_backup, test_audio)
+        if options["keep"]:
+            self.stdout.write(f"kept {len(self.created)} interview(s): {[session_id for session_id, _ in self.created]}")
+        else:
+            self.cleanup()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    def run_candidate(self, user, flow):
+        waits = DatabaseWaits()
+        try:
+            with connection.execute_wrapper(waits):
+                for _ in range(self.options["interviews"]):
+                    start = time.perf_counter()
+                    if self.run_interview(user, flow):
+                        with self.lock:
+                            self.completed += 1
+                            self.interview_seconds.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+            with self.lock:
+                self.db.append(waits)
+
+    def request(self, client, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = getattr(client, method)(path, **kwargs)
+            ok = response.status_code < 400
+            if not ok:
+                self.stderr.write(f"{endpoint}: HTTP {response.status_code} {response.content[:200]!r}")
+        except Exception as e:
+            self.stderr.write(f"{endpoint}: {e}")
+            response, ok = None, False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.timings.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+        return response if ok else None
+
+    def run_interview(self, user, flow):
+        client = Client(SERVER_NAME="localhost")
+        if flow == "skill":
+            cycles = self.options["cycles"]
+            data = {
+                "Name": f"loadtest-{user}",
+                "interview_type": "skill_based",
+                "skills": self.options["skills"],
+                "question_count": str(cycles),
+            }
+        else:
+            cycles = RESUME_CYCLES
+            data = {
+                "Name": f"loadtest-{user}",
+                "interview_type": "resume_based",
+                "company_name": "Loadtest Inc",
+                "job_description": self.job_description,
+                "resume": self.upload(self.resume_name, self.resume),
+            }
+        response = self.request(client, "save-user-info", "post", "/save-user-info/", data=data)
+        session_id = client.session.get("session_id")
+        if session_id:
+            with self.lock:
+                self.created.append((session_id, client.session.session_key))
+        if response is None:
+            return False
+        self.request(client, "test-audio", "post", "/test-audio/",
+                     data={"audio": self.upload("test.wav", self.audio)}, HTTP_ACCEPT="application/json")
+
+        # The page uploads one answer per question plus the opening one
+        for _ in range(cycles + 1):
+            if self.options["think"]:
+                time.sleep(random.uniform(0.5, 1.5) * self.options["think"])
+            response = self.request(client, "upload-audio", "post", "/upload-audio/",
+                                    data={"audio": self.upload("recording.wav", self.audio)})
+            if response is None:
+                return False
+
+        response = self.request(client, "result", "get", "/result/", HTTP_ACCEPT="application/json")
+        if response is None:
+            return False
+        redirect_url = response.json().get("redirect_url", "/show-result/")
+        endpoint = redirect_url.strip("/") or "show-result"
+        return self.request(client, endpoint, "get", redirect_url) is not None
+
+    def cleanup(self):
+        """Delete the rows, sessions and media files the simulated interviews created."""
+        fapp_write_behind.flush()
+        session_ids = [session_id for session_id, _ in self.created]
+        # Skills, skill/resume interview rows go with their IntervieweeDetails
+        IntervieweeDetails.objects.filter(session_id__in=session_ids).delete()
+        InterviewResponse.objects.filter(session_id__in=session_ids).delete()
+        ChatMessage.objects.filter(session_id__in=session_ids).delete()
+        Session.objects.filter(session_key__in=[key for _, key in self.created if key]).delete()
+        removed = 0
+        for session_id in session_ids:
+            fapp_interview_state.forget(session_id)
+            fapp_chat_history.forget(session_id)
+            fapp_skill_context.forget(session_id)
+            patterns = [
+                os.path.join(settings.MEDIA_ROOT, f"{session_id}_response_*.wav"),
+                os.path.join(settings.MEDIA_ROOT, f"Q_*_{session_id}.*"),
+                os.path.join(settings.MEDIA_ROOT, "resumes", f"{session_id}*"),
+                os.path.join("media", "reports", f"{session_id}_*_assessment.xlsx"),
+            ]
+            for pattern in patterns:
+                for path in glob.glob(pattern):
+                    os.remove(path)
+                    removed += 1
+        self.stdout.write(f"cleaned up {len(session_ids)} interview(s) and {removed} media file(s)")
+
+    def upload(self, name, content):
+        return SimpleUploadedFile(name, content)
+
+    def report(self, elapsed):
+        requests = sum(len(values) for values in self.timings.values())
+        self.stdout.write("")
+        self.stdout.write(
+            f"{self.options['users']} candidates, {self.completed} interviews completed in {elapsed:.1f}s: "
+            f"{self.completed / elapsed * 60:.2f} interviews/min, {requests / elapsed:.2f} requests/s"
+        )
+        if self.interview_seconds:
+            self.stdout.write(
+                f"interview duration: p50 {percentile(self.interview_seconds, 50):.2f}s  "
+                f"p95 {percentile(self.interview_seconds, 95):.2f}s"
+            )
+        self.stdout.write("")
+        self.stdout.write(f"{'endpoint':<16}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        for endpoint, values in self.timings.items():
+            self.stdout.write(
+                f"{endpoint:<16}{len(values):>7}{self.failures.get(endpoint, 0):>8}"
+                f"{percentile(values, 50):>9.3f}{percentile(values, 95):>9.3f}"
+                f"{percentile(values, 99):>9.3f}{max(values):>9.3f}"
+            )
+
+        write_seconds = [value for waits in self.db for value in waits.write_seconds]
+        queries = sum(waits.queries for waits in self.db)
+        locked = sum(waits.locked for waits in self.db)
+        self.stdout.write("")
+        self.stdout.write(
+            f"database: {queries} queries, {len(write_seconds)} writes taking {sum(write_seconds):.2f}s in total "
+            f"(p50 {percentile(write_seconds, 50) * 1000:.1f}ms  p95 {percentile(write_seconds, 95) * 1000:.1f}ms  "
+            f"p99 {percentile(write_seconds, 99) * 1000:.1f}ms  max {max(write_seconds, default=0) * 1000:.1f}ms)"
+        )
+        style = self.style.ERROR if locked else self.style.SUCCESS
+        self.stdout.write(style(f"\"database is locked\" errors: {locked}"))
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.stdout.write(f"journal mode: {cursor.fetchone()[0]}")
+        if fapp_write_behind.is_enabled():
+            self.stdout.write(f"write-behind: {fapp_write_behind.stats()}")
+        if not self.options["live"]:
+            self.stdout.write(f"replay: {fapp_replay.stats()}")
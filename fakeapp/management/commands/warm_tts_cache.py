@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from fakeapp import fapp_resume_processor, fapp_tts_cache
+from fakeapp.models import InterviewResponse
+
+# Phrases spoken in every session regardless of the candidate
+FIXED_PHRASES = [
+    "Tell me about yourself",
+    "thank you for your time",
+    "Thank you for your time!",
+]
+
+
+def known_phrases():
+    phrases = list(FIXED_PHRASES)
+    phrases.append(fapp_resume_processor.DEFAULT_TECHNICAL_QUESTION["question"])
+    for questions in (
+        fapp_resume_processor.DEFAULT_PROJECT_QUESTIONS,
+        fapp_resume_processor.DEFAULT_SCENARIO_QUESTIONS,
+        fapp_resume_processor.DEFAULT_BEHAVIORAL_QUESTIONS,
+    ):
+        phrases.extend(question["question"] for question in questions)
+    return phrases
+
+
+class Command(BaseCommand):
+    help = "Pre-render question audio for the fixed phrases (and optionally the most repeated questions)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=0,
+                            help="Also render the N question texts asked most often in past interviews")
+        parser.add_argument("--min-count", type=int, default=2,
+                            help="Only consider questions asked at least this many times (with --top)")
+
+    def handle(self, *args, **options):
+        if not fapp_tts_cache.is_enabled():
+            raise CommandError("TTS_CACHE['ENABLED'] is off")
+
+        phrases = known_phrases()
+        if options["top"]:
+            repeated = (
+                InterviewResponse.objects.exclude(question_text__isnull=True)
+                .exclude(question_text="")
+                .values("question_text")
+                .annotate(asked=Count("id"))
+                .filter(asked__gte=options["min_count"])
+                .order_by("-asked")[:options["top"]]
+            )
+            phrases.extend(row["question_text"] for row in repeated)
+
+        rendered = cached = 0
+        seen = set()
+        for phrase in phrases:
+            key = fapp_tts_cache.cache_key(phrase)
+            if key in seen:
+                continue
+            seen.add(key)
+            if fapp_tts_cache.lookup(phrase):
+                cached += 1
+                continue
+            start = time.perf_counter()
+            fapp_tts_cache.get_or_synthesize(phrase)
+            rendered += 1
+            self.stdout.write(f"{time.perf_counter() - start:.2f}s  {phrase}")
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} phrase(s), {cached} already cached"))
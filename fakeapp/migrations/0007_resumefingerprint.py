@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fakeapp", "0006_rename_improvemen_resumebased_interview_improvement"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumeFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("resume_text", models.TextField()),
+                ("resume_data", models.JSONField(blank=True, null=True)),
+                ("hit_count", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
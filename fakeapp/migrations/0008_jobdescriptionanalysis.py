@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fakeapp", "0007_resumefingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobDescriptionAnalysis",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "company_name",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                ("job_description", models.TextField()),
+                (
+                    "jd_hash",
+                    models.CharField(editable=False, max_length=64, unique=True),
+                ),
+                ("job_data", models.JSONField(blank=True, null=True)),
+                ("hit_count", models.IntegerField(default=0)),
+                ("analyzed_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
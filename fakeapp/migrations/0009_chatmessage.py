@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fakeapp", "0008_jobdescriptionanalysis"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("session_id", models.CharField(max_length=10)),
+                ("position", models.IntegerField()),
+                ("role", models.CharField(max_length=20)),
+                ("message", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="fakeapp_cha_created_4969ba_idx"
+                    )
+                ],
+                "unique_together": {("session_id", "position")},
+            },
+        ),
+    ]
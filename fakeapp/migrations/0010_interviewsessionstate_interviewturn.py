@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fakeapp", "0009_chatmessage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InterviewSessionState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("session_id", models.CharField(max_length=10, unique=True)),
+                ("context", models.JSONField(default=dict)),
+                ("progress", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["updated_at"], name="fakeapp_int_updated_d9fb09_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="InterviewTurn",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("session_id", models.CharField(max_length=10)),
+                ("list_name", models.CharField(max_length=40)),
+                ("position", models.IntegerField()),
+                ("item", models.JSONField()),
+            ],
+            options={
+                "unique_together": {("session_id", "list_name", "position")},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("fakeapp", "0010_interviewsessionstate_interviewturn"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="intervieweedetails",
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name="interviewresponse",
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name="intervieweedetails",
+            index=models.Index(
+                fields=["created_at"], name="fakeapp_int_created_a27e6e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="interviewresponse",
+            index=models.Index(
+                fields=["created_at"], name="fakeapp_int_created_3b50ca_idx"
+            ),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+from django.core.exceptions import ValidationError
 from django.db import models
 
 class InterviewResponse(models.Model):
@@ -19,7 +21,7 @@ class InterviewResponse(models.Model):
         app_label = 'fakeapp'
         # This ensures we can identify unique question/session combinations
         unique_together = ['session_id', 'question_number']
-        ordering = ['session_id', 'question_number']
+        indexes = [models.Index(fields=['created_at'])]
     
 class IntervieweeDetails(models.Model):
     # Basic information
@@ -29,7 +31,7 @@ class IntervieweeDetails(models.Model):
     
     class Meta:
         app_label = 'fakeapp'
-        ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'])]
     
     def __str__(self):
         return f"{self.name} - {self.session_id}"
@@ -66,4 +68,119 @@ class IntervieweeSkill(models.Model):
         unique_together = ['interviewee', 'skill_name']
     
     def __str__(self):
-        return f"{self.interviewee.name} - {self.skill_name}"
\ No newline at end of file
+        return f"{self.interviewee.name} - {self.skill_name}"
+
+class ResumeFingerprint(models.Model):
+    # SHA-256 of the uploaded resume file
+    sha256 = models.CharField(max_length=64, unique=True)
+    resume_text = models.TextField()
+    resume_data = models.JSONField(null=True, blank=True)
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'fakeapp'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.hit_count} hits)"
+
+
+class JobDescriptionAnalysis(models.Model):
+    # Parsed job_data for a job posting, shared by every candidate interviewing for it
+    company_name = models.CharField(max_length=200, blank=True, default="")
+    job_description = models.TextField()
+    jd_hash = models.CharField(max_length=64, unique=True, editable=False)
+    job_data = models.JSONField(null=True, blank=True)
+    hit_count = models.IntegerField(default=0)
+    analyzed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'fakeapp'
+
+    @staticmethod
+    def make_hash(job_description, company_name=""):
+        """Hash of the JD and company with case and whitespace differences removed."""
+        normalized = " ".join((job_description or "").split()).lower()
+        company = " ".join((company_name or "").split()).lower()
+        return hashlib.sha256(f"{company}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def _check_duplicate(self, new_hash):
+        duplicate = JobDescriptionAnalysis.objects.filter(jd_hash=new_hash).exclude(pk=self.pk).first()
+        if duplicate is not None:
+            raise ValidationError(
+                f"This job description is the same as the one already stored for "
+                f"{duplicate.company_name or 'Unknown company'} (#{duplicate.pk}); edit or delete that entry instead."
+            )
+
+    def clean(self):
+        super().clean()
+        # jd_hash is not on the admin form, so its unique check has to be done here
+        self._check_duplicate(self.make_hash(self.job_description, self.company_name))
+
+    def save(self, *args, **kwargs):
+        new_hash = self.make_hash(self.job_description, self.company_name)
+        if new_hash != self.jd_hash:
+            self._check_duplicate(new_hash)
+        if self.jd_hash and new_hash != self.jd_hash:
+            # The JD text changed, so the stored analysis no longer applies
+            self.job_data = None
+            self.analyzed_at = None
+        self.jd_hash = new_hash
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.company_name or 'Unknown company'} - {self.jd_hash[:12]}"
+
+
+class ChatMessage(models.Model):
+    # One message of a skill-based interview's conversation with the model
+    session_id = models.CharField(max_length=10)
+    position = models.IntegerField()
+    role = models.CharField(max_length=20)
+    # LangChain message_to_dict() output
+    message = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'fakeapp'
+        unique_together = ['session_id', 'position']
+        indexes = [models.Index(fields=['created_at'])]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.position} ({self.role})"
+
+
+class InterviewSessionState(models.Model):
+    # Resume-flow InterviewState minus its lists (those are InterviewTurn rows)
+    session_id = models.CharField(max_length=10, unique=True)
+    # Resume, job description and what was extracted from them: written once at onboarding
+    context = models.JSONField(default=dict)
+    # Current round, question number, assessment...: small, rewritten when it changes
+    progress = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        app_label = 'fakeapp'
+        indexes = [models.Index(fields=['updated_at'])]
+
+    def __str__(self):
+        return f"State of {self.session_id}"
+
+
+class InterviewTurn(models.Model):
+    # One entry of a list in the interview state (list_of_questions, <round>_questions, ...)
+    session_id = models.CharField(max_length=10)
+    list_name = models.CharField(max_length=40)
+    position = models.IntegerField()
+    item = models.JSONField()
+
+    class Meta:
+        app_label = 'fakeapp'
+        unique_together = ['session_id', 'list_name', 'position']
+
+    def __str__(self):
+        return f"{self.session_id} {self.list_name}[{self.position}]"
@@ -1,3 +1,341 @@
-from django.test import TestCase
+import json
+import os
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.test import SimpleTestCase, TestCase
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from fakeapp import fapp_chat_history, fapp_json_repair, fapp_scheduler
+from fakeapp.models import ChatMessage
+
+CORPUS = os.path.join(os.path.dirname(__file__), "json_repair_corpus.json")
+
+
+class JSONRepairTests(SimpleTestCase):
+    def assertParses(self, text, expected):
+        self.assertEqual(fapp_json_repair.parse_json(text), expected)
+
+    def test_logged_failures(self):
+        # Replies the old parser rejected ("Invalid JSON format." / "No JSON found in response.")
+        with open(CORPUS, encoding="utf-8") as f:
+            corpus = json.load(f)
+        self.assertTrue(corpus)
+        for case in corpus:
+            with self.subTest(source=case["source"]):
+                self.assertParses(case["text"], case["expected"])
+
+    def test_escaped_quotes(self):
+        # simple_log.log:109
+        text = (
+            "Let's begin. Here's my first question:\n\n```json\n{\n"
+            '  \\"prev_question_marks\\": \\"\\",\n'
+            '  \\"Question\\": \\"What is the primary purpose of an index in a database?\\"\n'
+            "}\n```\n\nPlease respond in a conversational manner."
+        )
+        self.assertParses(text, {"prev_question_marks": "", "Question": "What is the primary purpose of an index in a database?"})
+
+    def test_cut_off_mid_string(self):
+        # simple_log.log:662
+        text = (
+            "That's correct! \n\n```json\n{\n"
+            '  "prev_question_marks": 8,\n'
+            '  "Question": "What happens when you try to access an element in a list by an index that is out of range?'
+        )
+        self.assertParses(text, {
+            "prev_question_marks": 8,
+            "Question": "What happens when you try to access an element in a list by an index that is out of range?",
+        })
+
+    def test_missing_closing_brace(self):
+        # simple_log.log:748
+        text = (
+            "Let's begin. Here's the first question:\n\n```json\n{\n"
+            '  "prev_question_marks": "",\n'
+            '  "Question": "What is the main difference between Python 2.x and Python 3.x?"\n'
+            "```\n"
+        )
+        self.assertParses(text, {"prev_question_marks": "", "Question": "What is the main difference between Python 2.x and Python 3.x?"})
+
+    def test_clean_fenced_replies(self):
+        # simple_log.log:441 and :532, which already parsed - the repair must not change them
+        text = (
+            "Here's the first question:\n\n```json\n{\n"
+            '  "prev_question_marks": "",\n'
+            '  "Question": "What is the purpose of the \'finally\' block in a try-catch statement?" \n'
+            "}\n```"
+        )
+        self.assertParses(text, {"prev_question_marks": "", "Question": "What is the purpose of the 'finally' block in a try-catch statement?"})
+        text = (
+            "Here's the first question: What is Python, and what makes it a popular programming language?\"\n\n"
+            '```json\n{\n  "prev_question_marks": "",\n'
+            '  "Question": "What is Python, and what makes it a popular programming language?"\n}\n```'
+        )
+        self.assertParses(text, {"prev_question_marks": "", "Question": "What is Python, and what makes it a popular programming language?"})
+
+    def test_top_level_arrays(self):
+        self.assertParses('[{"a":1}]', [{"a": 1}])
+        text = (
+            "Here are the questions:\n[\n"
+            '  {"question": "What is a closure?"},\n'
+            '  {"question": "What is a decorator?"},\n]'
+        )
+        self.assertParses(text, [{"question": "What is a closure?"}, {"question": "What is a decorator?"}])
+
+    def test_repair_json_output_is_valid(self):
+        self.assertEqual(
+            json.loads(fapp_json_repair.repair_json('[{"question": "What is a closure?"},]')),
+            [{"question": "What is a closure?"}],
+        )
+        self.assertEqual(
+            json.loads(fapp_json_repair.repair_json('{"matching_skills": ["Python", "SQL",], "experience_match": {"rating": "fair"')),
+            {"matching_skills": ["Python", "SQL"], "experience_match": {"rating": "fair"}},
+        )
+
+    def test_python_literals(self):
+        self.assertParses("{'score': 7, 'feedback': 'Clear answer'}", {"score": 7, "feedback": "Clear answer"})
+        self.assertParses(
+            '{"technical_score": 7.5, "recommend": True, "notes": None}\nLet me know if you need anything else.',
+            {"technical_score": 7.5, "recommend": True, "notes": None},
+        )
+
+    def test_missing_comma(self):
+        self.assertParses('{"score": 75 "feedback": "Good"}', {"score": 75, "feedback": "Good"})
+        self.assertParses('{"question": "What is X?"\n "expected_answer": "Y"}', {"question": "What is X?", "expected_answer": "Y"})
+        self.assertParses('{"question": "What is X?"  "expected_answer": "Y"}', {"question": "What is X?", "expected_answer": "Y"})
+
+    def test_unescaped_quotes_inside_string(self):
+        self.assertParses(
+            '{\n  "score": 6,\n  "feedback": "He said "great", then left"\n}',
+            {"score": 6, "feedback": 'He said "great", then left'},
+        )
+
+    def test_already_parsed(self):
+        data = {"a": 1}
+        self.assertIs(fapp_json_repair.parse_json(data), data)
+
+    def test_unrecoverable(self):
+        with self.assertRaises(fapp_json_repair.JSONRepairError):
+            fapp_json_repair.parse_json("Please respond with your answer.")
+        with self.assertRaises(fapp_json_repair.JSONRepairError):
+            fapp_json_repair.parse_json(None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class ClockCondition(threading.Condition):
+    """Condition whose waits pass on the fake clock instead of in real time (single-threaded tests)."""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def wait(self, timeout=None):
+        self.clock.advance(timeout)
+        return False
+
+
+def scheduler_config(**overrides):
+    config = {
+        **fapp_scheduler.DEFAULTS,
+        "REQUESTS_PER_MINUTE": 60,
+        "BURST": 1,
+        "RESERVE": {level: 0.0 for level in fapp_scheduler.PRIORITY_NAMES},
+    }
+    config.update(overrides)
+    return config
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_refills_at_rate(self):
+        clock = FakeClock()
+        bucket = fapp_scheduler.TokenBucket(rate=1.0, capacity=2, clock=clock)
+        self.assertEqual(bucket.try_take(0), 0.0)
+        self.assertEqual(bucket.try_take(0), 0.0)
+        self.assertAlmostEqual(bucket.try_take(0), 1.0)
+        clock.advance(1.0)
+        self.assertEqual(bucket.try_take(0), 0.0)
+
+    def test_reserve_is_left_for_higher_classes(self):
+        clock = FakeClock()
+        bucket = fapp_scheduler.TokenBucket(rate=1.0, capacity=10, clock=clock)
+        for _ in range(5):
+            bucket.try_take(0)
+        # 5 tokens left: a class that must leave 5 untouched waits, one that must leave 4 doesn't
+        self.assertAlmostEqual(bucket.try_take(5), 1.0)
+        self.assertEqual(bucket.try_take(4), 0.0)
+
+    def test_pause_blocks_until_retry_after(self):
+        clock = FakeClock()
+        bucket = fapp_scheduler.TokenBucket(rate=1.0, capacity=10, clock=clock)
+        bucket.pause(5.0)
+        self.assertAlmostEqual(bucket.try_take(0), 5.0)
+        clock.advance(5.0)
+        # The bucket restarts empty
+        self.assertAlmostEqual(bucket.try_take(0), 1.0)
+        clock.advance(1.0)
+        self.assertEqual(bucket.try_take(0), 0.0)
+
+
+class SchedulerTests(SimpleTestCase):
+    def test_priority_order_under_contention(self):
+        clock = FakeClock()
+        scheduler = fapp_scheduler.Scheduler(scheduler_config(), clock=clock)
+        scheduler.acquire(fapp_scheduler.QUESTION)  # empty the bucket
+        order = []
+
+        def call(level):
+            scheduler.acquire(level)
+            order.append(level)
+
+        def wait_until(condition):
+            deadline = time.monotonic() + 5
+            while not condition():
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.01)
+
+        def queued():
+            return sum(counters["queued"] for counters in scheduler.stats().values())
+
+        threads = []
+        for level in (fapp_scheduler.BACKGROUND, fapp_scheduler.EVALUATION, fapp_scheduler.QUESTION):
+            thread = threading.Thread(target=call, args=(level,), daemon=True)
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: queued() == len(threads))
+        for served in range(1, 4):
+            clock.advance(1.0)  # one token
+            wait_until(lambda: len(order) == served)
+        for thread in threads:
+            thread.join(1)
+        self.assertEqual(order, [fapp_scheduler.QUESTION, fapp_scheduler.EVALUATION, fapp_scheduler.BACKGROUND])
+
+    def test_shed_after_max_wait(self):
+        clock = FakeClock()
+        config = scheduler_config(
+            REQUESTS_PER_MINUTE=1,
+            MAX_WAIT={fapp_scheduler.QUESTION: None, fapp_scheduler.EVALUATION: 60.0, fapp_scheduler.BACKGROUND: 20.0},
+        )
+        scheduler = fapp_scheduler.Scheduler(config, clock=clock)
+        scheduler._cond = ClockCondition(clock)
+        scheduler.acquire(fapp_scheduler.QUESTION)
+        start = clock()
+        with fapp_scheduler.collect_sheds() as sheds:
+            with self.assertRaises(fapp_scheduler.RateLimitShed) as raised:
+                scheduler.acquire(fapp_scheduler.BACKGROUND)
+        self.assertAlmostEqual(clock() - start, 20.0)
+        self.assertEqual(sheds, [fapp_scheduler.BACKGROUND])
+        self.assertEqual(scheduler.stats()["background"]["shed"], 1)
+        self.assertEqual(scheduler._queue, [])
+        # What the SDK raises for an exception from the transport
+        try:
+            raise ConnectionError("Connection error.") from raised.exception
+        except ConnectionError as wrapped:
+            self.assertTrue(fapp_scheduler.is_shed(wrapped))
+        self.assertFalse(fapp_scheduler.is_shed(ConnectionError("Connection error.")))
+
+    def test_backoff_after_429(self):
+        clock = FakeClock()
+        scheduler = fapp_scheduler.Scheduler(scheduler_config(BURST=10), clock=clock)
+        scheduler._cond = ClockCondition(clock)
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions", content=b"{}")
+        responses = [httpx.Response(429, headers={"retry-after": "5"}), httpx.Response(200)]
+        sent_at = []
+
+        def send_request(request):
+            sent_at.append(clock())
+            return responses.pop(0)
+
+        with mock.patch.object(fapp_scheduler, "get_scheduler", return_value=scheduler):
+            with fapp_scheduler.priority(fapp_scheduler.QUESTION):
+                response = fapp_scheduler.send(request, send_request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(sent_at), 2)
+        self.assertGreaterEqual(sent_at[1] - sent_at[0], 5.0)
+        self.assertEqual(scheduler.stats()["question"]["rate_limited"], 1)
+
+    def test_429_retries_are_bounded(self):
+        clock = FakeClock()
+        scheduler = fapp_scheduler.Scheduler(scheduler_config(BURST=10), clock=clock)
+        scheduler._cond = ClockCondition(clock)
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions", content=b"{}")
+        sent = []
+
+        def send_request(request):
+            sent.append(request)
+            return httpx.Response(429)
+
+        with mock.patch.object(fapp_scheduler, "get_scheduler", return_value=scheduler):
+            with fapp_scheduler.priority(fapp_scheduler.QUESTION):
+                response = fapp_scheduler.send(request, send_request)
+        # The last 429 goes back to the caller; the SDK is built not to retry it again
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(sent), fapp_scheduler.get_config()["MAX_RETRIES"] + 1)
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(fapp_scheduler.retry_after_seconds(httpx.Response(429, headers={"retry-after": "7"}), 0), 7.0)
+        self.assertEqual(fapp_scheduler.retry_after_seconds(httpx.Response(429, headers={"retry-after": "0"}), 0), 0.5)
+        self.assertEqual(fapp_scheduler.retry_after_seconds(httpx.Response(429), 2), 4.0)
+        self.assertEqual(fapp_scheduler.retry_after_seconds(httpx.Response(429), 10), 30.0)
+
+
+def conversation(turns):
+    """Instructions plus `turns` question/answer pairs; every turn message costs 10 tokens."""
+    messages = [SystemMessage(content="i" * 40)]  # 11 tokens
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"{turn}".ljust(36, "a")))
+        messages.append(AIMessage(content=f"{turn}".ljust(36, "q")))
+    return messages
+
+
+class ChatHistoryTests(TestCase):
+    def test_first_message_is_pinned(self):
+        messages = conversation(10)
+        windowed = fapp_chat_history.window_messages(messages, max_messages=4, max_tokens=10000)
+        self.assertEqual(windowed, [messages[0]] + messages[-4:])
+
+    def test_token_budget(self):
+        messages = conversation(10)
+        windowed = fapp_chat_history.window_messages(messages, max_messages=0, max_tokens=11 + 40)
+        self.assertEqual(windowed, [messages[0]] + messages[-4:])
+        self.assertLessEqual(sum(fapp_chat_history.estimate_tokens(m.content) for m in windowed), 51)
+
+    def test_leading_ai_message_is_dropped(self):
+        messages = conversation(10)
+        # Room for three messages: the oldest of them is the reply to a question that didn't fit
+        windowed = fapp_chat_history.window_messages(messages, max_messages=0, max_tokens=11 + 30)
+        self.assertEqual(windowed, [messages[0]] + messages[-2:])
+        windowed = fapp_chat_history.window_messages(messages, max_messages=3, max_tokens=10000)
+        self.assertEqual(windowed, [messages[0]] + messages[-2:])
+
+    def test_positions_stay_consecutive_across_appends(self):
+        messages = conversation(3)
+        history = fapp_chat_history.DatabaseChatMessageHistory("chat1", max_messages=4, max_prompt_tokens=10000)
+        # A second worker appending to the same session
+        other = fapp_chat_history.DatabaseChatMessageHistory("chat1", max_messages=4, max_prompt_tokens=10000)
+        history.add_messages(messages[:3])
+        other.add_messages(messages[3:5])
+        history.add_messages(messages[5:])
+        positions = list(ChatMessage.objects.filter(session_id="chat1").order_by("position").values_list("position", flat=True))
+        self.assertEqual(positions, list(range(len(messages))))
+        self.assertEqual(history.full_messages, messages)
+
+    def test_messages_window_after_append(self):
+        messages = conversation(5)
+        history = fapp_chat_history.DatabaseChatMessageHistory("chat2", max_messages=4, max_prompt_tokens=10000)
+        history.add_messages(messages[:3])
+        self.assertEqual(history.messages, messages[:3])
+        history.add_messages(messages[3:])
+        # The cached window is dropped by the append
+        self.assertEqual(history.messages, [messages[0]] + messages[-4:])
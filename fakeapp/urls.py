@@ -13,9 +13,11 @@ urlpatterns = [
     path("test-audio/", views.test_audio, name="test_audio"),
     path("interview/", views.index, name="index"),
     path("upload-audio/", views.upload_audio, name="uploadaudio"),
+    path("question-audio/<int:question_number>/", views.question_audio, name="question_audio"),
     path("result/", views.result, name="result"),
     path("show-result/", views.show_result, name="show_result"),
     path("show-dashboard/", views.show_dashboard, name="show_dashboard"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
 
 if settings.DEBUG:  # Only serve media in development mode
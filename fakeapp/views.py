@@ -4,10 +4,20 @@ from django.shortcuts import render
 from django.conf import settings
 
 from django.views.decorators.csrf import csrf_exempt 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse
+from django.urls import reverse
 import random
 from . import fapp_resume_processor
 from . import fapp_processor
+from . import fapp_chat_history
+from . import fapp_document_cache
+from . import fapp_interview_state
+from . import fapp_metrics
+from . import fapp_prefetch
+from . import fapp_scoring
+from . import fapp_skill_context
+from . import fapp_tts_cache
+from . import fapp_write_behind
 from fakeapp.models import InterviewResponse,IntervieweeDetails, IntervieweeSkill, skillbased_interview, resumebased_interview
 from urllib.parse import unquote
 # Ensure counter is defined
@@ -40,8 +50,11 @@ def save_user_info(request):
                 MAX_CYCLES = int(no_of_questions)
                 request.session["MAX_CYCLES"] = MAX_CYCLES
                 skillbased_interview_obj = skillbased_interview.objects.create(interviewee=Intervieweeobj, question_count=MAX_CYCLES)
-                for skill in selected_skills:
-                    IntervieweeSkill.objects.create(interviewee=Intervieweeobj, skill_name=skill)
+                # One INSERT for all skills; a skill picked twice is stored once
+                IntervieweeSkill.objects.bulk_create(
+                    [IntervieweeSkill(interviewee=Intervieweeobj, skill_name=skill) for skill in dict.fromkeys(selected_skills)]
+                )
+                fapp_skill_context.start(session_id, selected_skills, MAX_CYCLES)
             else:
                 request.session["interview_type"] = "resume_based"
                 company_name = request.POST.get("company_name", "")
@@ -52,10 +65,12 @@ def save_user_info(request):
                     resume_dir = os.path.join(settings.MEDIA_ROOT, "resumes")
                     os.makedirs(resume_dir, exist_ok=True)
                     resume_path = os.path.join(resume_dir, session_id+resume_file.name)
-                    with open(resume_path, "wb") as f:
-                        for chunk in resume_file.chunks():
-                            f.write(chunk)
-                    resume_text = fapp_processor.extract_resume_text(resume_path)
+                    fingerprint = fapp_document_cache.save_upload(resume_file, resume_path)
+                    cached_resume = fapp_document_cache.get_cached_resume(fingerprint)
+                    if cached_resume:
+                        resume_text = cached_resume.resume_text
+                    else:
+                        resume_text = fapp_processor.extract_resume_text(resume_path)
                     initial_state = fapp_resume_processor.initialize_state({
                         "resume": resume_text,
                         "job_description": jd,
@@ -65,15 +80,30 @@ def save_user_info(request):
                         "current_question_type": "extract_resume_data",
                         "current_question_index": 0
                     })
+                    if cached_resume and cached_resume.resume_data:
+                        # Same file seen before: skip the resume extraction LLM call
+                        initial_state["resume_data"] = cached_resume.resume_data
+                    cached_job_data = fapp_document_cache.get_cached_job_data(jd, company_name)
+                    if cached_job_data:
+                        initial_state["job_data"] = cached_job_data
                     try:
-                        state = fapp_resume_processor.extract_resume_data(initial_state)
-                        state = fapp_resume_processor.extract_job_data(state)
-                        state = fapp_resume_processor.perform_match_analysis(state)
+                        state = fapp_resume_processor.run_onboarding_pipeline(
+                            initial_state,
+                            concurrent=getattr(settings, "ONBOARDING_CONCURRENT", True)
+                        )
                     except Exception as e:
                         logger.error(f"Data processing error: {str(e)}")
                         state = initial_state
+                    if not (cached_resume and cached_resume.resume_data):
+                        fapp_document_cache.store_resume(fingerprint, resume_text, state.get("resume_data"))
+                    if not cached_job_data:
+                        fapp_document_cache.store_job_data(jd, company_name, state.get("job_data"))
                     state["current_question_type"] = "project"
-                    request.session["state"] = state
+                    # The session only keeps session_id; the state has its own tables
+                    fapp_interview_state.save(session_id, state)
+                    if fapp_prefetch.is_enabled():
+                        # Generate the first project question while the candidate checks their audio
+                        fapp_processor.prefetch_next_resume_question(state, session_id, 0)
                     resumebased_interview_obj = resumebased_interview.objects.create(
                         interviewee=Intervieweeobj,
                         resume_json=state.get("resume_data", {}),
@@ -81,8 +111,7 @@ def save_user_info(request):
                         job_description_json=state.get("job_data", {})
                     )
             
-            # Save session after all modifications
-            request.session.save()
+            # SessionMiddleware saves the modified session once, after the view
             return JsonResponse({'redirect_url': '/test-audio/'})
         except Exception as e:
             print(f"Error in save_user_info: {str(e)}")
@@ -224,7 +253,7 @@ def upload_audio(request):
         if request.session.get("interview_type") == "skill_based":
             question, audio_file, prev_ans, marks, feedback = fapp_processor.audio_skill_processor(save_path, session_id, counter, MAX_CYCLES)
         else:
-            state = request.session.get("state", {})
+            state = fapp_interview_state.load(session_id)
             if state.get("current_question_number") is None:
                 state["current_question_number"] = 0
             if state.get("current_question_type") != "perform_assessment":
@@ -232,35 +261,21 @@ def upload_audio(request):
                 print(state["responses"])
                 question, audio_file, prev_ans, marks, feedback, state = fapp_processor.audio_resume_processor(save_path, session_id, counter, MAX_CYCLES, state)
 
-            request.session["state"] = state
-            request.session.save()  # Save the session after modification
-        if counter > 0: 
-            try:
-                prev_response = InterviewResponse.objects.get(
-                    session_id=session_id,
-                    question_number=counter
-                )
-                prev_response.answer_text = prev_ans
-                prev_response.score = marks
-                prev_response.feedback = feedback
-                prev_response.save()
-            except InterviewResponse.DoesNotExist:
-                # Handle the case if the record doesn't exist
-                pass
-        
-        # Create a new entry for the current question
-        InterviewResponse.objects.create(
-            session_id=session_id,
-            question_number=counter + 1,
-            question_text=question,
-           
-        )
+            fapp_interview_state.save(session_id, state)
+        # Answer to the previous question and the new question; queued when WRITE_BEHIND is on
+        fapp_write_behind.record_turn(session_id, counter, prev_ans, marks, feedback, question)
         show_text = f"{counter+1}. {question}"
         # print("Audio file URL:", audio_file_url)
         if counter >= MAX_CYCLES :
             show_text="Thank you for your time!"
-            audio_file="last.mp3"
-        relative_media_url = os.path.join(settings.MEDIA_URL, audio_file)
+            # Pre-rendered by warm_tts_cache; the bundled recording when the cache is off or synthesis fails
+            audio_file = (fapp_tts_cache.is_enabled() and fapp_tts_cache.get_or_synthesize(show_text)) or "last.mp3"
+            relative_media_url = os.path.join(settings.MEDIA_URL, audio_file)
+        elif getattr(settings, "TTS_STREAMING", False) or not audio_file:
+            # Audio is synthesized while it is being played (or retried there when it failed above)
+            relative_media_url = reverse("question_audio", args=[counter + 1])
+        else:
+            relative_media_url = os.path.join(settings.MEDIA_URL, audio_file)
         audio_file_url = request.build_absolute_uri(relative_media_url)
         # audio_file_url = unquote(audio_file_url)
 
@@ -276,6 +291,45 @@ def upload_audio(request):
 
     return JsonResponse({"error": "Invalid request"}, status=400)
     
+def question_audio(request, question_number):
+    """Stream the audio for a question, starting playback on the first sentence."""
+    session_id = request.session.get("session_id")
+    if not session_id:
+        return JsonResponse({"error": "No session ID found"}, status=400)
+    question = fapp_skill_context.cached_question(session_id, question_number)
+    if not question:
+        fapp_write_behind.wait_for_question(session_id, question_number)
+        question = InterviewResponse.objects.filter(
+            session_id=session_id,
+            question_number=question_number
+        ).values_list("question_text", flat=True).first()
+    if not question:
+        return JsonResponse({"error": "Question not found"}, status=404)
+
+    tts_backend = fapp_processor.get_tts_backend()
+    on_complete = None
+    if fapp_tts_cache.is_enabled():
+        file_path = fapp_tts_cache.lookup(question) or fapp_tts_cache.cache_path(question)
+        on_complete = fapp_tts_cache.evict
+    else:
+        file_path = os.path.join(settings.MEDIA_ROOT, f"Q_{question_number}_{session_id}.{tts_backend.extension}")
+    if os.path.isfile(file_path):
+        return FileResponse(open(file_path, "rb"), content_type=tts_backend.content_type)
+    try:
+        frames = fapp_processor.stream_mp3(question, file_path, on_complete)
+    except Exception as e:
+        logger.error(f"Streaming TTS for question {question_number} of {session_id} failed, synthesizing the whole file: {e}")
+        if not fapp_processor.text_to_mp3(question, file_path):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            return JsonResponse({"error": "Could not synthesize the question audio"}, status=503)
+        if on_complete:
+            on_complete()
+        return FileResponse(open(file_path, "rb"), content_type=tts_backend.content_type)
+    response = StreamingHttpResponse(frames, content_type=tts_backend.content_type)
+    response["Cache-Control"] = "no-store"
+    return response
+
 @csrf_exempt
 def result(request):
     try:
@@ -290,15 +344,29 @@ def result(request):
             return JsonResponse({'error': 'No session ID found'}, status=400)
             
         print("Processing result for session:", serial)
-        state = request.session.get("state", {})
+        # Every answer must be in InterviewResponse before scores and results are read
+        fapp_write_behind.wait_for_question(serial, request.session.get("counter", 0))
+        fapp_prefetch.forget(serial)
+        fapp_chat_history.forget(serial)
+        fapp_skill_context.forget(serial)
+        state = fapp_interview_state.load(serial)
+        batch_scoring = fapp_scoring.batch_enabled() and request.session.get("interview_type") == "resume_based"
+        if fapp_scoring.is_enabled() and not batch_scoring:
+            evaluations = fapp_scoring.wait_for_session(serial)
+            if state.get("list_of_questions"):
+                fapp_scoring.merge_scores(serial, state["list_of_questions"], evaluations)
 
         if request.session.get("interview_type") == "resume_based":
             print("Starting resume_based assessment")
             try:
-                state = fapp_resume_processor.perform_assessment(state)
+                if batch_scoring:
+                    state = fapp_resume_processor.perform_batch_assessment(state)
+                    fapp_scoring.save_scores(serial, state.get("list_of_questions", []))
+                else:
+                    state = fapp_resume_processor.perform_assessment(state)
                 print("Assessment performed:", state.get("assessment", {}))
 
-                list_of_questions = request.session["state"].get("list_of_questions", [])
+                list_of_questions = state.get("list_of_questions", [])
                 print("Questions:", list_of_questions)
 
                 assessment = state.get("assessment", {})
@@ -311,8 +379,7 @@ def result(request):
                 print("Dashboard data prepared")
 
                 request.session['dashboard_data'] = dashboard_data
-                request.session.modified = True
-                request.session.save()
+                fapp_interview_state.forget(serial)
 
                 return JsonResponse({'redirect_url': '/show-dashboard/'})
             except Exception as e:
@@ -322,10 +389,8 @@ def result(request):
             try:
                 df_results = fapp_processor.get_results_from_db(serial)
                 
-                # Store data in session and ensure it's saved
+                # Stored by SessionMiddleware after the view
                 request.session['result_data'] = df_results
-                request.session.modified = True
-                request.session.save()
                 
                 print("Result data before:", df_results)
                 return JsonResponse({'redirect_url': '/show-result/'})
@@ -358,4 +423,8 @@ def show_dashboard(request):
         dashboard_data['excelLink'] = request.build_absolute_uri(dashboard_data['excelLink'])
     print("Dashboard data in show dashboard:", dashboard_data)
     request.session.flush()  # Clear the session after getting the data
-    return render(request, 'dashboard.html', {"table_data": json.dumps(dashboard_data)})
\ No newline at end of file
+    return render(request, 'dashboard.html', {"table_data": json.dumps(dashboard_data)})
+
+def metrics(request):
+    """Prometheus scrape endpoint: LLM/STT/TTS latency, tokens, retries, fallbacks and cache stats."""
+    return HttpResponse(fapp_metrics.render(), content_type="text/plain; version=0.0.4")